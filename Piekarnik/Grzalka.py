@@ -5,6 +5,8 @@ from bokeh.layouts import layout, column, row, gridplot
 from bokeh.models import CustomJS, ColumnDataSource, Slider, Button, CustomJS
 from bokeh.plotting import figure
 import csv
+from app_jobs import heater_pi
+from async_backend import SimulationRunner
 
 """ OPIS
 Grzałka nagrzewa powietrze wewnątrz piekarnika (Konwekcja) oraz ścianki piekarnika (Promieniowanie).
@@ -166,49 +168,41 @@ source_3 = ColumnDataSource(data=dict(x=time, y=wartosc_sterujaca))
 p_2.line(source=source_3)
 
 
-def chart_update():
-    global time, temperatura_piekarnik, temperatura_grzalka, temperatura_strata, wartosc_sterujaca, T_grzalka
+def show_result(wynik):
+    # Aktualizacja danych na wykresach (wywoływane w wątku dokumentu po zakończeniu symulacji)
+    source.data = dict(x=wynik["time"], y=wynik["temperatura_piekarnik"])
+    source_1.data = dict(x=wynik["time"], y=wynik["temperatura_grzalka"])
+    source_2.data = dict(x=wynik["time"], y=wynik["temperatura_strata"])
+    source_3.data = dict(x=wynik["time"], y=wynik["wartosc_sterujaca"])
+
+
+def show_busy(zajety):
+    button.label = "Obliczanie..." if zajety else "Wygeneruj grafy"
+
+
+# Symulacja (control.OvenHeater, te same wzory co update_temperature_PI) w puli procesów
+runner = SimulationRunner(curdoc(), heater_pi, show_result, on_busy=show_busy)
 
+
+def chart_update():
     # Parametry regulatora PI
     Kp = slider_kp.value  # Wzmocnienie proporcjonalne
     Ki = slider_ki.value  # Wzmocnienie całkujące
-    skumulowany_uchyb = 0  # Skumulowany uchyb
-
-    time = []
-    temperatura_piekarnik = []
-    temperatura_grzalka = []
-    temperatura_strata = []
-    wartosc_sterujaca = []
 
     # Parametry symulacji
-    T = T_otoczenia  # Początkowa temperatura piekarnika (°C)
-    T_grzalka = T_otoczenia
     T_docelowa = slider_T_zadane.value  # Docelowa temperatura (°C)
     delta_t = 1  # Krok czasowy (s)
-    sim_time = 400  # Czas symulacji (s)v
-
-    for i in range(0, sim_time):
-        T, skumulowany_uchyb, T_grzalka, T_utracone, P = update_temperature_PI(
-            T, T_docelowa, k, T_otoczenia, m, c, delta_t, skumulowany_uchyb, T_grzalka, Kp, Ki)
-        time.append(i)
-        temperatura_piekarnik.append(T)
-        temperatura_grzalka.append(T_grzalka)
-        temperatura_strata.append(T_utracone)
-        wartosc_sterujaca.append(P)
-        print(
-            f"Czas: {i}s, Temperatura: {T:.2f}°C, Temperatura grzałki: {T_grzalka:.2f}°C")
-
-    # Aktualizacja danych na wykresach
-    source.data = dict(x=time, y=temperatura_piekarnik)
-    source_1.data = dict(x=time, y=temperatura_grzalka)
-    source_2.data = dict(x=time, y=temperatura_strata)
-    source_3.data = dict(x=time, y=wartosc_sterujaca)
+    sim_time = 400  # Czas symulacji (s)
+
+    runner.request(Kp, Ki, T_docelowa, delta_t, sim_time)
 
 
 button = Button(label="Wygeneruj grafy",
                 button_type="danger")
 
 button.on_click(chart_update)
+for slider in sliders_list:
+    slider.on_change("value", lambda attr, old, new: chart_update())
 
 
 page = layout([row(button, slider_T_zadane, slider_ki, slider_kp),
@@ -2,12 +2,18 @@ import numpy as np
 from math import sqrt
 from bokeh.io import curdoc, show
 from bokeh.layouts import layout, column, row, gridplot
-from bokeh.models import CustomJS, ColumnDataSource, Slider, Button, CustomJS, Span
+from bokeh.models import CustomJS, ColumnDataSource, Slider, Button, CustomJS, Span, Toggle
 from bokeh.plotting import figure
-from simpful import *
-from fuzzy_2 import create_fuzzy_pi, simulate_oven
+from oven_model import k, T_otoczenia, cp, P_max
 import csv
-import sqlite3
+from db_store import load_run, latest_run_id
+from trajectory_store import has_trajectory, source_data
+from app_jobs import oven_pi_fuzzy
+from async_backend import SimulationRunner
+from control import ClosedLoop, PI, OvenLumped
+from live_stream import LiveStream
+from downsample import ZoomDownsampler
+import instrumentation
 
 """ OPIS
 WZORY
@@ -28,39 +34,22 @@ Ciepło właściwe powietrza: c = 1.005 [kJ / kg * °C]
 Pojemność cieplna : pc = m * c [kJ / °C]
 """
 
-# Tworzenie lub łączenie z bazą danych SQLite
-conn = sqlite3.connect("PID_simulation.db")
-cursor = conn.cursor()
+instrumentation.start_from_env()  # PIEKARNIK_STATS_REPORT / PIEKARNIK_STATS_PORT dla procesu serwera
 
-# Tworzenie tabeli, jeśli nie istnieje
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS simulation_data (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    czas REAL,
-    temperatura REAL,
-    wartosc_sterujaca REAL
-)
-""")
-conn.commit()
-
-# Funkcja do zapisywania danych do bazy SQLite
-
-
-def save_to_db(T, temperature, u):
-    # Wyczyść tabelę przed zapisem
-    cursor.execute("DELETE FROM simulation_data")
-    for t, h, ctrl in zip(T, temperature, u):
-        cursor.execute(
-            "INSERT INTO simulation_data (czas, temperatura, wartosc_sterujaca) VALUES (?, ?, ?)", (t, h, ctrl))
-    conn.commit()
+# Zapis do bazy SQLite: app_jobs.save_to_db (wykonywany razem z symulacją w procesie z puli)
 
 # Funkcja do odczytu danych z bazy SQLite
 
 
-def load_from_db():
-    cursor.execute("SELECT czas, temperatura FROM simulation_data")
-    rows = cursor.fetchall()
-    return [row[0] for row in rows], [row[1] for row in rows]
+def load_from_db(run_id=None):
+    # Domyślnie ostatni przebieg regulatora PI
+    if run_id is None:
+        run_id = latest_run_id("PI", "oven")
+    # Pliki .npy są mapowane z dysku - bez fetchall i konwersji wierszy
+    if has_trajectory(run_id):
+        dane = source_data(run_id)
+        return dane["x"], dane["y"]
+    return load_run(run_id)
 
 
 # Slider do aktualizacji parametrów
@@ -73,80 +62,22 @@ slider_kp = Slider(title="Wzmocnienie regulatora", start=0.0001,
 sliders_list = [slider_T_zadane, slider_Ti, slider_kp]
 
 
-def update_temperature_PI(T, T_docelowa, k, T_otoczenia, cp, delta_t, skumulowany_uchyb, Kp_local, Ti_local):
-    # Oblicza nową temperaturę piekarnika po jednym kroku czasowym za pomocą regulatora PI.
-    # Obliczanie błędu
-    uchyb = T_docelowa - T
-
-    # Aktualizacja skumulowanego błędu
-    skumulowany_uchyb += uchyb * delta_t
-
-    # Wyznaczenie mocy grzałki na podstawie regulatora PI
-    u = max(0, min(Kp_local * (uchyb + ((delta_t / Ti_local) * skumulowany_uchyb)), 1))
-
-    # Ograniczenie mocy grzałki do zakresu [0, 2 kW]
-    P = 0.95 * u * P_max
-
-    # Obliczanie dostarczonej mocy do grzałki - sygnał sterujący [kW * s = kJ] [Kilo Dżul]
-    Q_dostarczone = P * delta_t
-    # Energia utracona poprzez nie perfekcyjną izolację piekarnika [kW * s = kJ] [Kilo Dżul]
-    Q_utracone = k * (T - T_otoczenia) * delta_t
-
-    # Temperatura dostarczona przez grzałkę [kJ / kJ / °C = kJ * °C / kJ = °C] [°C]
-    delta_T = (Q_dostarczone - Q_utracone) / cp
-
-    return T + delta_T, skumulowany_uchyb, Q_utracone, P
-
-
-# Parametry fizyczne piekarnika
-k = 0.006  # Współczynnik strat cieplnych (kW/°C)
-T_otoczenia = 20  # Temperatura otoczenia (°C)
-V = 50  # Objętość piekarnika (litry)
-rho = 1.2  # Gęstość powietrza (kg/m³)
-m = V/1000 * rho  # Masa powietrza w piekarniku (kg)
-c = 1.005  # ciepło właściwe (kJ/(kg·°C))
-cp = c * m  # pojemność cieplna [kJ/°C]
-P_max = 2  # Górny zakres mocy grzałki (kW)
-
-
-# Listy do przechowywania danych do wykresu
-time = []
-temperatura_piekarnik = []
-temperatura_strata = []
-wartosc_sterujaca = []
-
 # Inicjacja wykresu
 # Parametry regulatora PI
 Kp = 0.0005  # Wzmocnienie proporcjonalne
 Ti = 10  # Wzmocnienie całkujące
-skumulowany_uchyb = 0  # Skumulowany uchyb
 
 # Parametry symulacji
-T = T_otoczenia  # Początkowa temperatura piekarnika (°C)
 T_docelowa = 200  # Docelowa temperatura (°C)
 delta_t = 1  # Krok czasowy (s)
 sim_time = 200  # Czas symulacji (s)
-total_time = 0  # Czas trwania symulacji (s)
 
-
-# Symulacja zwypły PI
-while total_time < sim_time:
-    if total_time == 100:
-        T -= 30
-    T, skumulowany_uchyb, T_utracone, P = update_temperature_PI(
-        T, T_docelowa, k, T_otoczenia, cp, delta_t, skumulowany_uchyb, Kp, Ti)
-    total_time += delta_t
-    time.append(total_time)
-    temperatura_piekarnik.append(T)
-    temperatura_strata.append(T_utracone)
-    wartosc_sterujaca.append(P)
-
-# wywołanie symulacji PI rozmyty
-FS = create_fuzzy_pi()
-times_fuzzy, temperatures_fuzzy, power_fuzzy, Q_lost = simulate_oven(
-    FS, T_docelowa, T_otoczenia, P_max, k, cp, delta_t, sim_time)
-
-save_to_db(time, temperatura_piekarnik, wartosc_sterujaca)
+# Symulacja zwykły PI i PI rozmyty (regulator rozmyty przez fuzzy_kernel - ~40 ms zamiast ~17 s z simpful)
+wynik = oven_pi_fuzzy(Kp, Ti, T_docelowa, delta_t, sim_time)
+time, temperatura_piekarnik = wynik["time"], wynik["temperatura_piekarnik"]
+temperatura_strata, wartosc_sterujaca = wynik["temperatura_strata"], wynik["wartosc_sterujaca"]
+times_fuzzy, temperatures_fuzzy = wynik["times_fuzzy"], wynik["temperatures_fuzzy"]
+power_fuzzy, Q_lost = wynik["power_fuzzy"], wynik["Q_lost"]
 
 # ustawienia wykresu
 p = figure(title="Temperatura wewnątrz piekarnika - PI",
@@ -184,50 +115,81 @@ source_6 = ColumnDataSource(data=dict(x=times_fuzzy, y=Q_lost))
 p_5.line(source=source_5, legend_label="Energia Grzałka", color="red")
 p_5.line(source=source_6, legend_label="Energia Utracona", color="blue")
 
+# Decymacja do najwyżej 1000 punktów na linię; przybliżenie wykresu doczytuje widoczny fragment.
+# Źródło -> (kolumny wyniku symulacji, przebieg: 0 - PI / 1 - rozmyty, kolumna pliku .npy)
+downsamplers = [
+    (ZoomDownsampler(p, source), "time", "temperatura_piekarnik", 0, "y"),
+    (ZoomDownsampler(p_1, source_2), "time", "temperatura_strata", 0, "loss"),
+    (ZoomDownsampler(p_1, source_3), "time", "wartosc_sterujaca", 0, "u"),
+    (ZoomDownsampler(p_4, source_4), "times_fuzzy", "temperatures_fuzzy", 1, "y"),
+    (ZoomDownsampler(p_5, source_5), "times_fuzzy", "power_fuzzy", 1, "u"),
+    (ZoomDownsampler(p_5, source_6), "times_fuzzy", "Q_lost", 1, "loss"),
+]
 
-def chart_update():
-    global time, temperatura_piekarnik, temperatura_grzalka, temperatura_strata, wartosc_sterujaca, T_grzalka
 
+@instrumentation.timed("ui.push")
+def show_result(wynik):
+    # Aktualizacja danych na wykresach (wywoływane w wątku dokumentu po zakończeniu symulacji)
+    run_ids = wynik.get("run_ids")
+    for ds, x, y, przebieg, kolumna in downsamplers:
+        if przebieg == 0 and live.running:
+            continue  # wykresy PI są zasilane przez tryb na żywo
+        if run_ids is not None:
+            ds.set_run(run_ids[przebieg], kolumna)  # pliki .npy zapisanego przebiegu (mmap)
+        else:
+            ds.set_data(wynik[x], wynik[y])
+
+
+def show_busy(zajety):
+    button.label = "Obliczanie..." if zajety else "Wygeneruj grafy"
+
+
+# Symulacja w puli procesów - callback nie blokuje serwera, kolejne zmiany suwaków zastępują poprzednie
+runner = SimulationRunner(curdoc(), oven_pi_fuzzy, show_result, on_busy=show_busy)
+
+
+def chart_update():
     # Parametry regulatora PI
     Kp = slider_kp.value  # Wzmocnienie regulatora
     Ti = slider_Ti.value  # Czas zdwojenia
-    skumulowany_uchyb = 0  # Skumulowany uchyb
-
-    time, temperatura_piekarnik, temperatura_grzalka, temperatura_strata, wartosc_sterujaca, times_fuzzy, temperatures_fuzzy, power_fuzzy, Q_lost = [
-    ], [], [], [], [], [], [], [], []
 
     # Parametry symulacji
-    T = T_otoczenia  # Początkowa temperatura piekarnika (°C)
     T_docelowa = slider_T_zadane.value  # Docelowa temperatura (°C)
     delta_t = 1  # Krok czasowy (s)
-    sim_time = 200  # Czas symulacji (s)v
-
-    # Symulacja zwykły PI
-    for i in range(0, sim_time):
-        if i == 100:
-            T -= 30
-        T, skumulowany_uchyb, T_utracone, P = update_temperature_PI(
-            T, T_docelowa, k, T_otoczenia, cp, delta_t, skumulowany_uchyb, Kp, Ti)
-        time.append(i)
-        temperatura_piekarnik.append(T)
-        temperatura_strata.append(T_utracone)
-        wartosc_sterujaca.append(P)
-        print(
-            f"Czas: {i}s, Temperatura: {T:.2f}°C")
-
-    # Symulacja PI Rozmyty
-    FS = create_fuzzy_pi()
-    times_fuzzy, temperatures_fuzzy, power_fuzzy, Q_lost = simulate_oven(
-        FS, T_docelowa, T_otoczenia, P_max, k, cp, delta_t, sim_time)
-
-    # Aktualizacja danych na wykresach
-    source.data = dict(x=time, y=temperatura_piekarnik)
-    source_2.data = dict(x=time, y=temperatura_strata)
-    source_3.data = dict(x=time, y=wartosc_sterujaca)
-    source_4.data = dict(x=times_fuzzy, y=temperatures_fuzzy)
-    source_5.data = dict(x=times_fuzzy, y=power_fuzzy)
-    source_6.data = dict(x=times_fuzzy, y=Q_lost)
-    save_to_db(time, temperatura_piekarnik, wartosc_sterujaca)
+    sim_time = 200  # Czas symulacji (s)
+
+    runner.request(Kp, Ti, T_docelowa, delta_t, sim_time)
+
+
+# Tryb na żywo: piekarnik z PI liczony krok po kroku, do wykresów trafiają tylko nowe próbki
+# (10 aktualizacji/s, 1 s symulacji na aktualizację, okno 600 ostatnich próbek)
+live = LiveStream(curdoc(), None, dict(y=source, Q_utracone=source_2, P=source_3), T_docelowa,
+                  rate=10, steps_per_tick=1, rollover=600)
+
+show_result(wynik)
+
+
+def live_toggle(active):
+    if active:
+        live.loop = ClosedLoop(PI(slider_kp.value, slider_Ti.value, delta_t),
+                               OvenLumped(k, T_otoczenia, cp, P_max, delta_t))
+        live.setpoint = slider_T_zadane.value
+        for ds, *_ in downsamplers[:3]:
+            ds.set_data(None, None)  # przybliżanie nie podmienia danych na żywo
+        live.start()
+    else:
+        live.stop()
+        chart_update()  # wykresy PI wracają do pełnego przebiegu (z przybliżaniem) dla bieżących nastaw
+
+
+def slider_changed(attr, old, new):
+    if live.running:
+        # Zmiana nastaw i temperatury zadanej w trakcie pracy, bez restartu symulacji
+        live.loop.controller.Kp = slider_kp.value
+        live.loop.controller.Ti = slider_Ti.value
+        live.setpoint = slider_T_zadane.value
+    else:
+        chart_update()
 
 
 slider_T_zadane.js_on_change("value", CustomJS(args=dict(line=horizontal_line), code="""
@@ -238,9 +200,14 @@ button = Button(label="Wygeneruj grafy",
                 button_type="danger")
 
 button.on_click(chart_update)
+for slider in sliders_list:
+    slider.on_change("value", slider_changed)
+
+live_button = Toggle(label="Na żywo", button_type="success")
+live_button.on_click(live_toggle)
 
 
-page = layout([row(button, slider_T_zadane, slider_Ti, slider_kp),
+page = layout([row(button, live_button, slider_T_zadane, slider_Ti, slider_kp),
               row(column(p), column(p_1)),
               row(column(p_4), column(p_5))])
 
@@ -0,0 +1,73 @@
+from oven_model import k, T_otoczenia, cp, P_max
+from control import ClosedLoop, PI, FuzzyPI, OvenLumped, make_loop
+from compare import compare_loops
+from db_store import save_run
+from trajectory_store import write_trajectory
+
+""" OPIS
+Symulacje wywoływane przez aplikacje Bokeh (Grzalka_copy.py, Grzalka.py) przez async_backend.
+Funkcje są w osobnym module, żeby mogły być wykonane w procesie z puli, i zwracają gotowe
+kolumny dla ColumnDataSource.
+"""
+
+_kernel = None
+
+
+def _fuzzy_kernel():
+    # Jedno jądro regulatora rozmytego na proces (budowa tablic reguł tylko raz)
+    global _kernel
+    if _kernel is None:
+        from fuzzy_kernel import FuzzyKernel
+        _kernel = FuzzyKernel()
+    return _kernel
+
+
+def save_to_db(T, temperature, u, loss, controller, T_docelowa, Kp=None, Ti=None):
+    # Dopisuje przebieg jako nowy run (poprzednie przebiegi zostają w bazie)
+    run_id = save_run(controller, "oven", T, temperature, u, loss, setpoint=T_docelowa, kp=Kp, ti=Ti,
+                      params=dict(k=k, T_otoczenia=T_otoczenia, cp=cp, P_max=P_max))
+    # Kopia kolumnowa (.npy) do szybkiego odczytu przez wykresy
+    write_trajectory(run_id, t=T, y=temperature, u=u, loss=loss, meta=dict(controller=controller))
+    return run_id
+
+
+def oven_pi_fuzzy(Kp, Ti, T_docelowa, delta_t=1, sim_time=200, save=True):
+    """
+    Piekarnik z regulatorem PI i rozmytym PI (Grzalka_copy.py), z zapisem obu przebiegów do bazy.
+
+    Returns:
+        dict: Kolumny wykresów: time, temperatura_piekarnik, temperatura_strata, wartosc_sterujaca (PI)
+            oraz times_fuzzy, temperatures_fuzzy, power_fuzzy, Q_lost (rozmyty); przy save=True także
+            run_ids - (id przebiegu PI, id przebiegu rozmytego).
+    """
+    # Oba regulatory w jednym przebiegu na identycznych piekarnikach (compare.py), zakłócenie -30°C w t = 100 s;
+    # regulator rozmyty przez jądro NumPy (fuzzy_kernel.py) - te same wyniki co FS.inference()
+    loops = dict(PI=ClosedLoop(PI(Kp, Ti, delta_t), OvenLumped(k, T_otoczenia, cp, P_max, delta_t)),
+                 fuzzy=ClosedLoop(FuzzyPI(_fuzzy_kernel()), OvenLumped(k, T_otoczenia, cp, P_max, delta_t)))
+    # sim_time i chwila zakłócenia w sekundach, compare_loops liczy w krokach delta_t
+    c = compare_loops(loops, int(round(sim_time / delta_t)), T_docelowa,
+                      disturbances={int(round(100 / delta_t)): -30}, with_metrics=False)
+
+    wynik = dict(time=c["t"], temperatura_piekarnik=c["PI.y"], temperatura_strata=c["PI.Q_utracone"],
+                 wartosc_sterujaca=c["PI.P"], times_fuzzy=c["t"], temperatures_fuzzy=c["fuzzy.y"],
+                 power_fuzzy=c["fuzzy.P"], Q_lost=c["fuzzy.Q_utracone"])
+    if save:
+        # Identyfikatory przebiegów - wykresy doczytują z plików .npy fragmenty przy przybliżaniu
+        wynik["run_ids"] = (
+            save_to_db(c["t"], c["PI.y"], c["PI.P"], c["PI.Q_utracone"], "PI", T_docelowa, Kp, Ti),
+            save_to_db(c["t"], c["fuzzy.y"], c["fuzzy.P"], c["fuzzy.Q_utracone"], "fuzzy", T_docelowa))
+    return wynik
+
+
+def heater_pi(Kp, Ki, T_docelowa, delta_t=1, sim_time=400):
+    """
+    Piekarnik z grzałką jako drugim stanem i regulatorem PI (Grzalka.py).
+
+    Returns:
+        dict: Kolumny wykresów: time, temperatura_piekarnik, temperatura_grzalka, temperatura_strata,
+            wartosc_sterujaca.
+    """
+    loop = make_loop("heater", "pi", dt=delta_t, Kp=Kp, Ti=Ki)
+    wynik = loop.run(int(sim_time / delta_t), T_docelowa)
+    return dict(time=wynik["t"], temperatura_piekarnik=wynik["y"], temperatura_grzalka=wynik["T_grzalka"],
+                temperatura_strata=wynik["T_utracone"], wartosc_sterujaca=wynik["P"])
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import instrumentation
+
+""" OPIS
+Symulacje poza pętlą zdarzeń serwera Bokeh.
+
+Callback Bokeh wykonuje się w wątku serwera - długa symulacja w chart_update blokowała wszystkie
+podłączone sesje. SimulationRunner:
+- opóźnia start (debounce) - przy przesuwaniu suwaka liczy się tylko ostatnia wartość,
+- wysyła symulację do wspólnej puli procesów (executor()),
+- pomija wyniki nieaktualne: jeśli w trakcie obliczeń przyszło nowe żądanie, wynik starego jest
+  odrzucany, a nowe startuje zaraz po nim (najwyżej jedna symulacja sesji w puli naraz),
+- oddaje wynik do dokumentu przez doc.add_next_tick_callback - zmiany w ColumnDataSource
+  są wykonywane w wątku serwera, z blokadą dokumentu.
+
+Funkcja symulacji musi być zdefiniowana w importowalnym module (np. app_jobs.py), a nie w skrypcie
+aplikacji Bokeh, bo jest przekazywana do procesu z puli.
+"""
+
+_executor = None
+
+
+def executor(max_workers=None):
+    # Jedna pula procesów na serwer, współdzielona przez wszystkie sesje
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+    return _executor
+
+
+class SimulationRunner:
+    """
+    Uruchamia simulate(*args) w puli procesów i przekazuje wynik do on_result(wynik) w wątku dokumentu.
+
+    Args:
+        doc: Dokument Bokeh sesji (curdoc()).
+        simulate: Funkcja symulacji (z importowalnego modułu).
+        on_result: Funkcja aktualizująca wykresy wynikiem symulacji.
+        delay (int): Opóźnienie startu w ms od ostatniego żądania (debounce).
+        on_busy: Opcjonalna funkcja (bool) - np. blokada przycisku w trakcie obliczeń.
+        pool: Executor (domyślnie wspólna pula procesów).
+    """
+
+    def __init__(self, doc, simulate, on_result, delay=300, on_busy=None, pool=None):
+        self.doc, self.simulate, self.on_result = doc, simulate, on_result
+        self.delay, self.on_busy = delay, on_busy
+        self.pool = pool
+        self.generation = 0  # numer ostatniego żądania
+        self.args = ()
+        self.timeout = None
+        self.future = None
+        self.pending = False  # przyszło nowe żądanie w trakcie obliczeń
+        self.submitted = 0.0  # czas wysłania symulacji do puli (pomiary instrumentation)
+
+    def request(self, *args, delay=None):
+        """Zleca symulację z argumentami args; poprzednie, jeszcze nieobliczone żądania są porzucane."""
+        self.generation += 1
+        self.args = args
+        if self.timeout is not None:
+            try:
+                self.doc.remove_timeout_callback(self.timeout)
+            except ValueError:
+                pass  # już wykonany
+        self.timeout = self.doc.add_timeout_callback(self._start, self.delay if delay is None else delay)
+
+    def _start(self):
+        self.timeout = None
+        if self.future is not None and not self.future.done():
+            # Trwa poprzednia symulacja - jeśli jeszcze nie wystartowała, można ją anulować
+            if not self.future.cancel():
+                self.pending = True
+                return
+        self.pending = False
+        generacja = self.generation
+        pula = self.pool or executor()
+        self.submitted = time.perf_counter()
+        self.future = pula.submit(self.simulate, *self.args)
+        if self.on_busy is not None:
+            self.on_busy(True)
+        # Callback future wykonuje się w wątku puli - do dokumentu wracamy przez next tick
+        self.future.add_done_callback(
+            lambda f: self.doc.add_next_tick_callback(partial(self._done, generacja, f)))
+
+    def _done(self, generacja, future):
+        if future is not self.future:
+            return  # zastąpiona przez nowszą
+        if self.pending:
+            self._start()
+            return
+        if self.on_busy is not None:
+            self.on_busy(False)
+        if instrumentation.enabled and not future.cancelled():
+            # Kolejka w puli + symulacja + przesłanie wyniku między procesami
+            instrumentation.record("simulation.roundtrip", time.perf_counter() - self.submitted)
+        if future.cancelled() or generacja != self.generation:
+            return
+        blad = future.exception()
+        if blad is not None:
+            traceback.print_exception(type(blad), blad, blad.__traceback__, file=sys.stderr)
+            return
+        self.on_result(future.result())
@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("MPLBACKEND", "Agg")  # fuzzy_2 importuje matplotlib - bez okna
+
+import numpy as np
+
+""" OPIS
+Pomiary wydajności ścieżek symulacji i zapisu, bez serwera Bokeh i bez okna (headless).
+
+Przykłady:
+    python bench.py                          # pomiar, wynik w benchmarks/<commit>.json
+    python bench.py --save-baseline          # pomiar i zapis jako benchmarks/baseline.json
+    python bench.py --max-slowdown 1.25      # błąd (kod 1), gdy coś jest >25% wolniejsze od bazowego
+    python bench.py --filter tank --quick    # tylko wybrane pomiary, mniejsze rozmiary
+
+Każdy pomiar to najlepszy z --repeat czasów i przepustowość (operacji/s, np. kroków lub wierszy).
+Porównanie z bazowym wynikiem dotyczy tylko pomiarów o tej samej nazwie (nazwa zawiera rozmiar).
+speedups - przyspieszenia wyliczane z par pomiarów, np. oven_batch_vs_scalar: oven_batch.simulate_pi_batch
+dla 10 000 konfiguracji oven_batch.sample_configs wobec pętli skalarnej na 500 z nich (200 kroków każda).
+Zapis i odczyt mierzone są na funkcjach, z których korzystają save_to_db / load_from_db
+(db_store.save_run, db_store.load_run, trajectory_store), w bazie tymczasowej.
+"""
+
+# Obok skryptu, niezależnie od katalogu roboczego (wyniki <commit>.json są w .gitignore, baseline.json nie)
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+baseline_file = os.path.join(results_dir, "baseline.json")
+
+
+def _time(fn, repeat):
+    najlepszy = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        najlepszy = min(najlepszy, time.perf_counter() - start)
+    return najlepszy
+
+
+def bench_pi_step(n):
+    from oven_model import update_temperature_PI, k, T_otoczenia, cp
+
+    def run():
+        T, suma = T_otoczenia, 0
+        for _ in range(n):
+            T, suma, _, _ = update_temperature_PI(T, 200, k, T_otoczenia, cp, 1, suma, 0.001, 5)
+    return run
+
+
+def bench_closed_loop(plant, controller, n):
+    import control
+
+    def run():
+        control.make_loop(plant, controller).run(n, control.plant_defaults[plant]["setpoint"])
+    return run
+
+
+def bench_fuzzy(n, inference):
+    from fuzzy_2 import create_fuzzy_pi, simulate_oven
+    from oven_model import k, T_otoczenia, cp, P_max
+    FS = create_fuzzy_pi()
+    if inference == "kernel":
+        from fuzzy_kernel import FuzzyKernel
+        funkcja = FuzzyKernel()
+    elif inference == "surface":
+        from fuzzy_surface import compile_surface
+        funkcja = compile_surface()  # kompilacja (lub odczyt fuzzy_cache) poza mierzonym czasem
+    else:
+        funkcja = None  # FS.inference() z simpful
+
+    def run():
+        simulate_oven(FS, 200, T_otoczenia, P_max, k, cp, 1, n, inference=funkcja)
+    return run
+
+
+def bench_oven_batch(n):
+    from oven_batch import simulate_pi_batch, sample_configs
+    Kp, Ti, T_zadane = sample_configs(n)
+
+    def run():
+        simulate_pi_batch(Kp, Ti, T_zadane)
+    return run
+
+
+def bench_oven_scalar(n):
+    # Te same konfiguracje co oven_batch, pętla skalarna (oven_batch.simulate_pi_scalar) po kolei
+    from oven_batch import simulate_pi_scalar, sample_configs
+    Kp, Ti, T_zadane = sample_configs(n)
+
+    def run():
+        for i in range(n):
+            simulate_pi_scalar(Kp[i], Ti[i], T_zadane[i])
+    return run
+
+
+def bench_tank(n):
+    from tank_model import TankPID
+
+    def run():
+        TankPID().run(n, 3)
+    return run
+
+
+def bench_db(n, katalog, operacja):
+    import db_store
+    sciezka = os.path.join(katalog, f"bench_{operacja}_{n}.db")
+    t = np.arange(n, dtype=float)
+    y = np.sin(t / 100)
+    if operacja == "load":
+        run_id = db_store.save_run("PI", "oven", t, y, y, y, path=sciezka)
+
+    def run():
+        if operacja == "save":
+            db_store.save_run("PI", "oven", t, y, y, y, path=sciezka)
+        else:
+            db_store.load_run(run_id, path=sciezka)
+    return run
+
+
+def bench_trajectory(n, katalog, operacja):
+    from trajectory_store import write_trajectory, source_data
+    t = np.arange(n, dtype=float)
+    y = np.sin(t / 100)
+    if operacja == "load":
+        write_trajectory(1, katalog, t=t, y=y, u=y, loss=y)
+
+    def run():
+        if operacja == "save":
+            write_trajectory(1, katalog, t=t, y=y, u=y, loss=y)
+        else:
+            dane = source_data(1, root=katalog)
+            np.asarray(dane["y"]).sum()  # faktyczny odczyt stron z dysku
+    return run
+
+
+def bench_bokeh_payload(n, decimate):
+    from bokeh.embed import json_item
+    from bokeh.models import ColumnDataSource
+    from bokeh.plotting import figure
+    from downsample import decimate as zmniejsz
+    t = np.arange(n, dtype=float)
+    y = np.sin(t / 100)
+    source = ColumnDataSource(data=dict(x=[], y=[]))
+    p = figure()
+    p.line(source=source)
+
+    def run():
+        # Podmiana danych i serializacja wykresu - to, co serwer wysyła do przeglądarki
+        x_, y_ = zmniejsz(t, y, 1000) if decimate else (t, y)
+        source.data = dict(x=x_, y=y_)
+        json.dumps(json_item(p))
+    return run
+
+
+def benchmarks(katalog, quick=False):
+    # Nazwa -> (fabryka funkcji mierzonej, liczba operacji na wywołanie)
+    duze = (1_000, 10_000) if quick else (1_000, 10_000, 100_000, 1_000_000)
+    lista = {
+        "pi_step[100000]": (lambda: bench_pi_step(100_000), 100_000),
+        "closed_loop_oven_pi[100000]": (lambda: bench_closed_loop("oven", "pi", 100_000), 100_000),
+        "closed_loop_heater_pi[100000]": (lambda: bench_closed_loop("heater", "pi", 100_000), 100_000),
+        "fuzzy_simpful[5]" if quick else "fuzzy_simpful[20]":
+            (lambda: bench_fuzzy(5 if quick else 20, "simpful"), 5 if quick else 20),
+        "fuzzy_kernel[2000]": (lambda: bench_fuzzy(2000, "kernel"), 2000),
+        "fuzzy_surface[2000]": (lambda: bench_fuzzy(2000, "surface"), 2000),
+        "oven_batch[10000x200]": (lambda: bench_oven_batch(10_000), 10_000 * 200),
+        "oven_scalar[500x200]": (lambda: bench_oven_scalar(500), 500 * 200),
+    }
+    for n in (1_000, 10_000, 100_000) if quick else (1_000, 10_000, 100_000, 1_000_000):
+        lista[f"tank_pid[{n}]"] = (lambda n=n: bench_tank(n), n)
+    for n in duze:
+        for operacja in ("save", "load"):
+            lista[f"db_{operacja}[{n}]"] = (lambda n=n, o=operacja: bench_db(n, katalog, o), n)
+            lista[f"npy_{operacja}[{n}]"] = (
+                lambda n=n, o=operacja: bench_trajectory(n, os.path.join(katalog, f"npy_{n}"), o), n)
+    for n in (10_000, 100_000) if quick else (10_000, 100_000, 1_000_000):
+        lista[f"bokeh_payload[{n}]"] = (lambda n=n: bench_bokeh_payload(n, False), n)
+        lista[f"bokeh_payload_decimated[{n}]"] = (lambda n=n: bench_bokeh_payload(n, True), n)
+    return lista
+
+
+# Przyspieszenie = stosunek przepustowości (kroków piekarnika/s) dwóch pomiarów
+speedups = {"oven_batch_vs_scalar": ("oven_batch[10000x200]", "oven_scalar[500x200]")}
+
+
+def speedup_report(wyniki):
+    raport = {}
+    for nazwa, (szybki, wolny) in speedups.items():
+        if szybki in wyniki and wolny in wyniki:
+            raport[nazwa] = wyniki[szybki]["rate"] / wyniki[wolny]["rate"]
+            print(f"{nazwa:36s} {raport[nazwa]:10.0f}x", file=sys.stderr)
+    return raport
+
+
+def commit_id():
+    try:
+        wynik = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        return wynik.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run_benchmarks(filtr=None, repeat=3, quick=False):
+    """
+    Wykonuje pomiary.
+
+    Returns:
+        dict: Nazwa pomiaru -> dict(seconds=najlepszy czas, ops=operacje, rate=operacje/s).
+    """
+    wyniki = {}
+    katalog = tempfile.mkdtemp(prefix="piekarnik_bench_")
+    try:
+        for nazwa, (fabryka, operacje) in benchmarks(katalog, quick).items():
+            if filtr and not any(f in nazwa for f in filtr):
+                continue
+            czas = _time(fabryka(), repeat)
+            wyniki[nazwa] = dict(seconds=czas, ops=operacje, rate=operacje / czas)
+            print(f"{nazwa:36s} {czas * 1000:10.2f} ms {operacje / czas:14.0f} op/s", file=sys.stderr)
+    finally:
+        import db_store
+        db_store.close_all()
+        shutil.rmtree(katalog, ignore_errors=True)
+    return wyniki
+
+
+def compare(wyniki, bazowe, max_slowdown):
+    # Lista (nazwa, krotność spowolnienia) dla pomiarów wolniejszych niż max_slowdown * czas bazowy
+    regresje = []
+    for nazwa, wynik in wyniki.items():
+        if nazwa in bazowe:
+            spowolnienie = wynik["seconds"] / bazowe[nazwa]["seconds"]
+            if spowolnienie > max_slowdown:
+                regresje.append((nazwa, spowolnienie))
+    return regresje
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiary wydajności symulacji i zapisu (headless)")
+    parser.add_argument("--filter", action="append", default=None, metavar="TEKST",
+                        help="tylko pomiary zawierające TEKST w nazwie (można powtarzać)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="mniejsze rozmiary (bez 1e6 wierszy)")
+    parser.add_argument("--baseline", default=baseline_file, help="plik wyników bazowych")
+    parser.add_argument("--save-baseline", action="store_true", help="zapisz wynik jako bazowy")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="dopuszczalna krotność czasu bazowego (domyślnie 1.25)")
+    parser.add_argument("--output", default=None, help="plik wyniku (domyślnie benchmarks/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    wyniki = run_benchmarks(args.filter, args.repeat, args.quick)
+    commit = commit_id()
+    raport = dict(commit=commit, created_at=time.strftime("%Y-%m-%dT%H:%M:%S"), python=platform.python_version(),
+                  machine=platform.machine(), processor=platform.processor(), numpy=np.__version__,
+                  results=wyniki, speedups=speedup_report(wyniki))
+    os.makedirs(results_dir, exist_ok=True)
+    sciezki = [args.output or os.path.join(results_dir, f"{commit}.json")]
+    if args.save_baseline:
+        sciezki.append(args.baseline)
+    for sciezka in sciezki:
+        with open(sciezka, "w", encoding="utf-8") as f:
+            json.dump(raport, f, indent=2)
+        print(f"Zapisano {sciezka}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        bazowe = json.load(f)
+    regresje = compare(wyniki, bazowe["results"], args.max_slowdown)
+    for nazwa, spowolnienie in regresje:
+        print(f"REGRESJA {nazwa}: {spowolnienie:.2f}x wolniej niż {bazowe.get('commit')}")
+    if regresje:
+        return 1
+    print(f"Bez regresji względem {bazowe.get('commit')} (próg {args.max_slowdown}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,6 @@
 import sqlite3
+import time
+import retention
 
 # Połączenie z bazą danych
 conn = sqlite3.connect("PID_simulation.db")
@@ -6,8 +8,13 @@ conn = sqlite3.connect("PID_simulation.db")
 # Utwórz kursor, który wykonuje zapytania
 cursor = conn.cursor()
 
-# Zapytanie SELECT
-query = "SELECT * FROM simulation_data;"
+# Lista zapisanych przebiegów
+cursor.execute("SELECT * FROM runs ORDER BY id;")
+for row in cursor.fetchall():
+    print(row)
+
+# Próbki ostatniego przebiegu (odczyt po kluczu run_id, bez przeglądania całej tabeli)
+query = "SELECT * FROM samples WHERE run_id = (SELECT MAX(id) FROM runs) ORDER BY t;"
 cursor.execute(query)
 
 # Pobranie wszystkich wyników
@@ -19,3 +26,13 @@ for row in results:
 
 # Zamknięcie połączenia
 conn.close()
+
+# Ostatnia doba historii temperatur - poziom (surowe / minutowe / godzinowe) dobrany do zakresu
+try:
+    poziom, historia = retention.load_history("temperature_history", time.time() - 86400, time.time())
+    print(poziom, len(historia["t"]), "punktów")
+    for wiersz in zip(historia["t"], historia["measured_temp"], historia["measured_temp_min"],
+                      historia["measured_temp_max"]):
+        print(wiersz)
+except ValueError as blad:
+    print(blad)
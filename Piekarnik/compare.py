@@ -0,0 +1,181 @@
+import argparse
+import sys
+import numpy as np
+import control
+import metrics
+
+""" OPIS
+Porównanie kilku regulatorów na identycznych kopiach obiektu w jednym przebiegu (krok po kroku, razem).
+
+Grzalka_copy.py liczył PI i regulator rozmyty po kolei, każdy z własnymi listami wyników, a każde
+porównanie wymagało K osobnych symulacji i wykresów. compare_loops:
+- wartość zadaną (stała lub profil) i szum pomiaru przygotowuje raz jako tablice (steps,) wspólne dla wszystkich,
+- w każdym kroku przesuwa wszystkie układy o jeden krok z tym samym zakłóceniem i tym samym szumem,
+- w tym samym przejściu liczy wskaźniki jakości (metrics.StepMetrics) każdego regulatora - przy profilu
+  względem bieżącej wartości zadanej (narastanie i przeregulowanie względem końcowej),
+- zwraca jeden wynik kolumnowy wyrównany w czasie: t, setpoint oraz "<nazwa>.y", "<nazwa>.u",
+  "<nazwa>.<wielkość z plant.recorded>" (np. "PI.P", "fuzzy.Q_utracone").
+
+Szum (noise > 0) to szum pomiaru: regulator widzi y + szum, obiekt i wskaźniki - prawdziwe y.
+Ziarno seed daje te same próbki szumu przy każdym porównaniu.
+
+Przykład:
+    python compare.py --plant oven --controller pi:Kp=0.0005,Ti=10 --controller pi:Kp=0.002,Ti=30 --controller fuzzy
+"""
+
+
+def compare_loops(loops, steps, setpoint, disturbances=None, noise=0.0, seed=0, with_metrics=True, schedule=None):
+    """
+    Przesuwa układy regulacji razem, krok po kroku, przy wspólnych wejściach.
+
+    Args:
+        loops (dict): Nazwa -> control.ClosedLoop; obiekty powinny mieć te same parametry i stan początkowy.
+        steps (int): Liczba kroków.
+        setpoint (float | array): Wartość zadana, stała lub profil (steps,).
+        disturbances (dict | None): Skokowe zmiany y przed krokiem: {krok: zmiana}, wspólne dla wszystkich.
+        noise (float): Odchylenie standardowe szumu pomiaru (0 - bez szumu).
+        seed (int): Ziarno generatora szumu.
+        schedule (dict | None): Parametry obiektów zmienne w czasie {nazwa: (steps,)} (scenario.py).
+
+    Returns:
+        dict: Kolumny (tablice NumPy długości steps) oraz przy with_metrics klucz "metrics":
+            nazwa -> wskaźniki jakości (klucze jak w metrics.names).
+    """
+    nazwy = list(loops)
+    pierwszy = loops[nazwy[0]]
+    start = pierwszy.i
+    dt = pierwszy.plant.dt
+    zadane_tab = np.broadcast_to(np.asarray(setpoint, dtype=float), (steps,))
+    zadane = zadane_tab.tolist()
+    szum = (np.random.default_rng(seed).normal(0.0, noise, steps) if noise else np.zeros(steps)).tolist()
+    zaklocenia = disturbances or {}
+    t_zakl = (min(zaklocenia) - start) * dt if zaklocenia else None
+
+    # Na każdy układ: metody kroków, listy wyników i wskaźniki - prealokowane jak w ClosedLoop.run
+    uklady = []
+    for nazwa in nazwy:
+        loop = loops[nazwa]
+        plant = loop.plant
+        recorded = getattr(plant, "recorded", ())
+        kolumny = dict(y=[0.0] * steps, u=[0.0] * steps)
+        kolumny.update((r, [0.0] * steps) for r in recorded)
+        wskazniki = metrics.StepMetrics(zadane[-1], plant.y, dt, t_zakl) if with_metrics and steps else None
+        plant_step = control.scheduled(plant.step, plant, schedule) if schedule else plant.step
+        uklady.append((loop.controller.step, plant_step, plant, kolumny, list(recorded), wskazniki))
+
+    for n in range(steps):
+        zmiana = zaklocenia.get(start + n) if zaklocenia else None
+        w, s = zadane[n], szum[n]
+        for controller_step, plant_step, plant, kolumny, recorded, wskazniki in uklady:
+            if zmiana is not None:
+                plant.y += zmiana
+            u_n = controller_step(w - (plant.y + s))
+            y_n = plant_step(u_n)
+            kolumny["y"][n] = y_n
+            kolumny["u"][n] = u_n
+            for r in recorded:
+                kolumny[r][n] = getattr(plant, r)
+            if wskazniki is not None:
+                wskazniki.update(n * dt, y_n, getattr(plant, "P", 0.0), w)
+
+    wynik = dict(t=np.arange(start, start + steps) * dt, setpoint=np.array(zadane_tab))
+    for nazwa, (_, _, _, kolumny, _, _) in zip(nazwy, uklady):
+        loops[nazwa].i = start + steps
+        wynik.update((f"{nazwa}.{k}", np.array(v)) for k, v in kolumny.items())
+    if with_metrics:
+        wynik["metrics"] = {nazwa: u[5].result() if u[5] is not None else None for nazwa, u in zip(nazwy, uklady)}
+    return wynik
+
+
+def parse_controller(spec):
+    # "pi:Kp=0.001,Ti=10" -> ("pi", {"Kp": 0.001, "Ti": 10.0}); nazwa w wyniku to cała specyfikacja
+    typ, _, reszta = spec.partition(":")
+    params = {}
+    for wpis in filter(None, reszta.split(",")):
+        nazwa, _, wartosc = wpis.partition("=")
+        params[nazwa] = float(wartosc)
+    return typ, params
+
+
+def compare(plant="oven", controllers=("pi", "fuzzy"), steps=None, setpoint=None, disturbances=None, noise=0.0,
+            seed=0, dt=None, integrator=None, plant_params=None, scenario=None):
+    """
+    Porównanie regulatorów zadanych specyfikacjami na kopiach obiektu z make_loop.
+
+    Args:
+        controllers (iterable | dict): Specyfikacje "typ:nastawa=wartość,..." albo dict nazwa -> (typ, nastawy).
+        steps, setpoint, disturbances: Domyślnie z control.plant_defaults[plant].
+        plant_params (dict | None): Parametry obiektu wspólne dla wszystkich kopii.
+        scenario (scenario.Scenario | None): Obiekt, krok, czas, wartość zadana i zdarzenia ze scenariusza.
+
+    Returns:
+        dict: Jak compare_loops.
+    """
+    if not isinstance(controllers, dict):
+        controllers = {spec: parse_controller(spec) for spec in controllers}
+    if scenario is not None:
+        loops = {nazwa: scenario.make_loop(typ, integrator, **nastawy, **(plant_params or {}))
+                 for nazwa, (typ, nastawy) in controllers.items()}
+        return compare_loops(loops, scenario.steps, scenario.setpoint, scenario.disturbances, noise, seed,
+                             schedule=scenario.schedule)
+    domyslne = control.plant_defaults[plant]
+    loops = {nazwa: control.make_loop(plant, typ, dt, integrator, **nastawy, **(plant_params or {}))
+             for nazwa, (typ, nastawy) in controllers.items()}
+    return compare_loops(loops, domyslne["steps"] if steps is None else steps,
+                         domyslne["setpoint"] if setpoint is None else setpoint,
+                         domyslne["disturbances"] if disturbances is None else disturbances, noise, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Porównanie regulatorów na tym samym obiekcie w jednym przebiegu")
+    parser.add_argument("--plant", choices=sorted(control.plant_params), default="oven")
+    parser.add_argument("--controller", action="append", default=None, metavar="TYP[:NASTAWA=WARTOŚĆ,...]",
+                        help="regulator do porównania, np. pi:Kp=0.001,Ti=10 (można powtarzać; domyślnie pi i fuzzy)")
+    parser.add_argument("--steps", type=int, default=None)
+    parser.add_argument("--setpoint", type=float, default=None)
+    parser.add_argument("--noise", type=float, default=0.0, help="odchylenie standardowe szumu pomiaru")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", default=None, metavar="PLIK", help="scenariusz JSON/YAML (scenario.py)")
+    parser.add_argument("--csv", default=None, metavar="PLIK", help="zapisz wyrównane kolumny do PLIK ('-' - stdout)")
+    parser.add_argument("--save", action="store_true", help="zapisz przebieg każdego regulatora do bazy")
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args(argv)
+
+    specs = args.controller or ["pi", "fuzzy"]
+    for spec in specs:
+        typ = parse_controller(spec)[0]
+        if typ not in control.controller_params:
+            parser.error(f"Nieznany regulator: {typ}")
+    try:
+        sc = None
+        if args.scenario is not None:
+            import scenario
+            sc = scenario.load_scenario(args.scenario)
+            args.plant = sc.plant
+        wynik = compare(args.plant, specs, args.steps, args.setpoint, noise=args.noise, seed=args.seed, scenario=sc)
+    except (ValueError, OSError) as blad:
+        parser.error(str(blad))
+
+    wyjscie = sys.stderr if args.csv == "-" else sys.stdout
+    print(f"{'regulator':32s}" + "".join(f"{n:>20s}" for n in metrics.names), file=wyjscie)
+    for spec, wskazniki in wynik["metrics"].items():
+        print(f"{spec:32s}" + "".join(f"{wskazniki[n]:20.6g}" for n in metrics.names), file=wyjscie)
+
+    if args.csv is not None:
+        nazwy = [n for n in wynik if n != "metrics"]
+        np.savetxt(sys.stdout if args.csv == "-" else args.csv, np.column_stack([wynik[n] for n in nazwy]),
+                   delimiter=",", fmt="%.10g", header=",".join(nazwy), comments="")
+    if args.save:
+        import db_store
+        for spec in specs:
+            typ, nastawy = parse_controller(spec)
+            gain = control.gains(typ, nastawy)
+            run_id = db_store.save_run(control.controller_labels[typ], args.plant, wynik["t"],
+                                       wynik[f"{spec}.y"], wynik[f"{spec}.u"], wynik.get(f"{spec}.Q_utracone"),
+                                       setpoint=float(wynik["setpoint"][0]), kp=gain[0], ti=gain[1], td=gain[2],
+                                       metrics=wynik["metrics"][spec], path=args.db or db_store.db_path)
+            print(f"{spec}: zapisano przebieg {run_id}", file=wyjscie)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import numpy as np
+from math import sqrt
+import instrumentation
+import oven_model
+import tank_model
+
+""" OPIS
+Wspólna biblioteka regulatorów i obiektów sterowania z jednym interfejsem:
+- regulator: step(uchyb) -> sterowanie
+- obiekt: step(sterowanie) -> wielkość regulowana y (temperatura lub poziom wody)
+- ClosedLoop(regulator, obiekt): step(wartość zadana) oraz run(n, wartość zadana) -> tablice NumPy
+
+Klasy mają __slots__ (mały, stały układ pól zamiast słownika atrybutów), a stan jest
+trzymany w obiektach zamiast w zmiennych globalnych modyfikowanych z chart_update.
+Obiekty mają też postać ciągłą (state, set_state, record, rhs) do całkowania RK4 / adaptacyjnego
+między krokami regulatora (integrators.Integrated).
+Wzory odpowiadają skryptom:
+- PI + OvenLumped: update_temperature_PI z Grzalka_copy.py (oven_model.py)
+- PI(u_max=P_max) + OvenHeater: update_temperature_PI z Grzalka.py (grzałka jako drugi stan)
+- PID + Tank: pętla zbiornika z BokehMain.py (tank_model.py)
+- FuzzyPI + OvenLumped: simulate_oven z fuzzy_2.py
+Wyjście każdego regulatora z make_loop jest ograniczone do zakresu sterowania obiektu (plant_inputs):
+u w [0, 1] dla OvenLumped, moc grzałki w [0, P_max] kW dla OvenHeater, [u_min, u_max] dla Tank.
+"""
+
+
+class PI:
+    """Regulator PI z ograniczeniem wyjścia do [u_min, u_max] (Grzalka_copy.py, Grzalka.py)."""
+    __slots__ = ("Kp", "Ti", "dt", "u_min", "u_max", "suma")
+
+    def __init__(self, Kp, Ti, dt=1, u_min=0, u_max=1):
+        self.Kp, self.Ti, self.dt = Kp, Ti, dt
+        self.u_min, self.u_max = u_min, u_max
+        self.reset()
+
+    def reset(self):
+        self.suma = 0  # skumulowany uchyb
+
+    def step(self, e):
+        self.suma += e * self.dt
+        return max(self.u_min, min(self.Kp * (e + ((self.dt / self.Ti) * self.suma)), self.u_max))
+
+
+class PID:
+    """Regulator PID zbiornika (BokehMain.py); człon P używa uchybu z poprzedniego kroku jak oryginał."""
+    __slots__ = ("kp", "t_i", "t_d", "t_p", "u_min", "u_max", "suma", "e_prev")
+
+    def __init__(self, kp=tank_model.kp, t_i=tank_model.t_i, t_d=tank_model.t_d, t_p=tank_model.t_p,
+                 u_min=tank_model.u_min, u_max=tank_model.u_max):
+        self.kp, self.t_i, self.t_d, self.t_p = kp, t_i, t_d, t_p
+        self.u_min, self.u_max = u_min, u_max
+        self.reset()
+
+    def reset(self):
+        self.suma = 0.0
+        self.e_prev = 0.0
+
+    def step(self, e):
+        self.suma += e
+        u = self.kp * (self.e_prev + self.t_p / self.t_i * self.suma + (self.t_d / self.t_p) * (e - self.e_prev))
+        self.e_prev = e
+        return min(self.u_max, max(self.u_min, u))
+
+
+class FuzzyPI:
+    """
+    Przyrostowy regulator rozmyty PI (fuzzy_2.simulate_oven): u += delta_u(e, de), u w [0, 1].
+    Wyjście to u przeskalowane na zakres sterowania obiektu [u_min, u_max].
+    """
+    __slots__ = ("inference", "u_min", "skala", "u", "e_prev")
+
+    def __init__(self, inference=None, u_min=0, u_max=1):
+        if inference is None:
+            from fuzzy_kernel import FuzzyKernel
+            inference = FuzzyKernel()
+        self.inference = inference  # funkcja (error, delta_error) -> delta_u
+        self.u_min, self.skala = u_min, u_max - u_min
+        self.reset()
+
+    def reset(self):
+        self.u = 0
+        self.e_prev = 0
+
+    def step(self, e):
+        de = e - self.e_prev
+        self.e_prev = e
+        self.u = max(0, min(self.u + self.inference(e, de), 1))
+        return self.u_min + self.u * self.skala
+
+
+class OvenLumped:
+    """Piekarnik jako jedna pojemność cieplna, grzałka P = 0.95 * u * P_max (Grzalka_copy.py)."""
+    __slots__ = ("y", "k", "T_otoczenia", "cp", "P_max", "dt", "P", "Q_utracone")
+    recorded = ("P", "Q_utracone")
+
+    def __init__(self, k=oven_model.k, T_otoczenia=oven_model.T_otoczenia, cp=oven_model.cp,
+                 P_max=oven_model.P_max, dt=1, T0=None):
+        self.k, self.T_otoczenia, self.cp, self.P_max, self.dt = k, T_otoczenia, cp, P_max, dt
+        self.y = T_otoczenia if T0 is None else T0  # temperatura piekarnika (°C)
+        self.P = 0
+        self.Q_utracone = 0
+
+    def step(self, u):
+        self.P = 0.95 * u * self.P_max
+        self.Q_utracone = self.k * (self.y - self.T_otoczenia) * self.dt
+        self.y += (self.P * self.dt - self.Q_utracone) / self.cp
+        return self.y
+
+    # Postać ciągła dla integrators.Integrated: dT/dt = (P - k * (T - T_otoczenia)) / cp
+    def state(self):
+        return (self.y,)
+
+    def set_state(self, x):
+        self.y = x[0]
+
+    def record(self, u):
+        self.P = 0.95 * u * self.P_max
+        self.Q_utracone = self.k * (self.y - self.T_otoczenia) * self.dt
+
+    def rhs(self, x, u):
+        return ((0.95 * u * self.P_max - self.k * (x[0] - self.T_otoczenia)) / self.cp,)
+
+
+class OvenHeater:
+    """Piekarnik z grzałką jako drugim stanem (Grzalka.py); sterowanie u to moc grzałki w kW."""
+    __slots__ = ("y", "T_grzalka", "k", "T_otoczenia", "mc", "cooling_rate", "dt", "P", "T_utracone")
+    recorded = ("P", "T_grzalka", "T_utracone")
+
+    def __init__(self, k=0.006, T_otoczenia=20, m=50 / 1000 * 1.2, c=1.2, cooling_rate=0.0012, dt=1, T0=None):
+        self.k, self.T_otoczenia, self.mc, self.cooling_rate, self.dt = k, T_otoczenia, m * c, cooling_rate, dt
+        self.y = T_otoczenia if T0 is None else T0  # temperatura powietrza (°C)
+        self.T_grzalka = self.y
+        self.P = 0
+        self.T_utracone = 0
+
+    def step(self, u):
+        T, dt = self.y, self.dt
+        self.P = u
+        self.T_utracone = (self.k * (T - self.T_otoczenia) * dt) / self.mc
+        T_grzalka = self.T_grzalka + ((u * dt) - ((self.cooling_rate * (self.T_grzalka - T) * dt) / self.mc))
+        self.T_grzalka = max(T, T_grzalka)
+        self.y = T + (0.15 * (self.T_grzalka - T) - self.T_utracone)
+        return self.y
+
+    # Postać ciągła (współczynnik 0.15 na krok 1 s jako 0.15 1/s), grzałka nie chłodniejsza od powietrza:
+    # dT_grzalka/dt = u - cooling_rate * (T_grzalka - T) / mc
+    # dT/dt = 0.15 * (T_grzalka - T) - k * (T - T_otoczenia) / mc
+    def state(self):
+        return (self.y, self.T_grzalka)
+
+    def set_state(self, x):
+        self.y = x[0]
+        self.T_grzalka = max(x[0], x[1])
+
+    def record(self, u):
+        self.P = u
+        self.T_utracone = (self.k * (self.y - self.T_otoczenia) * self.dt) / self.mc
+
+    def rhs(self, x, u):
+        T, T_grzalka = x[0], max(x[0], x[1])
+        return (0.15 * (T_grzalka - T) - self.k * (T - self.T_otoczenia) / self.mc,
+                u - self.cooling_rate * (T_grzalka - T) / self.mc)
+
+
+class Tank:
+    """Zbiornik z wypływem B * sqrt(H), sterowanie u w [u_min, u_max] mapowane na dopływ (BokehMain.py)."""
+    __slots__ = ("y", "A", "B", "h_min", "h_max", "q_min", "q_max", "u_min", "u_max", "dt", "q_d", "q_z")
+    recorded = ("q_d",)
+
+    def __init__(self, A=tank_model.A, B=tank_model.B, h_min=tank_model.h_min, h_max=tank_model.h_max,
+                 q_min=tank_model.q_min, q_max=tank_model.q_max, u_min=tank_model.u_min, u_max=tank_model.u_max,
+                 dt=tank_model.t_p, H0=0):
+        self.A, self.B, self.h_min, self.h_max = A, B, h_min, h_max
+        self.q_min, self.q_max, self.u_min, self.u_max, self.dt = q_min, q_max, u_min, u_max, dt
+        self.y = H0  # wysokość wody (m)
+        self.q_d = 0.0
+        self.q_z = 0.0  # dodatkowy dopływ niezależny od regulatora - zakłócenie (scenario.py), ujemny - pobór
+
+    def step(self, u):
+        self.q_d = (((u - self.u_min) / (self.u_max - self.u_min)) * (self.q_max - self.q_min) + self.q_min)
+        self.y = min(self.h_max, max(self.h_min,
+                                     self.dt * (self.q_d + self.q_z - self.B * sqrt(self.y)) / self.A + self.y))
+        return self.y
+
+    # Postać ciągła: dH/dt = (q_d + q_z - B * sqrt(H)) / A, poziom ograniczony do [h_min, h_max]
+    def state(self):
+        return (self.y,)
+
+    def set_state(self, x):
+        self.y = min(self.h_max, max(self.h_min, x[0]))
+
+    def record(self, u):
+        self.q_d = (((u - self.u_min) / (self.u_max - self.u_min)) * (self.q_max - self.q_min) + self.q_min)
+
+    def rhs(self, x, u):
+        H = min(self.h_max, max(self.h_min, x[0]))
+        dH = ((((u - self.u_min) / (self.u_max - self.u_min)) * (self.q_max - self.q_min) + self.q_min)
+              + self.q_z - self.B * sqrt(max(H, 0.0))) / self.A
+        if (H >= self.h_max and dH > 0) or (H <= self.h_min and dH < 0):
+            return (0.0,)
+        return (dH,)
+
+
+class ClosedLoop:
+    """Układ regulacji: uchyb -> regulator -> obiekt."""
+    __slots__ = ("controller", "plant", "i")
+
+    def __init__(self, controller, plant):
+        self.controller = controller
+        self.plant = plant
+        self.i = 0
+
+    def step(self, setpoint):
+        self.i += 1
+        return self.plant.step(self.controller.step(setpoint - self.plant.y))
+
+    def run(self, n, setpoint, disturbances=None, schedule=None):
+        """
+        Wykonuje n kroków w jednej pętli.
+
+        Args:
+            n (int): Liczba kroków.
+            setpoint (float | array): Wartość zadana, stała lub tablica (n,).
+            disturbances (dict | None): Skokowe zmiany y przed krokiem: {krok: zmiana}, np. {100: -30}.
+            schedule (dict | None): Parametry obiektu zmienne w czasie: {nazwa: tablica (n,)},
+                np. {"T_otoczenia": ..., "k": ...} ze scenariusza (scenario.py).
+
+        Returns:
+            dict: Tablice t, y, u oraz wielkości z plant.recorded (np. P, Q_utracone).
+        """
+        controller_step, plant_step, plant = self.controller.step, self.plant.step, self.plant
+        # Przy wyłączonych pomiarach wrap zwraca te same metody - pętla bez narzutu
+        controller_step = instrumentation.wrap("controller", controller_step)
+        plant_step = instrumentation.wrap("plant", plant_step)
+        if schedule:
+            plant_step = scheduled(plant_step, plant, schedule)
+        zadane = np.broadcast_to(np.asarray(setpoint, dtype=float), (n,)).tolist()
+        zaklocenia = disturbances or {}
+        recorded = getattr(plant, "recorded", ())
+        # Prealokowane listy Pythona - zapis elementu jest tańszy niż do tablicy NumPy w pętli
+        y = [0.0] * n
+        u = [0.0] * n
+        extra = [[0.0] * n for _ in recorded]
+        pary = list(zip(extra, recorded))
+        start = self.i
+
+        for n_ in range(n):
+            if zaklocenia and start + n_ in zaklocenia:
+                plant.y += zaklocenia[start + n_]
+            u_n = controller_step(zadane[n_] - plant.y)
+            y[n_] = plant_step(u_n)
+            u[n_] = u_n
+            for lista, nazwa in pary:
+                lista[n_] = getattr(plant, nazwa)
+
+        self.i = start + n
+        wynik = dict(t=np.arange(start, start + n) * plant.dt, y=np.array(y), u=np.array(u))
+        wynik.update((nazwa, np.array(lista)) for lista, nazwa in pary)
+        return wynik
+
+
+def scheduled(plant_step, plant, schedule):
+    """
+    Krok obiektu, który przed każdym wywołaniem ustawia parametry z kolejnych elementów tablic schedule.
+    Bez schedule pętle wywołują plant.step bezpośrednio - harmonogram nie kosztuje nic, gdy go nie ma.
+    """
+    cel = getattr(plant, "plant", plant)  # integrators.Integrated - parametry są w obiekcie wewnętrznym
+    kolumny = [(nazwa, iter(np.asarray(wartosci).tolist())) for nazwa, wartosci in schedule.items()]
+
+    def krok(u):
+        for nazwa, wartosci in kolumny:
+            setattr(cel, nazwa, next(wartosci))
+        return plant_step(u)
+    return krok
+
+
+# Klasy obiektów dla nazw w make_loop
+plant_classes = dict(oven=OvenLumped, heater=OvenHeater, tank=Tank)
+# Parametry przyjmowane przez regulatory i obiekty w make_loop
+controller_params = {
+    "pi": ("Kp", "Ti", "u_min", "u_max"),
+    "pid": ("kp", "t_i", "t_d", "u_min", "u_max"),
+    "fuzzy": ("u_min", "u_max"),
+}
+# Zakres sterowania obiektu (u_min, u_max) - domyślne ograniczenie wyjścia regulatora w make_loop:
+# piekarnik - współczynnik mocy grzałki, heater - moc grzałki w kW (Grzalka.py), tank - sygnał zaworu
+plant_inputs = dict(oven=(0, 1), heater=(0, 2.5), tank=(tank_model.u_min, tank_model.u_max))
+# Regulatory, których reguły nie pasują do obiektu (uniwersa regulatora rozmytego są w °C)
+unsupported = {("fuzzy", "tank")}
+# Nazwy regulatorów zapisywane w tabeli runs (db_store) - te same we wszystkich skryptach zapisujących
+controller_labels = dict(pi="PI", pid="PID", fuzzy="fuzzy")
+# Nastawy zapisywane w kolumnach kp, ti, td tabeli runs i ich wartości domyślne w make_loop
+gain_names = dict(pi=("Kp", "Ti", None), pid=("kp", "t_i", "t_d"), fuzzy=(None, None, None))
+gain_defaults = dict(Kp=0.0005, Ti=10, kp=tank_model.kp, t_i=tank_model.t_i, t_d=tank_model.t_d)
+plant_params = {
+    "oven": ("k", "T_otoczenia", "cp", "P_max", "T0"),
+    "heater": ("k", "T_otoczenia", "m", "c", "cooling_rate", "T0"),
+    "tank": ("A", "B", "h_min", "h_max", "q_min", "q_max", "H0"),
+}
+# Domyślne parametry symulacji dla obiektu: krok czasowy, liczba kroków, wartość zadana, zakłócenia
+plant_defaults = {
+    "oven": dict(dt=1, steps=200, setpoint=200, disturbances={100: -30}),
+    "heater": dict(dt=1, steps=400, setpoint=200, disturbances={}),
+    "tank": dict(dt=tank_model.t_p, steps=int(15 * 60 / tank_model.t_p), setpoint=3, disturbances={}),
+}
+
+
+def split_params(plant, controller, params):
+    """
+    Dzieli parametry na nastawy regulatora i parametry obiektu (make_loop, control_batch.make_batch_loop).
+    Nastawy dostają domyślny zakres wyjścia z plant_inputs[plant].
+
+    Returns:
+        tuple: (nastawy regulatora, parametry obiektu) jako dict.
+    """
+    if (controller, plant) in unsupported:
+        raise ValueError(f"Regulator {controller} nie jest przystosowany do obiektu {plant}")
+    nieznane = set(params) - set(controller_params[controller]) - set(plant_params[plant])
+    if nieznane:
+        raise ValueError(f"Nieznane parametry dla {controller}/{plant}: {sorted(nieznane)}")
+    c_args = dict(zip(("u_min", "u_max"), plant_inputs[plant]))
+    c_args.update((nazwa, params[nazwa]) for nazwa in controller_params[controller] if nazwa in params)
+    p_args = {nazwa: params[nazwa] for nazwa in plant_params[plant] if nazwa in params}
+    return c_args, p_args
+
+
+def gains(controller, params):
+    """Nastawy (kp, ti, td) regulatora do zapisu w runs: z params lub domyślne, None gdy regulator ich nie ma."""
+    return tuple(None if nazwa is None else params.get(nazwa, gain_defaults[nazwa])
+                 for nazwa in gain_names[controller])
+
+
+def make_loop(plant="oven", controller="pi", dt=None, integrator=None, **params):
+    """
+    Buduje układ regulacji z nazw obiektu i regulatora.
+
+    Args:
+        plant (str): "oven", "heater" lub "tank".
+        controller (str): "pi", "pid" lub "fuzzy".
+        dt (float | None): Krok czasowy regulatora (domyślnie z plant_defaults).
+        integrator (str | dict | None): Całkowanie obiektu między krokami regulatora (integrators.py):
+            None - krok Eulera jak w skryptach, "rk4", "rk45" lub słownik argumentów, np.
+            dict(method="rk4", substeps=4), dict(method="rk45", rtol=1e-8).
+        **params: Nastawy regulatora i parametry obiektu, np. Kp=0.0005, Ti=10, k=0.006.
+
+    Returns:
+        ClosedLoop: Układ gotowy do run().
+    """
+    c_args, p_args = split_params(plant, controller, params)
+    if dt is None:
+        dt = plant_defaults[plant]["dt"]
+
+    if controller == "pi":
+        regulator = PI(c_args.pop("Kp", gain_defaults["Kp"]), c_args.pop("Ti", gain_defaults["Ti"]), dt, **c_args)
+    elif controller == "pid":
+        regulator = PID(t_p=dt, **c_args)
+    else:
+        regulator = FuzzyPI(**c_args)
+
+    obiekt = plant_classes[plant](dt=dt, **p_args)
+    if integrator is not None:
+        from integrators import Integrated
+        opcje = dict(method=integrator) if isinstance(integrator, str) else dict(integrator)
+        obiekt = Integrated(obiekt, **opcje)
+    return ClosedLoop(regulator, obiekt)
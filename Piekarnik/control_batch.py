@@ -0,0 +1,219 @@
+import numpy as np
+import control
+import oven_model
+import tank_model
+
+""" OPIS
+Wsadowe odpowiedniki klas z control.py: N niezależnych układów regulacji jako tablice NumPy (N,).
+Ten sam interfejs co w control.py (regulator: step(uchyb) -> sterowanie, obiekt: step(sterowanie) -> y),
+ale uchyb, sterowanie i stan są tablicami, a nastawy i parametry obiektu mogą być skalarami
+albo tablicami (N,) - np. inne k i cp dla każdego piekarnika (montecarlo.py).
+Wzory i kolejność działań jak w control.py, więc przy parametrach skalarnych każdy z N układów
+daje ten sam przebieg co control.ClosedLoop (regulator rozmyty - z dokładnością do błędów zaokrągleń,
+bo jądro liczy środek ciężkości iloczynem macierzy).
+"""
+
+
+def _param(x, n):
+    # Skalar lub tablica (N,) jako tablica float (N,)
+    return np.broadcast_to(np.asarray(x, dtype=float), (n,))
+
+
+class PIBatch:
+    def __init__(self, n, Kp, Ti, dt=1, u_min=0, u_max=1):
+        self.Kp, self.Ti = _param(Kp, n), _param(Ti, n)
+        self.dt_Ti = dt / self.Ti
+        self.dt, self.u_min, self.u_max = dt, u_min, u_max
+        self.suma = np.zeros(n)
+
+    def step(self, e):
+        self.suma += e * self.dt
+        return np.clip(self.Kp * (e + self.dt_Ti * self.suma), self.u_min, self.u_max)
+
+
+class PIDBatch:
+    def __init__(self, n, kp=tank_model.kp, t_i=tank_model.t_i, t_d=tank_model.t_d, t_p=tank_model.t_p,
+                 u_min=tank_model.u_min, u_max=tank_model.u_max):
+        self.kp, self.t_i, self.t_d = _param(kp, n), _param(t_i, n), _param(t_d, n)
+        self.ti_, self.td_ = t_p / self.t_i, self.t_d / t_p
+        self.t_p, self.u_min, self.u_max = t_p, u_min, u_max
+        self.suma = np.zeros(n)
+        self.e_prev = np.zeros(n)
+
+    def step(self, e):
+        self.suma += e
+        u = self.kp * (self.e_prev + self.ti_ * self.suma + self.td_ * (e - self.e_prev))
+        self.e_prev = e
+        return np.clip(u, self.u_min, self.u_max)
+
+
+class FuzzyPIBatch:
+    def __init__(self, n, kernel=None, u_min=0, u_max=1):
+        if kernel is None:
+            from fuzzy_kernel import FuzzyKernel
+            kernel = FuzzyKernel()
+        self.kernel = kernel  # wektorowe wnioskowanie (error, delta_error) -> delta_u
+        self.u_min, self.skala = u_min, u_max - u_min  # wyjście na zakresie sterowania jak control.FuzzyPI
+        self.u = np.zeros(n)
+        self.e_prev = np.zeros(n)
+
+    def step(self, e):
+        de = e - self.e_prev
+        self.e_prev = e
+        self.u = np.clip(self.u + self.kernel(e, de), 0, 1)
+        return self.u_min + self.u * self.skala
+
+
+class OvenLumpedBatch:
+    recorded = ("P", "Q_utracone")
+
+    def __init__(self, n, k=oven_model.k, T_otoczenia=oven_model.T_otoczenia, cp=oven_model.cp,
+                 P_max=oven_model.P_max, dt=1, T0=None):
+        self.k, self.T_otoczenia, self.cp, self.P_max = (_param(x, n) for x in (k, T_otoczenia, cp, P_max))
+        self.dt = dt
+        self.y = np.array(self.T_otoczenia if T0 is None else _param(T0, n))
+        self.P = np.zeros(n)
+        self.Q_utracone = np.zeros(n)
+
+    def step(self, u):
+        self.P = 0.95 * u * self.P_max
+        self.Q_utracone = self.k * (self.y - self.T_otoczenia) * self.dt
+        self.y = self.y + (self.P * self.dt - self.Q_utracone) / self.cp
+        return self.y
+
+
+class OvenHeaterBatch:
+    """Piekarnik z grzałką jako drugim stanem (control.OvenHeater); sterowanie u to moc grzałki w kW."""
+    recorded = ("P", "T_grzalka", "T_utracone")
+
+    def __init__(self, n, k=0.006, T_otoczenia=20, m=50 / 1000 * 1.2, c=1.2, cooling_rate=0.0012, dt=1, T0=None):
+        self.k, self.T_otoczenia, self.cooling_rate = (_param(x, n) for x in (k, T_otoczenia, cooling_rate))
+        self.mc = _param(m, n) * _param(c, n)
+        self.dt = dt
+        self.y = np.array(self.T_otoczenia if T0 is None else _param(T0, n))
+        self.T_grzalka = self.y.copy()
+        self.P = np.zeros(n)
+        self.T_utracone = np.zeros(n)
+
+    def step(self, u):
+        T, dt = self.y, self.dt
+        self.P = u
+        self.T_utracone = (self.k * (T - self.T_otoczenia) * dt) / self.mc
+        T_grzalka = self.T_grzalka + ((u * dt) - ((self.cooling_rate * (self.T_grzalka - T) * dt) / self.mc))
+        self.T_grzalka = np.maximum(T, T_grzalka)
+        self.y = T + (0.15 * (self.T_grzalka - T) - self.T_utracone)
+        return self.y
+
+
+class TankBatch:
+    recorded = ("q_d",)
+
+    def __init__(self, n, A=tank_model.A, B=tank_model.B, h_min=tank_model.h_min, h_max=tank_model.h_max,
+                 q_min=tank_model.q_min, q_max=tank_model.q_max, u_min=tank_model.u_min, u_max=tank_model.u_max,
+                 dt=tank_model.t_p, H0=0):
+        self.A, self.B = _param(A, n), _param(B, n)
+        self.h_min, self.h_max, self.q_min, self.q_max = h_min, h_max, q_min, q_max
+        self.u_min, self.u_max, self.dt = u_min, u_max, dt
+        self.y = np.array(_param(H0, n))
+        self.q_d = np.zeros(n)
+        self.q_z = 0.0  # dodatkowy dopływ (zakłócenie) jak control.Tank.q_z
+
+    def step(self, u):
+        self.q_d = (((u - self.u_min) / (self.u_max - self.u_min)) * (self.q_max - self.q_min) + self.q_min)
+        self.y = np.clip(self.dt * (self.q_d + self.q_z - self.B * np.sqrt(self.y)) / self.A + self.y,
+                         self.h_min, self.h_max)
+        return self.y
+
+
+class BatchLoop:
+    """N układów regulacji przesuwanych razem: uchyb -> regulator -> obiekt, wszystko jako tablice (N,)."""
+
+    def __init__(self, controller, plant, n):
+        self.controller, self.plant, self.n = controller, plant, n
+        self.i = 0
+
+    def run(self, steps, setpoint, disturbances=None, process_noise=None, measurement_noise=None,
+            observe=None, record=True, schedule=None):
+        """
+        Wykonuje steps kroków wszystkich N układów.
+
+        Args:
+            setpoint (float | array): Wartość zadana: skalar, (N,) albo profil (steps, 1) / (steps, N).
+            disturbances (dict | None): Skokowe zmiany y przed krokiem: {krok: zmiana (skalar lub (N,))}.
+            process_noise (array | None): (steps, N) - dodawane do y obiektu po każdym kroku.
+            measurement_noise (array | None): (steps, N) - dodawane do y widzianego przez regulator.
+            observe (callable | None): observe(krok, y, plant) po każdym kroku - np. redukcje w locie.
+            record (bool | str): Zwracaj pełne przebiegi (N, steps); "y" - tylko y (bez u i plant.recorded),
+                False - tylko stan końcowy w obiekcie.
+            schedule (dict | None): Parametry obiektu zmienne w czasie {nazwa: (steps,)} (control.scheduled).
+
+        Returns:
+            dict | None: t (steps,), y, u oraz plant.recorded jako (N, steps) - widoki transpozycji.
+        """
+        controller_step, plant = self.controller.step, self.plant
+        plant_step = control.scheduled(plant.step, plant, schedule) if schedule else plant.step
+        zadane = np.asarray(setpoint, dtype=float)
+        profil = zadane.ndim == 2
+        zaklocenia = disturbances or {}
+        recorded = plant.recorded if record and record != "y" else ()
+        if record:
+            # Wiersz na krok - ciągły zapis, transpozycja na końcu jest widokiem (jak oven_batch)
+            Y = np.empty((steps, self.n))
+            U = np.empty((steps, self.n)) if record != "y" else None
+            extra = {nazwa: np.empty((steps, self.n)) for nazwa in recorded}
+        start = self.i
+        for n in range(steps):
+            if start + n in zaklocenia:
+                plant.y = plant.y + zaklocenia[start + n]
+            w = zadane[n] if profil else zadane
+            y_pomiar = plant.y if measurement_noise is None else plant.y + measurement_noise[n]
+            u = controller_step(w - y_pomiar)
+            plant_step(u)
+            if process_noise is not None:
+                plant.y = plant.y + process_noise[n]
+            if record:
+                Y[n] = plant.y
+                if U is not None:
+                    U[n] = u
+                for nazwa, tablica in extra.items():
+                    tablica[n] = getattr(plant, nazwa)
+            if observe is not None:
+                observe(n, plant.y, plant)
+        self.i = start + steps
+        if not record:
+            return None
+        wynik = dict(t=np.arange(start, start + steps) * plant.dt, y=Y.T)
+        if U is not None:
+            wynik["u"] = U.T
+        wynik.update((nazwa, tablica.T) for nazwa, tablica in extra.items())
+        return wynik
+
+
+# Wsadowe obiekty dla nazw z control.make_loop
+batch_plants = dict(oven=OvenLumpedBatch, heater=OvenHeaterBatch, tank=TankBatch)
+
+
+def make_batch_loop(n, plant="oven", controller="pi", dt=None, **params):
+    """
+    Buduje N układów regulacji z nazw obiektu i regulatora (jak control.make_loop).
+
+    Args:
+        n (int): Liczba układów.
+        **params: Nastawy i parametry obiektu - skalary lub tablice (N,).
+
+    Returns:
+        BatchLoop: Układy gotowe do run().
+    """
+    if plant not in batch_plants:
+        raise ValueError(f"Brak wersji wsadowej obiektu: {plant}")
+    # Te same kontrole i zakres wyjścia regulatora (control.plant_inputs) co w control.make_loop
+    c_args, p_args = control.split_params(plant, controller, params)
+    if dt is None:
+        dt = control.plant_defaults[plant]["dt"]
+    if controller == "pi":
+        regulator = PIBatch(n, c_args.pop("Kp", 0.0005), c_args.pop("Ti", 10), dt, **c_args)
+    elif controller == "pid":
+        regulator = PIDBatch(n, t_p=dt, **c_args)
+    else:
+        regulator = FuzzyPIBatch(n, **c_args)
+    return BatchLoop(regulator, batch_plants[plant](n, dt=dt, **p_args), n)
@@ -0,0 +1,271 @@
+import contextlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import instrumentation
+
+""" OPIS
+Wspólna warstwa zapisu wyników symulacji do SQLite.
+- jedno połączenie na proces i plik bazy (pula), otwierane przy pierwszym użyciu
+- tryb WAL i dobrane pragmy (zapis nie blokuje odczytu, mniej synchronizacji z dyskiem)
+- zapis wsadowy: executemany w jednej transakcji zamiast INSERT + commit na próbkę
+- wyniki dopisywane jako kolejne przebiegi (runs) zamiast czyszczenia tabeli przy każdym zapisie
+
+Schemat wyników:
+- runs: jeden wiersz na symulację (regulator, obiekt, nastawy, wartość zadana, parametry obiektu, czas)
+- samples: próbki przebiegu kluczowane (run_id, t), tabela WITHOUT ROWID - próbki jednego przebiegu
+  leżą obok siebie w B-drzewie, więc odczyt przebiegu lub okna czasu nie przegląda całej tabeli
+"""
+
+db_path = "PID_simulation.db"
+
+_pragmas = [
+    "PRAGMA auto_vacuum=INCREMENTAL",  # nowa baza: zwalnianie stron po usunięciu danych (retention.py)
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # w trybie WAL bezpieczne, fsync tylko przy checkpoincie
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MB pamięci podręcznej stron
+    "PRAGMA mmap_size=268435456",  # odczyt przez mmap do 256 MB
+    "PRAGMA foreign_keys=ON",  # usunięcie przebiegu usuwa jego próbki
+]
+
+_schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    controller TEXT NOT NULL,
+    plant TEXT NOT NULL,
+    kp REAL,
+    ti REAL,
+    td REAL,
+    setpoint REAL,
+    params TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS runs_controller_plant ON runs (controller, plant, setpoint);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    t REAL NOT NULL,
+    y REAL,
+    u REAL,
+    loss REAL,
+    PRIMARY KEY (run_id, t)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    rise_time REAL,
+    overshoot REAL,
+    settling_time REAL,
+    steady_state_error REAL,
+    iae REAL,
+    ise REAL,
+    itae REAL,
+    energy REAL,
+    recovery_time REAL
+);
+CREATE INDEX IF NOT EXISTS run_metrics_itae ON run_metrics (itae);
+CREATE TABLE IF NOT EXISTS sweep_runs (
+    sweep TEXT NOT NULL,
+    key TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    PRIMARY KEY (sweep, key)
+) WITHOUT ROWID;
+"""
+
+_metric_names = ("rise_time", "overshoot", "settling_time", "steady_state_error", "iae", "ise", "itae", "energy",
+                 "recovery_time")
+
+_connections = {}
+_lock = threading.Lock()
+
+
+def get_connection(path=db_path, schema=_schema):
+    # Połączenie z puli - osobne dla każdego procesu (po fork połączenie nie może być współdzielone);
+    # schema - tabele tworzone przy otwarciu (inna baza, np. temperature_data.db, podaje własne)
+    key = (os.getpid(), os.path.abspath(path))
+    conn = _connections.get(key)
+    if conn is None:
+        with _lock:
+            conn = _connections.get(key)
+            if conn is None:
+                conn = sqlite3.connect(path, check_same_thread=False)
+                for pragma in _pragmas:
+                    conn.execute(pragma)
+                conn.executescript(schema)
+                _connections[key] = conn
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn, immediate=True):
+    # Transakcja od razu z blokadą zapisu (BEGIN IMMEDIATE): odczyt stanu i zapis w niej widzą te same dane;
+    # immediate=False - tylko wyłączność połączenia w procesie (np. VACUUM, który nie może być w transakcji)
+    with _lock, conn:
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+def close_all():
+    with _lock:
+        for key, conn in list(_connections.items()):
+            if key[0] == os.getpid():
+                conn.close()
+                del _connections[key]
+
+
+def create_table(table, columns, path=db_path):
+    # columns: słownik nazwa kolumny -> typ SQL
+    kolumny = ",\n    ".join(f"{nazwa} {typ}" for nazwa, typ in columns.items())
+    conn = get_connection(path)
+    with _lock, conn:
+        conn.execute(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {kolumny}
+)
+""")
+
+
+def save_rows(table, columns, rows, path=db_path, replace=False):
+    """
+    Zapisuje wiersze jednym executemany w jednej transakcji.
+
+    Args:
+        table (str): Nazwa tabeli.
+        columns (list): Nazwy kolumn.
+        rows (iterable): Krotki wartości (może być generator, np. zip(T, H, u)).
+        replace (bool): Czy wyczyścić tabelę przed zapisem (w tej samej transakcji).
+    """
+    placeholders = ", ".join("?" * len(columns))
+    conn = get_connection(path)
+    with _lock, conn:
+        if replace:
+            conn.execute(f"DELETE FROM {table}")
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+def load_columns(table, columns, path=db_path):
+    # Odczyt kolumn jako osobnych list (bez pętli po wierszach w Pythonie)
+    rows = get_connection(path).execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall()
+    if not rows:
+        return tuple([] for _ in columns)
+    return tuple(list(kolumna) for kolumna in zip(*rows))
+
+
+@instrumentation.timed("persistence.save_run")
+def save_run(controller, plant, t, y, u, loss=None, setpoint=None, kp=None, ti=None, td=None, params=None,
+             sweep=None, key=None, metrics=None, path=db_path):
+    """
+    Dopisuje przebieg symulacji (wiersz w runs + próbki w samples) w jednej transakcji.
+
+    Args:
+        controller (str): Typ regulatora, np. "PI", "PID", "fuzzy".
+        plant (str): Obiekt, np. "oven", "tank".
+        t, y, u (iterable): Czas, wielkość regulowana (temperatura / poziom) i sterowanie.
+        loss (iterable | None): Straty (np. energia utracona), opcjonalnie.
+        params (dict | None): Parametry obiektu (k, P_max, A, B, ...), zapisywane jako JSON.
+        sweep, key (str | None): Nazwa przeszukiwania i klucz punktu - zapisywane w tej samej transakcji,
+            żeby przerwane przeszukiwanie można było wznowić (sweep_done_keys).
+        metrics (dict | None): Wskaźniki jakości (metrics.names) zapisywane w run_metrics.
+
+    Returns:
+        int: Identyfikator przebiegu.
+    """
+    if loss is None:
+        loss = itertools.repeat(None)
+    conn = get_connection(path)
+    with _lock, conn:
+        run_id = conn.execute(
+            "INSERT INTO runs (controller, plant, kp, ti, td, setpoint, params) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (controller, plant, kp, ti, td, setpoint, json.dumps(params) if params is not None else None)).lastrowid
+        # t jako float: numpy.int64 (np.arange(...) * dt przy dt=1 w ClosedLoop.run, oven_batch, compare)
+        # sqlite3 zapisałby jako BLOB, a wtedy load_run(t_from, t_to) i ORDER BY t nie działają
+        conn.executemany("INSERT INTO samples (run_id, t, y, u, loss) VALUES (?, ?, ?, ?, ?)",
+                         ((run_id, float(t_n), *wiersz) for t_n, *wiersz in zip(t, y, u, loss)))
+        if metrics is not None:
+            conn.execute(f"INSERT INTO run_metrics (run_id, {', '.join(_metric_names)}) "
+                         f"VALUES (?{', ?' * len(_metric_names)})",
+                         (run_id, *(_sql_float(metrics[nazwa]) for nazwa in _metric_names)))
+        if sweep is not None:
+            conn.execute("INSERT INTO sweep_runs (sweep, key, run_id) VALUES (?, ?, ?)", (sweep, key, run_id))
+    return run_id
+
+
+def sweep_done_keys(sweep, path=db_path):
+    # Klucze punktów przeszukiwania, które są już zapisane
+    return {wiersz[0] for wiersz in get_connection(path).execute("SELECT key FROM sweep_runs WHERE sweep = ?", (sweep,))}
+
+
+def _sql_float(wartosc):
+    # nan (wskaźnik nieosiągnięty) zapisywany jako NULL
+    wartosc = float(wartosc)
+    return None if wartosc != wartosc else wartosc
+
+
+def load_metrics(run_id, path=db_path):
+    wiersz = get_connection(path).execute(
+        f"SELECT {', '.join(_metric_names)} FROM run_metrics WHERE run_id = ?", (run_id,)).fetchone()
+    return dict(zip(_metric_names, wiersz)) if wiersz else None
+
+
+def best_runs(metric="itae", limit=10, sweep=None, path=db_path):
+    # Przebiegi z najmniejszą wartością wskaźnika (indeks na itae), opcjonalnie z jednego przeszukiwania
+    if metric not in _metric_names:
+        raise ValueError(f"Nieznany wskaźnik: {metric}")
+    query = (f"SELECT r.id, r.controller, r.plant, r.kp, r.ti, r.td, r.setpoint, r.params, m.{metric} "
+             "FROM run_metrics m JOIN runs r ON r.id = m.run_id")
+    args = []
+    if sweep is not None:
+        query += " JOIN sweep_runs s ON s.run_id = r.id WHERE s.sweep = ?"
+        args.append(sweep)
+    query += f" {'AND' if sweep is not None else 'WHERE'} m.{metric} IS NOT NULL ORDER BY m.{metric} LIMIT ?"
+    args.append(limit)
+    return get_connection(path).execute(query, args).fetchall()
+
+
+@instrumentation.timed("persistence.load_run")
+def load_run(run_id, t_from=None, t_to=None, columns=("t", "y"), path=db_path):
+    # Próbki jednego przebiegu, opcjonalnie tylko z okna czasu [t_from, t_to] (przeszukanie klucza)
+    query = f"SELECT {', '.join(columns)} FROM samples WHERE run_id = ?"
+    args = [run_id]
+    if t_from is not None:
+        query += " AND t >= ?"
+        args.append(t_from)
+    if t_to is not None:
+        query += " AND t <= ?"
+        args.append(t_to)
+    rows = get_connection(path).execute(query + " ORDER BY t", args).fetchall()
+    if not rows:
+        return tuple([] for _ in columns)
+    return tuple(list(kolumna) for kolumna in zip(*rows))
+
+
+def find_runs(controller=None, plant=None, setpoint=None, limit=None, path=db_path):
+    # Metadane przebiegów (najnowsze najpierw), filtrowane po kolumnach z indeksem
+    query = "SELECT id, controller, plant, kp, ti, td, setpoint, params, created_at FROM runs"
+    warunki, args = [], []
+    for kolumna, wartosc in (("controller", controller), ("plant", plant), ("setpoint", setpoint)):
+        if wartosc is not None:
+            warunki.append(f"{kolumna} = ?")
+            args.append(wartosc)
+    if warunki:
+        query += " WHERE " + " AND ".join(warunki)
+    query += " ORDER BY id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        args.append(limit)
+    runs = []
+    for wiersz in get_connection(path).execute(query, args):
+        run = dict(zip(("id", "controller", "plant", "kp", "ti", "td", "setpoint", "params", "created_at"), wiersz))
+        run["params"] = json.loads(run["params"]) if run["params"] else None
+        runs.append(run)
+    return runs
+
+
+def latest_run_id(controller=None, plant=None, path=db_path):
+    runs = find_runs(controller, plant, limit=1, path=path)
+    return runs[0]["id"] if runs else None
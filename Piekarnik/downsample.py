@@ -0,0 +1,103 @@
+import numpy as np
+from bokeh.events import RangesUpdate, Reset
+from trajectory_store import read_trajectory, trajectory_dir
+
+""" OPIS
+Decymacja przebiegów przed wysłaniem do przeglądarki.
+Długie przebiegi (mały delta_t / t_p, symulacje wielogodzinne) są zmniejszane do stałej liczby punktów:
+- minmax - w każdym przedziale minimum i maksimum (zachowuje szczyty, np. przeregulowanie i zakłócenie),
+- lttb - Largest-Triangle-Three-Buckets (punkty najlepiej oddające kształt linii).
+
+ZoomDownsampler podpina się pod zmiany zakresu wykresu: po przybliżeniu wycina z pełnego przebiegu
+(np. pliki .npy z trajectory_store mapowane z dysku) tylko widoczny fragment i decymuje go ponownie,
+więc aktualizacja wykresu ma zawsze stały rozmiar niezależnie od długości przebiegu.
+"""
+
+
+def minmax(x, y, n):
+    # Do n punktów: n // 2 przedziałów, z każdego minimum i maksimum w kolejności czasu
+    N = len(y)
+    if N <= n:
+        return np.asarray(x), np.asarray(y)
+    y = np.asarray(y, dtype=float)
+    przedzialy = max(1, n // 2)
+    rozmiar = -(-N // przedzialy)
+    # Dopełnienie ostatnią próbką, żeby przebieg dał się ułożyć w tablicę (przedziały, rozmiar)
+    wypelnione = np.concatenate([y, np.full(przedzialy * rozmiar - N, y[-1])]).reshape(przedzialy, rozmiar)
+    poczatki = np.arange(przedzialy) * rozmiar
+    i_min = poczatki + np.argmin(wypelnione, axis=1)
+    i_max = poczatki + np.argmax(wypelnione, axis=1)
+    indeksy = np.minimum(np.sort(np.stack([i_min, i_max], 1), axis=1).ravel(), N - 1)
+    indeksy = np.unique(np.concatenate([[0], indeksy, [N - 1]]))
+    return np.asarray(x)[indeksy], y[indeksy]
+
+
+def lttb(x, y, n):
+    # Largest-Triangle-Three-Buckets: pierwszy i ostatni punkt + po jednym punkcie z n - 2 przedziałów
+    N = len(y)
+    if N <= n or n < 3:
+        return np.asarray(x), np.asarray(y)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    granice = np.linspace(1, N - 1, n - 1).astype(int)
+    indeksy = np.empty(n, dtype=int)
+    indeksy[0], indeksy[-1] = 0, N - 1
+    a = 0
+    for j in range(n - 2):
+        poczatek, koniec = granice[j], granice[j + 1]
+        # Średnia następnego przedziału jako trzeci wierzchołek trójkąta
+        nast_p, nast_k = koniec, granice[j + 2] if j + 2 < n - 1 else N
+        cx, cy = x[nast_p:nast_k].mean(), y[nast_p:nast_k].mean()
+        bx, by = x[poczatek:koniec], y[poczatek:koniec]
+        pola = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = poczatek + int(np.argmax(pola))
+        indeksy[j + 1] = a
+    return x[indeksy], y[indeksy]
+
+
+methods = dict(minmax=minmax, lttb=lttb)
+
+
+def decimate(x, y, n=1000, method="minmax"):
+    return methods[method](x, y, n)
+
+
+class ZoomDownsampler:
+    """
+    Źródło danych wykresu z decymacją zależną od przybliżenia.
+
+    Args:
+        fig: Wykres Bokeh (zdarzenia RangesUpdate i Reset).
+        source: ColumnDataSource z kolumnami x, y.
+        n (int): Maksymalna liczba punktów wysyłanych do przeglądarki.
+        method (str): "minmax" lub "lttb".
+    """
+
+    def __init__(self, fig, source, n=1000, method="minmax"):
+        self.source, self.n, self.method = source, n, method
+        self.x = self.y = None
+        fig.on_event(RangesUpdate, self._on_range)
+        fig.on_event(Reset, lambda event: self.render())
+
+    def set_data(self, x, y):
+        # Pełny przebieg (tablice lub tablice mapowane z dysku); None - źródło nie jest aktualizowane
+        self.x, self.y = x, y
+        self.render()
+
+    def set_run(self, run_id, y="y", x="t", root=trajectory_dir):
+        kolumny = read_trajectory(run_id, (x, y), root)
+        self.set_data(kolumny[x], kolumny[y])
+
+    def render(self, x0=None, x1=None):
+        if self.x is None:
+            return
+        i0, i1 = 0, len(self.x)
+        if x0 is not None and x1 is not None:
+            # Po jednej próbce poza zakresem z każdej strony, żeby linia dochodziła do krawędzi wykresu
+            i0 = max(0, int(np.searchsorted(self.x, x0, "left")) - 1)
+            i1 = min(len(self.x), int(np.searchsorted(self.x, x1, "right")) + 1)
+        x, y = decimate(self.x[i0:i1], self.y[i0:i1], self.n, self.method)
+        self.source.data = dict(x=np.array(x), y=np.array(y))
+
+    def _on_range(self, event):
+        self.render(event.x0, event.x1)
@@ -0,0 +1,183 @@
+import re
+import numpy as np
+import fuzzy_rules
+
+""" OPIS
+Wektorowe wnioskowanie Mamdaniego dla reguł regulatora rozmytego PI z fuzzy_rules.py (fuzzy_2.py).
+Odtwarza kroki simpful bez obiektów Pythona na regułę:
+- trójkątne funkcje przynależności dla error i delta_error
+- siła reguły: AND = min
+- odcięcie (min) i agregacja (max) zbiorów wyjściowych delta_u
+- defuzyfikacja środkiem ciężkości na 1000 punktach uniwersum delta_u (jak simpful)
+Wejścia są tablicami (M,), więc wiele piekarników może być symulowanych w jednym kroku.
+"""
+
+_rule_pattern = re.compile(
+    r"IF \(error IS (\w+)\) AND \(delta_error IS (\w+)\) THEN \(delta_u IS (\w+)\)")
+
+
+def _triangular(x, terms):
+    # Ta sama postać co Triangular_MF w simpful, wynik przycięty do [0, 1]
+    # terms: lista (a, b, c), wynik (liczba zbiorów, len(x))
+    a, b, c = (np.array(v, dtype=float)[:, None] for v in zip(*terms))
+    with np.errstate(divide="ignore"):
+        lewa = np.where(a != b, (x - a) * (1 / (b - a)), 1.0)
+        prawa = np.where(b != c, 1 + (x - b) * (-1 / (c - b)), 1.0)
+    return np.clip(np.where(x < b, lewa, prawa), 0, 1)
+
+
+class FuzzyKernel:
+    def __init__(self, subdivisions=1000, chunk=2000):
+        self.error_terms = list(fuzzy_rules.error_terms.values())
+        self.delta_error_terms = list(fuzzy_rules.delta_error_terms.values())
+        self.chunk = chunk  # liczba wejść przetwarzanych naraz (pamięć: chunk * subdivisions)
+
+        # Reguły jako indeksy zbiorów: (error, delta_error) -> delta_u
+        e_idx = {term: i for i, term in enumerate(fuzzy_rules.error_terms)}
+        de_idx = {term: i for i, term in enumerate(fuzzy_rules.delta_error_terms)}
+        du_idx = {term: i for i, term in enumerate(fuzzy_rules.delta_u_terms)}
+        rules = []
+        for rule in fuzzy_rules.rules:
+            dopasowanie = _rule_pattern.fullmatch(rule)
+            if dopasowanie is None:
+                raise ValueError(f"Nieobsługiwana postać reguły: {rule}")
+            e, de, du = dopasowanie.groups()
+            rules.append((e_idx[e], de_idx[de], du_idx[du]))
+        self.rule_e, self.rule_de, rule_du = (np.array(v) for v in zip(*rules))
+        # Reguły pogrupowane według zbioru wyjściowego
+        self.groups = [np.flatnonzero(rule_du == t) for t in range(len(du_idx))]
+
+        # Funkcje przynależności wyjścia stablicowane na punktach całkowania
+        self.u = np.linspace(*fuzzy_rules.delta_u_range, subdivisions)
+        self.mu_out = _triangular(self.u, list(fuzzy_rules.delta_u_terms.values()))
+        # Nośnik każdego zbioru wyjściowego - poza nim min(mu, cut) = 0 i agregacja go pomija
+        self.support = []
+        for mu in self.mu_out:
+            niezerowe = np.flatnonzero(mu > 0)
+            self.support.append(slice(niezerowe[0], niezerowe[-1] + 1) if niezerowe.size else slice(0, 0))
+
+    def cuts(self, error, delta_error):
+        # Poziomy odcięcia zbiorów wyjściowych (liczba zbiorów delta_u, M)
+        mu_e = _triangular(error, self.error_terms)
+        mu_de = _triangular(delta_error, self.delta_error_terms)
+        firing = np.minimum(mu_e[self.rule_e], mu_de[self.rule_de])
+        # max(min(mu, w1), min(mu, w2)) == min(mu, max(w1, w2)) - wystarczy jedno odcięcie na zbiór
+        cut = np.zeros((len(self.groups), error.size))
+        for t, group in enumerate(self.groups):
+            if group.size:
+                cut[t] = firing[group].max(axis=0)
+        return cut
+
+    def __call__(self, error, delta_error):
+        """
+        Wyznacza delta_u dla tablic (lub skalarów) error i delta_error.
+
+        Returns:
+            float | ndarray: Zmiana sterowania, 0 gdy żadna reguła nie jest aktywna (jak simpful).
+        """
+        skalar = np.ndim(error) == 0 and np.ndim(delta_error) == 0
+        error, delta_error = np.broadcast_arrays(np.atleast_1d(np.asarray(error, dtype=float)),
+                                                 np.atleast_1d(np.asarray(delta_error, dtype=float)))
+        error, delta_error = error.ravel(), delta_error.ravel()
+        wynik = np.empty(error.size)
+        for start in range(0, error.size, self.chunk):
+            koniec = start + self.chunk
+            cut = self.cuts(error[start:koniec], delta_error[start:koniec])
+            # Agregacja max po zbiorach wyjściowych: (M, subdivisions)
+            agregacja = np.zeros((cut.shape[1], self.u.size))
+            tmp = np.empty_like(agregacja)
+            for t, sl in enumerate(self.support):
+                fragment = tmp[:, :sl.stop - sl.start]
+                np.minimum(self.mu_out[t, sl], cut[t][:, None], out=fragment)
+                np.maximum(agregacja[:, sl], fragment, out=agregacja[:, sl])
+            sumv = agregacja.sum(axis=1)
+            sumwv = agregacja @ self.u
+            wynik[start:koniec] = np.divide(sumwv, sumv, out=np.zeros_like(sumv), where=sumv != 0)
+        return float(wynik[0]) if skalar else wynik
+
+
+def simulate_oven_batch(T_setpoint, T_ambient, P_max, k, cp, delta_t, sim_time, kernel=None):
+    """
+    Symuluje N piekarników z regulatorem rozmytym PI w jednym kroku (odpowiednik simulate_oven).
+
+    Args:
+        T_setpoint (float | array): Temperatura zadana, skalar lub tablica (N,).
+
+    Returns:
+        ndarray: Czas (steps,).
+        ndarray: Temperatura (N, steps).
+        ndarray: Moc grzałki (N, steps).
+        ndarray: Energia utracona (N, steps).
+    """
+    if kernel is None:
+        kernel = FuzzyKernel()
+    T_setpoint = np.atleast_1d(np.asarray(T_setpoint, dtype=float))
+    n = T_setpoint.size
+    times = np.arange(0, sim_time, delta_t)
+
+    T = np.full(n, float(T_ambient))
+    prev_error = np.zeros(n)
+    u = np.zeros(n)
+    temperatures = np.empty((len(times), n))
+    power = np.empty((len(times), n))
+    Q_lost = np.empty((len(times), n))
+
+    for i, t in enumerate(times):
+        if t == 100:
+            T -= 30
+        error = T_setpoint - T
+        delta_error = error - prev_error
+        prev_error = error
+
+        u += kernel(error, delta_error)
+        np.clip(u, 0, 1, out=u)
+        P = 0.95 * u * P_max
+
+        Q_dostarczone = P * delta_t
+        Q_utracone = k * (T - T_ambient) * delta_t
+        T = T + (Q_dostarczone - Q_utracone) / cp
+
+        temperatures[i] = T
+        power[i] = P
+        Q_lost[i] = Q_utracone
+
+    return times, temperatures.T, power.T, Q_lost.T
+
+
+if __name__ == "__main__":
+    import time
+    import fuzzy_2
+    from oven_model import k, T_otoczenia, cp, P_max
+
+    kernel = FuzzyKernel()
+    FS = fuzzy_2.create_fuzzy_pi()
+
+    # Walidacja względem simpful w losowych punktach (również poza uniwersami)
+    rng = np.random.default_rng(0)
+    proba = 200
+    e = rng.uniform(-40, 200, proba)
+    de = rng.uniform(-50, 45, proba)
+    start = time.perf_counter()
+    exact = []
+    for a, b in zip(e, de):
+        FS.set_variable("error", a)
+        FS.set_variable("delta_error", b)
+        exact.append(FS.inference(ignore_warnings=True)["delta_u"])
+    czas_simpful = (time.perf_counter() - start) / proba
+    print(f"Maksymalna różnica względem simpful: {np.max(np.abs(kernel(e, de) - np.array(exact))):.2e}")
+
+    start = time.perf_counter()
+    for a, b in zip(e, de):
+        kernel(a, b)
+    czas_skalar = (time.perf_counter() - start) / proba
+    M = 100_000
+    start = time.perf_counter()
+    kernel(rng.uniform(-30, 190, M), rng.uniform(-40, 35, M))
+    czas_wektor = (time.perf_counter() - start) / M
+    print(f"Wnioskowanie: simpful {czas_simpful * 1e3:.2f} ms, jądro (skalar) {czas_skalar * 1e6:.1f} us, "
+          f"jądro (wektor) {czas_wektor * 1e6:.2f} us na punkt")
+
+    N = 1000
+    start = time.perf_counter()
+    simulate_oven_batch(np.linspace(100, 200, N), T_otoczenia, P_max, k, cp, 1, 200, kernel)
+    print(f"{N} piekarników rozmytych, 200 s: {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,70 @@
+""" OPIS
+Definicja regulatora rozmytego PI: uniwersa, trójkątne funkcje przynależności (a, b, c) i reguły.
+Same dane, bez importu simpful i matplotlib - z tego modułu korzystają fuzzy_2.py (system simpful),
+fuzzy_kernel.py i fuzzy_surface.py, więc symulacja z jądrem NumPy nie ładuje bibliotek GUI.
+"""
+
+# Definicja zakresów zmiennych
+error_range = [-30, 190]
+delta_error_range = [-40, 35]
+delta_u_range = [-1, 1]
+
+# Definicja funkcji przynależności (trójkątne: a, b, c) dla błędu
+error_terms = {
+    "neg": (-30, -20, -10),
+    "neg_l": (-20, -10, 0),
+    "zero": (-1, 0, 1),
+    "pos_l": (0, 50, 70),
+    "pos": (20, 125, 190),
+}
+
+# Definicja funkcji przynależności dla zmiany błędu
+delta_error_terms = {
+    "neg": (-40, -20, -10),
+    "neg_l": (-20, -10, 0),
+    "zero": (-3, 0, 3),
+    "pos_l": (0, 10, 20),
+    "pos": (10, 20, 35),
+}
+
+# Definicja funkcji przynależności dla zmiany sterowania
+delta_u_terms = {
+    "decrease": (-1, -0.4, -0.10),
+    "decrease_l": (-0.2, -0.1, 0),
+    "no_change": (-0.05, 0, 0.05),
+    "increase_l": (0, 0.1, 0.2),
+    "increase": (0.10, 0.4, 1),
+}
+
+# Reguły sterowania
+rules = [
+    "IF (error IS neg) AND (delta_error IS neg) THEN (delta_u IS decrease)",
+    "IF (error IS neg) AND (delta_error IS neg_l) THEN (delta_u IS decrease_l)",
+    "IF (error IS neg) AND (delta_error IS zero) THEN (delta_u IS decrease_l)",
+    "IF (error IS neg) AND (delta_error IS pos_l) THEN (delta_u IS decrease_l)",
+    "IF (error IS neg) AND (delta_error IS pos) THEN (delta_u IS no_change)",
+
+    "IF (error IS neg_l) AND (delta_error IS neg) THEN (delta_u IS decrease)",
+    "IF (error IS neg_l) AND (delta_error IS neg_l) THEN (delta_u IS decrease_l)",
+    "IF (error IS neg_l) AND (delta_error IS zero) THEN (delta_u IS no_change)",
+    "IF (error IS neg_l) AND (delta_error IS pos_l) THEN (delta_u IS no_change)",
+    "IF (error IS neg_l) AND (delta_error IS pos) THEN (delta_u IS decrease_l)",
+
+    "IF (error IS zero) AND (delta_error IS neg) THEN (delta_u IS decrease_l)",
+    "IF (error IS zero) AND (delta_error IS neg_l) THEN (delta_u IS no_change)",
+    "IF (error IS zero) AND (delta_error IS zero) THEN (delta_u IS no_change)",
+    "IF (error IS zero) AND (delta_error IS pos_l) THEN (delta_u IS no_change)",
+    "IF (error IS zero) AND (delta_error IS pos) THEN (delta_u IS increase_l)",
+
+    "IF (error IS pos_l) AND (delta_error IS neg) THEN (delta_u IS increase_l)",
+    "IF (error IS pos_l) AND (delta_error IS neg_l) THEN (delta_u IS no_change)",
+    "IF (error IS pos_l) AND (delta_error IS zero) THEN (delta_u IS no_change)",
+    "IF (error IS pos_l) AND (delta_error IS pos_l) THEN (delta_u IS increase_l)",
+    "IF (error IS pos_l) AND (delta_error IS pos) THEN (delta_u IS increase)",
+
+    "IF (error IS pos) AND (delta_error IS neg) THEN (delta_u IS no_change)",
+    "IF (error IS pos) AND (delta_error IS neg_l) THEN (delta_u IS increase_l)",
+    "IF (error IS pos) AND (delta_error IS zero) THEN (delta_u IS increase_l)",
+    "IF (error IS pos) AND (delta_error IS pos_l) THEN (delta_u IS increase_l)",
+    "IF (error IS pos) AND (delta_error IS pos) THEN (delta_u IS increase)"
+]
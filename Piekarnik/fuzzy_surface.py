@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import warnings
+import numpy as np
+import fuzzy_rules
+
+""" OPIS
+Skompilowana powierzchnia sterowania regulatora rozmytego PI.
+Wnioskowanie simpful (FS.inference) jest wykonywane raz dla siatki punktów (error, delta_error),
+a wynik delta_u zapisywany do pliku .npz. W symulacji wartość jest odczytywana interpolacją dwuliniową.
+
+Siatka zawiera wszystkie wierzchołki funkcji przynależności, więc załamania powierzchni
+wypadają w węzłach siatki. Tuż przy wierzchołkach środek ciężkości zmienia się stromo (jak pierwiastek
+z odległości, np. delta_u przy delta_error = 10 lub error w (0, 1)), więc wokół każdego wierzchołka
+siatka jest zagęszczana geometrycznie (levels węzłów w odstępach step/2, step/4, ...).
+Na brzegach uniwersów i poza nimi żadna reguła nie jest aktywna i simpful zwraca delta_u = 0, ale tuż wewnątrz środek ciężkości jest daleki od zera (skok).
+Dlatego węzły brzegowe są liczone minimalnie wewnątrz uniwersum, a wejścia na brzegu
+lub poza nim dają 0 tak jak simpful.
+
+Dokładność:
+- max_deviation - największa odchyłka delta_u od wnioskowania dokładnego w środkach wszystkich komórek
+  siatki i środkach ich krawędzi (tam interpolacja dwuliniowa myli się najbardziej), dalej niż edge_band
+  od brzegów uniwersów; domyślna siatka daje ok. 0.026 (ok. 1.3% zakresu delta_u [-1, 1]),
+  powyżej tolerance - ostrzeżenie,
+- edge_deviation - to samo dla całej siatki. Przy brzegach uniwersów (np. error -> 190 przy
+  delta_error = 10) siły wszystkich reguł dążą do zera, a środek ciężkości zależy od ich stosunku,
+  więc delta_u zmienia się skokowo (0.1 -> 0.5 na 0.01 delta_error) i interpolacja nie zbiega - ok. 0.2.
+  Piekarnik tam nie pracuje (error <= 180 dla wartości zadanych do 200 °C),
+- trajectory_deviation (na żądanie, check_setpoints) - największa różnica temperatury (°C) przebiegów
+  piekarnika z powierzchnią i z wnioskowaniem dokładnym (fuzzy_2.simulate_oven), przy podanym
+  trajectory_tolerance powyżej niego ostrzeżenie; domyślna siatka daje ok. 6 °C. Układ z tym regulatorem jest źle uwarunkowany: strefa martwa
+  (no_change) zatrzymuje temperaturę w miejscu zależnym od drogi, a zmiana delta_u o 1e-9 przesuwa
+  przebieg dla wartości zadanej 100 o ok. 1.8 °C. Żadna siatka nie odtwarza więc przebiegów dokładnie -
+  powierzchnia nadaje się do szybkich przeglądów, a dokładne przebiegi daje fuzzy_kernel.FuzzyKernel
+  (domyślny w control.FuzzyPI).
+
+Bez podanego FS wartości i punkty kontrolne liczy fuzzy_kernel.FuzzyKernel (to samo wnioskowanie co
+simpful z dokładnością ok. 1e-10, wektorowo), z FS - simpful punkt po punkcie (wolno, raz do pliku).
+
+Plik jest identyfikowany skrótem SHA-1 funkcji przynależności, reguł, rozdzielczości siatki
+i wartości zadanych sprawdzenia - zmiana w fuzzy_rules.py powoduje ponowną kompilację.
+Ostrzeżenia są zgłaszane tylko przy kompilacji, nie przy każdym odczycie pliku.
+"""
+
+edge_eps = 1e-6
+edge_band = 0.5  # szerokość pasa przy brzegach uniwersów wyłączonego z max_deviation
+cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fuzzy_cache")
+
+
+class FuzzySurface:
+    def __init__(self, e_grid, de_grid, values, max_deviation=None, trajectory_deviation=None,
+                 edge_deviation=None):
+        self.e_grid = e_grid
+        self.de_grid = de_grid
+        self.values = values  # delta_u, kształt (len(e_grid), len(de_grid))
+        self.max_deviation = max_deviation  # największa odchyłka delta_u w środkach komórek i krawędzi
+        self.trajectory_deviation = trajectory_deviation  # największa różnica przebiegów piekarnika (°C)
+        self.edge_deviation = edge_deviation  # jak max_deviation, ale razem z pasem przy brzegach uniwersów
+
+    def __call__(self, error, delta_error):
+        # Interpolacja dwuliniowa, działa dla skalarów i tablic
+        e = np.clip(error, self.e_grid[0], self.e_grid[-1])
+        de = np.clip(delta_error, self.de_grid[0], self.de_grid[-1])
+        poza = ((error <= self.e_grid[0]) | (error >= self.e_grid[-1])
+                | (delta_error <= self.de_grid[0]) | (delta_error >= self.de_grid[-1]))
+        i = np.clip(np.searchsorted(self.e_grid, e, side="right") - 1, 0, len(self.e_grid) - 2)
+        j = np.clip(np.searchsorted(self.de_grid, de, side="right") - 1, 0, len(self.de_grid) - 2)
+        e0, e1 = self.e_grid[i], self.e_grid[i + 1]
+        de0, de1 = self.de_grid[j], self.de_grid[j + 1]
+        we = (e - e0) / (e1 - e0)
+        wde = (de - de0) / (de1 - de0)
+        v = self.values
+        wynik = ((1 - we) * (1 - wde) * v[i, j] + we * (1 - wde) * v[i + 1, j]
+                 + (1 - we) * wde * v[i, j + 1] + we * wde * v[i + 1, j + 1])
+        wynik = np.where(poza, 0.0, wynik)
+        return float(wynik) if np.ndim(wynik) == 0 else wynik
+
+
+def _grid(universe, terms, step, levels):
+    # Równomierna siatka uzupełniona o wierzchołki funkcji przynależności
+    # i węzły w odległości step/2, step/4, ... step/2**levels po obu stronach każdego wierzchołka
+    punkty = np.arange(universe[0], universe[1], step)
+    wierzcholki = np.unique([x for abc in terms.values() for x in abc if universe[0] <= x <= universe[1]])
+    odstepy = step * 0.5 ** np.arange(1, levels + 1)
+    zageszczenie = (wierzcholki[:, None] + np.concatenate([odstepy, -odstepy])).ravel()
+    zageszczenie = zageszczenie[(zageszczenie > universe[0]) & (zageszczenie < universe[1])]
+    return np.union1d(np.append(punkty, universe[1]), np.append(wierzcholki, zageszczenie)).astype(float)
+
+
+def _interior(e, de):
+    # Punkty dalej niż edge_band od brzegów uniwersów
+    (e_min, e_max), (de_min, de_max) = fuzzy_rules.error_range, fuzzy_rules.delta_error_range
+    return ((e > e_min + edge_band) & (e < e_max - edge_band)
+            & (de > de_min + edge_band) & (de < de_max - edge_band))
+
+
+def _midpoints(e_grid, de_grid):
+    # Środki komórek i środki krawędzi siatki - punkty największego błędu interpolacji dwuliniowej
+    e_mid = (e_grid[:-1] + e_grid[1:]) / 2
+    de_mid = (de_grid[:-1] + de_grid[1:]) / 2
+    punkty = [np.meshgrid(e, de, indexing="ij") for e, de in
+              ((e_mid, de_mid), (e_mid, de_grid[1:-1]), (e_grid[1:-1], de_mid))]
+    return (np.concatenate([E.ravel() for E, _ in punkty]), np.concatenate([D.ravel() for _, D in punkty]))
+
+
+def trajectory_deviation(surface, exact, setpoints, sim_time=200):
+    """Największa różnica temperatury (°C) przebiegów fuzzy_2.simulate_oven z surface i z exact."""
+    from fuzzy_2 import simulate_oven
+    from oven_model import k, T_otoczenia, cp, P_max
+    roznica = 0.0
+    for T_zadana in setpoints:
+        wzor = simulate_oven(None, T_zadana, T_otoczenia, P_max, k, cp, 1, sim_time, inference=exact)[1]
+        przybl = simulate_oven(None, T_zadana, T_otoczenia, P_max, k, cp, 1, sim_time, inference=surface)[1]
+        roznica = max(roznica, float(np.max(np.abs(np.subtract(przybl, wzor)))))
+    return roznica
+
+
+def _check(surface, tolerance, trajectory_tolerance):
+    if surface.max_deviation > tolerance:
+        warnings.warn(f"Powierzchnia sterowania odbiega od wnioskowania o {surface.max_deviation:.3f} delta_u "
+                      f"(tolerancja {tolerance}) - zagęść siatkę (e_step, de_step, levels)", stacklevel=3)
+    if (surface.trajectory_deviation is not None and trajectory_tolerance is not None
+            and surface.trajectory_deviation > trajectory_tolerance):
+        warnings.warn(f"Przebiegi piekarnika z powierzchnią różnią się od dokładnych o "
+                      f"{surface.trajectory_deviation:.2f} °C (tolerancja {trajectory_tolerance} °C); "
+                      f"dokładne przebiegi daje fuzzy_kernel.FuzzyKernel", stacklevel=3)
+
+
+def surface_key(e_step, de_step, levels, check_setpoints=()):
+    # Skrót definicji regulatora - funkcje przynależności, reguły i rozdzielczość siatki
+    opis = json.dumps({
+        "error": [fuzzy_rules.error_range, fuzzy_rules.error_terms],
+        "delta_error": [fuzzy_rules.delta_error_range, fuzzy_rules.delta_error_terms],
+        "delta_u": [fuzzy_rules.delta_u_range, fuzzy_rules.delta_u_terms],
+        "rules": fuzzy_rules.rules,
+        "grid": [e_step, de_step, levels],
+        "check_setpoints": [float(w) for w in check_setpoints],
+    }, sort_keys=True)
+    return hashlib.sha1(opis.encode("utf-8")).hexdigest()[:16]
+
+
+def _infer(FS, error, delta_error):
+    FS.set_variable("error", error)
+    FS.set_variable("delta_error", delta_error)
+    return float(FS.inference(ignore_warnings=True)["delta_u"])
+
+
+def compile_surface(FS=None, e_step=5, de_step=2.5, levels=8, tolerance=0.03, check_setpoints=(),
+                    trajectory_tolerance=None, use_cache=True):
+    """
+    Kompiluje (lub wczytuje z dysku) powierzchnię sterowania regulatora rozmytego.
+
+    Args:
+        FS (FuzzySystem | None): System rozmyty simpful; None - reguły z fuzzy_rules przez FuzzyKernel.
+        e_step (float): Krok siatki dla błędu.
+        de_step (float): Krok siatki dla zmiany błędu.
+        levels (int): Liczba węzłów zagęszczenia po każdej stronie wierzchołków funkcji przynależności.
+        tolerance (float): Dopuszczalna max_deviation (delta_u) - powyżej ostrzeżenie.
+        check_setpoints (tuple): Wartości zadane przebiegów kontrolnych, np. (100, 140, 180, 200)
+            (puste - bez sprawdzenia przebiegów, trajectory_deviation = None).
+        trajectory_tolerance (float | None): Dopuszczalna trajectory_deviation (°C) - powyżej ostrzeżenie.
+        use_cache (bool): Czy odczytywać i zapisywać plik .npz w katalogu fuzzy_cache.
+
+    Returns:
+        FuzzySurface: Powierzchnia sterowania z polami max_deviation, edge_deviation i trajectory_deviation.
+    """
+    path = os.path.join(cache_dir, f"surface_{surface_key(e_step, de_step, levels, check_setpoints)}.npz")
+    if use_cache and os.path.exists(path):
+        dane = np.load(path)
+        return FuzzySurface(dane["e_grid"], dane["de_grid"], dane["values"], float(dane["max_deviation"]),
+                            float(dane["trajectory_deviation"]) if check_setpoints else None,
+                            float(dane["edge_deviation"]))
+
+    if FS is None:
+        from fuzzy_kernel import FuzzyKernel
+        exact = FuzzyKernel()
+    else:
+        # simpful punkt po punkcie
+        exact = np.vectorize(lambda e, de: _infer(FS, e, de), otypes=[float])
+    e_grid = _grid(fuzzy_rules.error_range, fuzzy_rules.error_terms, e_step, levels)
+    de_grid = _grid(fuzzy_rules.delta_error_range, fuzzy_rules.delta_error_terms, de_step, levels)
+    # Węzły brzegowe liczone tuż wewnątrz uniwersum (granica jednostronna powierzchni)
+    e_eval = e_grid.copy()
+    e_eval[[0, -1]] += [edge_eps, -edge_eps]
+    de_eval = de_grid.copy()
+    de_eval[[0, -1]] += [edge_eps, -edge_eps]
+    E, DE = np.meshgrid(e_eval, de_eval, indexing="ij")
+    values = np.asarray(exact(E.ravel(), DE.ravel()), dtype=float).reshape(E.shape)
+    surface = FuzzySurface(e_grid, de_grid, values)
+
+    # Odchyłka od dokładnego wnioskowania w środkach komórek i krawędzi siatki
+    e_check, de_check = _midpoints(e_grid, de_grid)
+    odchylka = np.abs(surface(e_check, de_check) - exact(e_check, de_check))
+    surface.max_deviation = float(np.max(odchylka[_interior(e_check, de_check)]))
+    surface.edge_deviation = float(np.max(odchylka))
+    if check_setpoints:
+        surface.trajectory_deviation = trajectory_deviation(surface, lambda e, de: float(exact(e, de)),
+                                                            check_setpoints)
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, e_grid=e_grid, de_grid=de_grid, values=values, max_deviation=surface.max_deviation,
+                 edge_deviation=surface.edge_deviation,
+                 trajectory_deviation=np.nan if surface.trajectory_deviation is None
+                 else surface.trajectory_deviation)
+    _check(surface, tolerance, trajectory_tolerance)
+    return surface
+
+
+if __name__ == "__main__":
+    import time
+    import fuzzy_2
+    from oven_model import k, T_otoczenia, cp, P_max
+
+    start = time.perf_counter()
+    surface = compile_surface(check_setpoints=(100, 140, 180, 200))
+    print(f"Powierzchnia {surface.values.shape} gotowa w {time.perf_counter() - start:.1f} s, "
+          f"maksymalna odchyłka delta_u: {surface.max_deviation:.4f}, "
+          f"przebiegów: {surface.trajectory_deviation:.2f} °C")
+
+    start = time.perf_counter()
+    fuzzy_2.simulate_oven(None, 200, T_otoczenia, P_max, k, cp, 1, 200, inference=surface)
+    print(f"Symulacja 200 s z powierzchnią: {time.perf_counter() - start:.4f} s")
@@ -0,0 +1,249 @@
+import atexit
+import cProfile
+import json
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+""" OPIS
+Opcjonalne pomiary czasu etapów (regulator, obiekt, zapis do bazy, wysyłka do wykresów).
+
+Domyślnie wyłączone - wtedy wrap() zwraca funkcję bez zmian, a phase() pusty kontekst,
+więc pętle symulacji nie płacą za pomiary. Włączenie:
+- zmienna środowiskowa PIEKARNIK_STATS=1 lub enable(),
+- PIEKARNIK_STATS_REPORT=plik - raport JSON przy zakończeniu procesu ("-" - tekst na stderr),
+- PIEKARNIK_STATS_PORT=port - bieżące statystyki jako JSON pod http://localhost:port/stats.
+Raport i serwer ze zmiennych środowiskowych uruchamia start_from_env() - wywoływane w punktach wejścia
+(from_args w main() skryptów, piekarnik.py, aplikacja Bokeh), nie przy imporcie. Procesy z puli
+(spawn importuje moduły od nowa) nie zajmują więc tego samego portu ani nie nadpisują raportu.
+
+Dla każdego etapu zbierane są: liczba wywołań, czas łączny, min, max i histogram czasów
+w przedziałach potęg dwójki (w mikrosekundach). Statystyki są osobne dla każdego procesu - procesy
+z puli (async_backend, sweep) nie zapisują raportu przy zakończeniu, w aplikacji Bokeh widoczny jest
+czas całego zlecenia (simulation.roundtrip).
+
+profiled(cprofile_path, tracemalloc_path) obejmuje przebieg profilerem cProfile (plik .prof dla
+pstats / snakeviz) i/lub tracemalloc (największe miejsca alokacji pamięci w pliku tekstowym).
+Skrypty z argparse dostają flagi --stats, --profile, --tracemalloc przez add_arguments().
+"""
+
+enabled = os.environ.get("PIEKARNIK_STATS", "") not in ("", "0")
+_stats = {}
+_lock = threading.Lock()
+_histogram_bins = 32  # przedział i: czas w [2^(i-1), 2^i) µs
+_env_started = False
+
+
+class _Phase:
+    __slots__ = ("count", "total", "min", "max", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.histogram = [0] * _histogram_bins
+
+    def add(self, sekundy):
+        self.count += 1
+        self.total += sekundy
+        if sekundy < self.min:
+            self.min = sekundy
+        if sekundy > self.max:
+            self.max = sekundy
+        us = sekundy * 1e6
+        self.histogram[min(_histogram_bins - 1, 0 if us < 1 else int(us).bit_length())] += 1
+
+
+def record(nazwa, sekundy):
+    with _lock:
+        etap = _stats.get(nazwa)
+        if etap is None:
+            etap = _stats[nazwa] = _Phase()
+        etap.add(sekundy)
+
+
+class _Timer:
+    __slots__ = ("nazwa", "start")
+
+    def __init__(self, nazwa):
+        self.nazwa = nazwa
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.nazwa, time.perf_counter() - self.start)
+        return False
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_no_timer = _NoTimer()
+
+
+def phase(nazwa):
+    # with phase("persistence.save_run"): ... - mierzy czas bloku, gdy pomiary są włączone
+    return _Timer(nazwa) if enabled else _no_timer
+
+
+def wrap(nazwa, funkcja):
+    """Funkcja mierząca czas każdego wywołania albo (gdy pomiary wyłączone) ta sama funkcja."""
+    if not enabled:
+        return funkcja
+    perf_counter = time.perf_counter
+
+    def mierzona(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return funkcja(*args, **kwargs)
+        finally:
+            record(nazwa, perf_counter() - start)
+    return mierzona
+
+
+def timed(nazwa):
+    # Dekorator dla rzadziej wywoływanych funkcji (zapis, wysyłka) - sprawdza włączenie przy każdym wywołaniu
+    def dekorator(funkcja):
+        def mierzona(*args, **kwargs):
+            if not enabled:
+                return funkcja(*args, **kwargs)
+            with _Timer(nazwa):
+                return funkcja(*args, **kwargs)
+        mierzona.__name__, mierzona.__doc__ = funkcja.__name__, funkcja.__doc__
+        mierzona.__wrapped__ = funkcja
+        return mierzona
+    return dekorator
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    """Statystyki etapów: nazwa -> count, total_s, mean_us, min_us, max_us, histogram_us {górna granica: liczba}."""
+    with _lock:
+        wynik = {}
+        for nazwa, etap in sorted(_stats.items()):
+            wynik[nazwa] = dict(
+                count=etap.count, total_s=etap.total, mean_us=etap.total / etap.count * 1e6,
+                min_us=etap.min * 1e6, max_us=etap.max * 1e6,
+                histogram_us={str(2 ** i): n for i, n in enumerate(etap.histogram) if n})
+        return wynik
+
+
+def report():
+    wiersze = [f"{'etap':32s} {'wywołań':>10s} {'łącznie [s]':>12s} {'średnio [µs]':>13s} {'max [µs]':>11s}"]
+    for nazwa, s in snapshot().items():
+        wiersze.append(f"{nazwa:32s} {s['count']:10d} {s['total_s']:12.4f} {s['mean_us']:13.1f} {s['max_us']:11.1f}")
+    return "\n".join(wiersze)
+
+
+def dump(sciezka="-"):
+    if not _stats:
+        return
+    if sciezka == "-":
+        print(report(), file=sys.stderr)
+        return
+    with open(sciezka, "w", encoding="utf-8") as f:
+        json.dump(dict(pid=os.getpid(), stats=snapshot()), f, indent=2)
+
+
+def dump_on_exit(sciezka="-"):
+    atexit.register(dump, sciezka)
+
+
+def serve_stats(port):
+    """Wątek HTTP z bieżącymi statystykami (GET /stats -> JSON)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/stats":
+                self.send_error(404)
+                return
+            tresc = json.dumps(dict(pid=os.getpid(), enabled=enabled, stats=snapshot())).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(tresc)))
+            self.end_headers()
+            self.wfile.write(tresc)
+
+        def log_message(self, *args):
+            pass
+
+    serwer = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=serwer.serve_forever, daemon=True).start()
+    return serwer
+
+
+@contextmanager
+def profiled(cprofile_path=None, tracemalloc_path=None, top=30):
+    """Wykonuje blok pod cProfile i/lub tracemalloc i zapisuje wyniki do plików."""
+    profiler = cProfile.Profile() if cprofile_path else None
+    if tracemalloc_path:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if tracemalloc_path:
+            migawka = tracemalloc.take_snapshot()
+            biezaca, szczytowa = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(tracemalloc_path, "w", encoding="utf-8") as f:
+                f.write(f"Pamięć: bieżąca {biezaca / 1e6:.1f} MB, szczytowa {szczytowa / 1e6:.1f} MB\n")
+                for statystyka in migawka.statistics("lineno")[:top]:
+                    f.write(f"{statystyka}\n")
+
+
+def add_arguments(parser):
+    parser.add_argument("--stats", nargs="?", const="-", default=None, metavar="PLIK",
+                        help="mierz czasy etapów i zapisz raport (JSON) do PLIK lub wypisz na stderr")
+    parser.add_argument("--profile", default=None, metavar="PLIK", help="zapisz profil cProfile do PLIK (.prof)")
+    parser.add_argument("--tracemalloc", default=None, metavar="PLIK", help="zapisz raport alokacji pamięci do PLIK")
+
+
+def start_from_env():
+    # Raport przy zakończeniu i serwer statystyk wg PIEKARNIK_STATS_REPORT / PIEKARNIK_STATS_PORT (raz na proces)
+    global _env_started
+    if _env_started:
+        return
+    _env_started = True
+    if enabled and os.environ.get("PIEKARNIK_STATS_REPORT"):
+        dump_on_exit(os.environ["PIEKARNIK_STATS_REPORT"])
+    if os.environ.get("PIEKARNIK_STATS_PORT"):
+        serve_stats(int(os.environ["PIEKARNIK_STATS_PORT"]))
+
+
+def from_args(args):
+    # Kontekst dla main(): włącza pomiary wg flag z add_arguments i profiluje cały przebieg
+    start_from_env()
+    if args.stats is not None:
+        enable()
+        dump_on_exit(args.stats)
+    return profiled(args.profile, args.tracemalloc)
+
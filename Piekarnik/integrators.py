@@ -0,0 +1,138 @@
+""" OPIS
+Całkowanie obiektów z control.py niezależnie od okresu próbkowania regulatora.
+
+Skrypty liczą obiekt jednym krokiem Eulera na krok regulatora (T + delta_T, H + t_p * dH/dt).
+Przy małej pojemności cieplnej powietrza (cp ≈ 0.06 kJ/°C, k / cp ≈ 0.1 1/s) wymaga to małego delta_t,
+a przy delta_t ≳ 20 s krok Eulera jest niestabilny. Integrated całkuje postać ciągłą obiektu (rhs)
+między krokami regulatora przy stałym sterowaniu (ekstrapolator zerowego rzędu):
+- "rk4" - Runge-Kutta 4. rzędu, substeps kroków na okres regulatora,
+- "rk45" - Dormand-Prince 5(4) z kontrolą błędu (rtol, atol); długość kroku jest pamiętana między
+  okresami regulatora, więc w stanie ustalonym wystarcza jeden krok na okres.
+Wielkości zapisywane (P, Q_utracone, ...) są liczone na początku kroku, jak w wersji z krokiem Eulera.
+"""
+
+
+def rk4(f, x, u, dt, substeps=1):
+    h = dt / substeps
+    for _ in range(substeps):
+        k1 = f(x, u)
+        k2 = f(tuple(a + h / 2 * b for a, b in zip(x, k1)), u)
+        k3 = f(tuple(a + h / 2 * b for a, b in zip(x, k2)), u)
+        k4 = f(tuple(a + h * b for a, b in zip(x, k3)), u)
+        x = tuple(a + h / 6 * (b1 + 2 * b2 + 2 * b3 + b4) for a, b1, b2, b3, b4 in zip(x, k1, k2, k3, k4))
+    return x
+
+
+# Współczynniki Dormanda-Prince'a: węzły pośrednie, rozwiązanie 5. rzędu i różnica z rozwiązaniem 4. rzędu
+_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_B = (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+_E = (71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+
+def rk45(f, x, u, dt, h=None, rtol=1e-6, atol=1e-9, h_min=1e-9):
+    """
+    Całkuje dx/dt = f(x, u) na przedziale [0, dt] metodą Dormanda-Prince'a z kontrolą błędu.
+
+    Returns:
+        tuple: Stan po czasie dt.
+        float: Proponowana długość następnego kroku.
+        int: Liczba wywołań f.
+    """
+    t = 0.0
+    h = dt if h is None else h
+    wywolania = 0
+    while t < dt:
+        h = min(h, dt - t)
+        k = []
+        for a in _A:
+            xi = tuple(xj + h * sum(ai * kk[j] for ai, kk in zip(a, k)) for j, xj in enumerate(x))
+            k.append(f(xi, u))
+        x5 = tuple(xj + h * sum(b * kk[j] for b, kk in zip(_B, k)) for j, xj in enumerate(x))
+        k.append(f(x5, u))
+        wywolania += 7
+        blad = 0.0
+        for j, xj in enumerate(x):
+            e = h * sum(c * kk[j] for c, kk in zip(_E, k))
+            blad = max(blad, abs(e) / (atol + rtol * max(abs(xj), abs(x5[j]))))
+        if blad <= 1 or h <= h_min:
+            t += h
+            x = x5
+        h *= min(5.0, max(0.2, 0.9 * blad ** -0.2)) if blad > 0 else 5.0
+    return x, h, wywolania
+
+
+class Integrated:
+    """
+    Obiekt z control.py całkowany RK4 lub adaptacyjnie między krokami regulatora.
+
+    Args:
+        plant: Obiekt z metodami state, set_state, record i rhs (OvenLumped, OvenHeater, Tank).
+        method (str): "rk4" lub "rk45".
+        substeps (int): Liczba kroków RK4 na okres regulatora.
+        rtol, atol (float): Tolerancje błędu dla "rk45".
+    """
+    __slots__ = ("plant", "method", "substeps", "rtol", "atol", "h", "dt", "recorded", "evaluations")
+
+    def __init__(self, plant, method="rk4", substeps=1, rtol=1e-6, atol=1e-9):
+        if method not in ("rk4", "rk45"):
+            raise ValueError(f"Nieznana metoda całkowania: {method}")
+        self.plant, self.method, self.substeps, self.rtol, self.atol = plant, method, substeps, rtol, atol
+        self.dt = plant.dt
+        self.recorded = getattr(plant, "recorded", ())
+        self.h = None
+        self.evaluations = 0  # liczba wywołań rhs
+
+    @property
+    def y(self):
+        return self.plant.y
+
+    @y.setter
+    def y(self, wartosc):
+        # Zakłócenia (ClosedLoop.run) zmieniają stan obiektu bezpośrednio
+        self.plant.y = wartosc
+
+    def __getattr__(self, nazwa):
+        # Wielkości zapisywane (P, Q_utracone, ...) i parametry są czytane z obiektu
+        if nazwa == "plant":
+            raise AttributeError(nazwa)
+        return getattr(self.plant, nazwa)
+
+    def step(self, u):
+        plant = self.plant
+        plant.record(u)
+        if self.method == "rk4":
+            x = rk4(plant.rhs, plant.state(), u, self.dt, self.substeps)
+            self.evaluations += 4 * self.substeps
+        else:
+            x, self.h, wywolania = rk45(plant.rhs, plant.state(), u, self.dt, self.h, self.rtol, self.atol)
+            self.evaluations += wywolania
+        plant.set_state(x)
+        return plant.y
+
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+    from control import make_loop
+
+    # Ten sam regulator PI co 10 s, obiekt całkowany różnie; odniesienie - rk45 z bardzo małą tolerancją
+    dt, czas = 10, 2 * 3600
+    n = czas // dt
+    wzor = make_loop("oven", "pi", dt=dt, integrator=dict(method="rk45", rtol=1e-12, atol=1e-12),
+                     Kp=0.002, Ti=60).run(n, 200)["y"]
+    for nazwa, integrator in (("Euler", None), ("rk4", "rk4"), ("rk4 x4", dict(method="rk4", substeps=4)),
+                              ("rk45", "rk45")):
+        start = time.perf_counter()
+        loop = make_loop("oven", "pi", dt=dt, integrator=integrator, Kp=0.002, Ti=60)
+        y = loop.run(n, 200)["y"]
+        czas_s = time.perf_counter() - start
+        wywolania = getattr(loop.plant, "evaluations", n)
+        print(f"{nazwa:7s}: max |T - T_wzór| = {np.max(np.abs(y - wzor)):.2e} °C, "
+              f"{wywolania} wywołań, {czas_s * 1000:.1f} ms")
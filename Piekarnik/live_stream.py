@@ -0,0 +1,60 @@
+import instrumentation
+
+""" OPIS
+Tryb na żywo dla aplikacji Bokeh: układ regulacji (control.ClosedLoop) jest przesuwany o kilka kroków
+w każdym wywołaniu doc.add_periodic_callback, a do wykresów trafiają tylko nowe próbki przez
+ColumnDataSource.stream(..., rollover=N). Przeglądarka i serwer trzymają najwyżej N ostatnich próbek,
+więc długie monitorowanie nie zwiększa zużycia pamięci ani ilości przesyłanych danych.
+
+Nastawy i wartość zadana mogą być zmieniane w trakcie (np. z suwaków) - działają od następnego kroku.
+"""
+
+
+class LiveStream:
+    """
+    Symulacja w czasie rzeczywistym z przesyłaniem przyrostowym.
+
+    Args:
+        doc: Dokument Bokeh sesji (curdoc()).
+        loop: Układ regulacji control.ClosedLoop.
+        sources (dict): Nazwa wielkości -> ColumnDataSource z kolumnami x, y. Nazwy: "y" (wielkość
+            regulowana), "u" (sterowanie) lub pola obiektu z plant.recorded (np. "P", "Q_utracone").
+        setpoint (float): Wartość zadana.
+        rate (float): Liczba aktualizacji wykresów na sekundę.
+        steps_per_tick (int): Kroków symulacji na aktualizację (tempo = rate * steps_per_tick * dt na sekundę).
+        rollover (int): Liczba ostatnich próbek trzymanych w każdym źródle.
+        disturbances (dict | None): Skokowe zmiany y przed krokiem: {krok: zmiana}.
+    """
+
+    def __init__(self, doc, loop, sources, setpoint, rate=10, steps_per_tick=1, rollover=600, disturbances=None):
+        self.doc, self.loop, self.sources = doc, loop, sources
+        self.setpoint = setpoint
+        self.rate, self.steps_per_tick, self.rollover = rate, steps_per_tick, rollover
+        self.disturbances = disturbances or {}
+        self.callback = None
+
+    @property
+    def running(self):
+        return self.callback is not None
+
+    def start(self, clear=True):
+        if self.running:
+            return
+        if clear:
+            for source in self.sources.values():
+                source.data = dict(x=[], y=[])
+        self.callback = self.doc.add_periodic_callback(self._tick, 1000 / self.rate)
+
+    def stop(self):
+        if self.running:
+            self.doc.remove_periodic_callback(self.callback)
+            self.callback = None
+
+    def _tick(self):
+        # Kroki od loop.i - zakłócenia i czas liczone od początku pracy, jak w jednym wywołaniu run
+        with instrumentation.phase("live.simulation"):
+            wynik = self.loop.run(self.steps_per_tick, self.setpoint, self.disturbances)
+        # Tylko nowe próbki - stare są usuwane po przekroczeniu rollover (także w przeglądarce)
+        with instrumentation.phase("ui.push"):
+            for nazwa, source in self.sources.items():
+                source.stream(dict(x=wynik["t"], y=wynik[nazwa]), rollover=self.rollover)
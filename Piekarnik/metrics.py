@@ -0,0 +1,184 @@
+import math
+import numpy as np
+import instrumentation
+
+""" OPIS
+Wskaźniki jakości regulacji liczone w jednym przebiegu po kolejnych próbkach (bez przechowywania list):
+- czas narastania (10% -> 90% skoku wartości zadanej)
+- przeregulowanie [%]
+- czas ustalania (ostatnie wyjście poza pasmo ±band skoku, przed zakłóceniem)
+- uchyb ustalony (uchyb w ostatniej próbce)
+- IAE = Σ|e|·dt, ISE = Σe²·dt, ITAE = Σt·|e|·dt
+- energia = Σ P·dt (suma Q_dostarczone dla piekarnika)
+- czas powrotu po zakłóceniu (np. -30°C w t = 100 s) do pasma ±band
+
+StepMetrics przyjmuje skalary (jeden układ), BatchStepMetrics tablice (N układów naraz).
+Przy profilu wartości zadanej (scenario.py) update dostaje bieżącą wartość zadaną: uchyb, całki, pasmo
+i uchyb ustalony liczone są względem niej, a narastanie i przeregulowanie - względem skoku od y0
+do wartości zadanej z konstruktora (końcowej wartości profilu).
+Wartości nieosiągnięte (np. brak 90% skoku) są zwracane jako nan.
+"""
+
+names = ("rise_time", "overshoot", "settling_time", "steady_state_error", "iae", "ise", "itae", "energy",
+         "recovery_time")
+
+
+class StepMetrics:
+    __slots__ = ("setpoint", "y0", "dt", "t_disturbance", "skok", "pasmo", "t10", "t90", "frac_max",
+                 "ostatnio_poza", "poza_po_zakl", "e", "iae", "ise", "itae", "energy", "n")
+
+    def __init__(self, setpoint, y0, dt, t_disturbance=None, band=0.02):
+        self.setpoint, self.y0, self.dt, self.t_disturbance = setpoint, y0, dt, t_disturbance
+        self.skok = setpoint - y0
+        self.pasmo = band * (abs(self.skok) if self.skok else max(abs(setpoint), 1))
+        self.t10 = self.t90 = None
+        self.frac_max = -math.inf
+        self.ostatnio_poza = None  # czas ostatniej próbki poza pasmem (przed zakłóceniem)
+        self.poza_po_zakl = None  # czas ostatniej próbki poza pasmem po zakłóceniu
+        self.e = math.nan
+        self.iae = self.ise = self.itae = self.energy = 0.0
+        self.n = 0
+
+    def update(self, t, y, P=0.0, setpoint=None):
+        # Jedna próbka: czas, wielkość regulowana, moc (energia = Σ P·dt) i bieżąca wartość zadana profilu
+        dt = self.dt
+        e = (self.setpoint if setpoint is None else setpoint) - y
+        ae = abs(e)
+        self.e = e
+        self.iae += ae * dt
+        self.ise += e * e * dt
+        self.itae += t * ae * dt
+        self.energy += P * dt
+        self.n += 1
+        if self.skok:
+            frac = (y - self.y0) / self.skok
+            if frac > self.frac_max:
+                self.frac_max = frac
+            if self.t10 is None and frac >= 0.1:
+                self.t10 = t
+            if self.t90 is None and frac >= 0.9:
+                self.t90 = t
+        if ae > self.pasmo:
+            if self.t_disturbance is not None and t >= self.t_disturbance:
+                self.poza_po_zakl = t
+            else:
+                self.ostatnio_poza = t
+
+    def result(self):
+        nan = math.nan
+        dt = self.dt
+        koniec = self.t_disturbance if self.t_disturbance is not None else math.inf
+        if self.ostatnio_poza is None:
+            settling = 0.0
+        elif self.ostatnio_poza + dt < koniec and self.ostatnio_poza + dt <= (self.n - 1) * dt:
+            settling = self.ostatnio_poza + dt
+        else:
+            settling = nan  # nie ustaliło się przed zakłóceniem / końcem symulacji
+        if self.t_disturbance is None:
+            recovery = nan
+        elif self.poza_po_zakl is None:
+            recovery = 0.0
+        elif self.poza_po_zakl < (self.n - 1) * dt:
+            recovery = self.poza_po_zakl + dt - self.t_disturbance
+        else:
+            recovery = nan
+        return dict(
+            rise_time=self.t90 - self.t10 if self.t90 is not None and self.t10 is not None else nan,
+            overshoot=max(0.0, self.frac_max - 1) * 100 if self.skok and self.n else nan,
+            settling_time=settling,
+            steady_state_error=self.e,
+            iae=self.iae, ise=self.ise, itae=self.itae, energy=self.energy,
+            recovery_time=recovery,
+        )
+
+
+class BatchStepMetrics:
+    """Te same wskaźniki dla N układów - stan jako tablice (N,), update przyjmuje tablice y i P."""
+
+    def __init__(self, n, setpoint, y0, dt, t_disturbance=None, band=0.02):
+        self.setpoint = np.broadcast_to(np.asarray(setpoint, dtype=float), (n,))
+        self.y0 = np.broadcast_to(np.asarray(y0, dtype=float), (n,))
+        self.dt, self.t_disturbance = dt, t_disturbance
+        self.skok = self.setpoint - self.y0
+        with np.errstate(divide="ignore"):
+            self.inv_skok = np.where(self.skok != 0, 1 / self.skok, 0.0)
+        self.pasmo = band * np.where(self.skok != 0, np.abs(self.skok), np.maximum(np.abs(self.setpoint), 1))
+        self.t10 = np.full(n, np.nan)
+        self.t90 = np.full(n, np.nan)
+        self.frac_max = np.full(n, -np.inf)
+        self.ostatnio_poza = np.full(n, np.nan)
+        self.poza_po_zakl = np.full(n, np.nan)
+        self.e = np.full(n, np.nan)
+        self.iae = np.zeros(n)
+        self.ise = np.zeros(n)
+        self.itae = np.zeros(n)
+        self.energy = np.zeros(n)
+        self.samples = 0
+
+    def update(self, t, y, P=0.0, setpoint=None):
+        dt = self.dt
+        e = (self.setpoint if setpoint is None else setpoint) - y
+        ae = np.abs(e)
+        self.e = e
+        self.iae += ae * dt
+        self.ise += e * e * dt
+        self.itae += t * ae * dt
+        self.energy += P * dt
+        self.samples += 1
+        frac = (y - self.y0) * self.inv_skok
+        np.maximum(self.frac_max, frac, out=self.frac_max)
+        self.t10[np.isnan(self.t10) & (frac >= 0.1)] = t
+        self.t90[np.isnan(self.t90) & (frac >= 0.9)] = t
+        poza = ae > self.pasmo
+        if self.t_disturbance is not None and t >= self.t_disturbance:
+            self.poza_po_zakl[poza] = t
+        else:
+            self.ostatnio_poza[poza] = t
+
+    def result(self):
+        dt = self.dt
+        ostatnia = (self.samples - 1) * dt
+        koniec = self.t_disturbance if self.t_disturbance is not None else np.inf
+        ustalone = self.ostatnio_poza + dt
+        settling = np.where(np.isnan(self.ostatnio_poza), 0.0,
+                            np.where((ustalone < koniec) & (ustalone <= ostatnia), ustalone, np.nan))
+        if self.t_disturbance is None:
+            recovery = np.full(self.e.shape, np.nan)
+        else:
+            recovery = np.where(np.isnan(self.poza_po_zakl), 0.0,
+                                np.where(self.poza_po_zakl < ostatnia,
+                                         self.poza_po_zakl + dt - self.t_disturbance, np.nan))
+        return dict(
+            rise_time=self.t90 - self.t10,
+            overshoot=np.where(self.skok != 0, np.maximum(0.0, self.frac_max - 1) * 100, np.nan),
+            settling_time=settling,
+            steady_state_error=self.e,
+            iae=self.iae, ise=self.ise, itae=self.itae, energy=self.energy,
+            recovery_time=recovery,
+        )
+
+
+def evaluate(loop, n, setpoint, disturbances=None, band=0.02):
+    """
+    Symuluje n kroków układu (control.ClosedLoop) i liczy wskaźniki w locie, bez zapisu przebiegu.
+
+    Args:
+        disturbances (dict | None): {krok: zmiana y}; pierwszy krok zakłócenia wyznacza czas powrotu.
+
+    Returns:
+        dict: Wskaźniki (klucze jak w metrics.names).
+    """
+    plant = loop.plant
+    dt = plant.dt
+    zaklocenia = disturbances or {}
+    t_zakl = min(zaklocenia) * dt if zaklocenia else None
+    m = StepMetrics(setpoint, plant.y, dt, t_zakl, band)
+    step, update = instrumentation.wrap("closed_loop.step", loop.step), m.update
+    ma_moc = hasattr(plant, "P")
+    start = loop.i
+    for i in range(start, start + n):
+        if i in zaklocenia:
+            plant.y += zaklocenia[i]
+        y = step(setpoint)
+        update(i * dt, y, plant.P if ma_moc else 0.0)
+    return m.result()
@@ -0,0 +1,311 @@
+import argparse
+import inspect
+import sys
+import time
+import numpy as np
+import control
+import control_batch
+import metrics
+
+""" OPIS
+Odporność regulatora metodą Monte Carlo: tysiące obiektów z losowo zmienionymi parametrami
+(k, cp, P_max piekarnika, A, B zbiornika, ...) i szumem, liczone wsadowo (control_batch.py).
+
+- Parametry: wartość nominalna * (1 + rel * z), z ~ N(0, 1) obcięte do ±3 (np. --uncertainty k=0.1 - 10%).
+- Szum procesu: równomierny ±noise dodawany do y po każdym kroku (jak random.uniform(-0.1, 0.1)
+  w TemperatureSimulator.update), szum pomiaru: N(0, measurement_noise) w wielkości widzianej przez regulator.
+- Próbka i ma własny generator np.random.default_rng([seed, i]) - ten sam seed daje te same parametry
+  i szum próbki niezależnie od liczby próbek i rozmiaru paczki (chunk).
+
+Próbki są liczone paczkami po chunk, a wyniki redukowane w locie, bez zapisu przebiegów:
+- pasma percentyli y w każdym kroku z histogramów (bins przedziałów na krok; zakres z pierwszej paczki
+  z zapasem, wartości spoza zakresu liczone w skrajnych przedziałach; dokładność - szerokość przedziału),
+  średnia, odchylenie, min i max,
+- wskaźniki jakości (metrics.BatchStepMetrics) - po jednej liczbie na próbkę i wskaźnik.
+Pamięć: O(steps * (bins + chunk)) niezależnie od liczby próbek (poza wskaźnikami i parametrami - skalarami).
+Tablice (steps, chunk) to tylko y pierwszej paczki (do zakresu histogramów) i szum procesu / pomiaru -
+po 8 * steps * chunk bajtów (28 800 kroków, chunk 1000: ok. 230 MB każda), mniejszy chunk zmniejsza pamięć.
+
+Próbka rozbieżna (y nieskończone / nan albo |y| > diverge_factor * max(|wartość zadana|, |y0|, 1), np.
+niestabilny krok Eulera przy wylosowanym małym cp) od chwili rozbieżności nie wchodzi do pasm, średniej
+i odchylenia, a jej wskaźniki są pomijane w summarize; liczba rozbieżnych próbek jest w wyniku (diverged).
+
+Przykład:
+    python montecarlo.py --plant oven --controller pi --samples 5000 --uncertainty k=0.1 --uncertainty cp=0.2 --noise 0.1
+"""
+
+
+class StepDistribution:
+    """Rozkład wartości w każdym kroku: histogram (steps, bins) oraz suma, suma kwadratów, min i max."""
+
+    def __init__(self, steps, bins=256):
+        self.steps, self.bins = steps, bins
+        self.lo = self.hi = None
+        # Przedziały 0 i bins + 1 - wartości poniżej / powyżej zakresu
+        self.hist = np.zeros((steps, bins + 2), dtype=np.int64)
+        self.count = np.zeros(steps, dtype=np.int64)  # liczba próbek w kroku (bez rozbieżnych)
+        self.suma = np.zeros(steps)
+        self.suma2 = np.zeros(steps)
+        self.min = np.full(steps, np.inf)
+        self.max = np.full(steps, -np.inf)
+
+    def set_range(self, lo, hi, margin=0.25):
+        zapas = (hi - lo) * margin or max(abs(lo), 1.0) * margin
+        self.lo, self.hi = lo - zapas, hi + zapas
+        self.width = (self.hi - self.lo) / self.bins
+
+    def _bin(self, y):
+        return np.clip(np.floor((y - self.lo) / self.width).astype(np.int64) + 1, 0, self.bins + 1)
+
+    def update(self, n, y):
+        # Jedna próbka czasu dla całej paczki: y (C,) - bez próbek rozbieżnych
+        if not y.size:
+            return
+        self.hist[n] += np.bincount(self._bin(y), minlength=self.bins + 2)
+        self.suma[n] += y.sum()
+        self.suma2[n] += (y * y).sum()
+        self.min[n] = min(self.min[n], y.min())
+        self.max[n] = max(self.max[n], y.max())
+        self.count[n] += y.size
+
+    def update_block(self, Y, diverged_at=None, rows=1024):
+        """
+        Cała paczka naraz: Y (steps, C), po rows kroków na jeden bincount (tymczasowe tablice (rows, C)).
+        diverged_at (C,) - krok rozbieżności próbki; od tego kroku próbka jest pomijana.
+        """
+        if diverged_at is None:
+            diverged_at = np.full(Y.shape[1], self.steps)
+        if self.lo is None:
+            lo, hi = np.inf, -np.inf
+            for s in range(0, self.steps, rows):
+                dobre = Y[s:s + rows][np.arange(s, min(s + rows, self.steps))[:, None] < diverged_at]
+                if dobre.size:
+                    lo, hi = min(lo, float(dobre.min())), max(hi, float(dobre.max()))
+            self.set_range(lo, hi) if lo <= hi else self.set_range(0.0, 0.0)
+        # Dodatkowy przedział na pominięte próbki, odrzucany po zliczeniu
+        szerokosc = self.bins + 3
+        for s in range(0, self.steps, rows):
+            e = min(s + rows, self.steps)
+            pomin = np.arange(s, e)[:, None] >= diverged_at
+            Yb = np.where(pomin, 0.0, Y[s:e])
+            indeksy = np.where(pomin, self.bins + 2, self._bin(Yb)) + np.arange(e - s)[:, None] * szerokosc
+            zliczenia = np.bincount(indeksy.ravel(), minlength=(e - s) * szerokosc).reshape(e - s, szerokosc)
+            self.hist[s:e] += zliczenia[:, :-1]
+            self.suma[s:e] += Yb.sum(axis=1)
+            self.suma2[s:e] += (Yb * Yb).sum(axis=1)
+            np.minimum(self.min[s:e], np.where(pomin, np.inf, Yb).min(axis=1), out=self.min[s:e])
+            np.maximum(self.max[s:e], np.where(pomin, -np.inf, Yb).max(axis=1), out=self.max[s:e])
+            self.count[s:e] += (~pomin).sum(axis=1)
+
+    def percentile(self, q):
+        # Interpolacja liniowa w przedziale histogramu, wynik ograniczony do [min, max] z danego kroku
+        skum = np.cumsum(self.hist, axis=1)
+        cel = q / 100 * self.count
+        j = np.minimum((skum < cel[:, None]).sum(axis=1), self.bins + 1)
+        wiersze = np.arange(self.steps)
+        przed = np.where(j > 0, skum[wiersze, np.maximum(j - 1, 0)], 0)
+        w_przedziale = self.hist[wiersze, j]
+        frac = np.divide(cel - przed, w_przedziale, out=np.zeros(self.steps), where=w_przedziale > 0)
+        wartosc = self.lo + (j - 1 + frac) * self.width
+        return np.clip(wartosc, self.min, self.max)
+
+    def mean(self):
+        # nan w krokach, w których wszystkie próbki są rozbieżne
+        return np.divide(self.suma, self.count, out=np.full(self.steps, np.nan), where=self.count > 0)
+
+    def std(self):
+        srednia2 = np.divide(self.suma2, self.count, out=np.full(self.steps, np.nan), where=self.count > 0)
+        return np.sqrt(np.maximum(srednia2 - self.mean() ** 2, 0.0))
+
+
+def nominal_params(plant):
+    # Domyślne parametry obiektu z konstruktora klasy wsadowej (te same co w control.py)
+    parametry = inspect.signature(control_batch.batch_plants[plant]).parameters
+    return {nazwa: parametry[nazwa].default for nazwa in control.plant_params[plant] if nazwa in parametry}
+
+
+def draw_samples(first, count, steps, seed, nominal, uncertainty, noise=0.0, measurement_noise=0.0):
+    """
+    Parametry i szum próbek first .. first + count - 1 (każda z własnego generatora).
+
+    Returns:
+        dict: Nazwa parametru -> tablica (count,).
+        ndarray | None: Szum procesu (steps, count).
+        ndarray | None: Szum pomiaru (steps, count).
+    """
+    params = {nazwa: np.empty(count) for nazwa in sorted(uncertainty)}
+    proces = np.empty((steps, count)) if noise else None
+    pomiar = np.empty((steps, count)) if measurement_noise else None
+    for j in range(count):
+        rng = np.random.default_rng([seed, first + j])
+        for nazwa in params:
+            z = min(3.0, max(-3.0, rng.standard_normal()))
+            params[nazwa][j] = nominal[nazwa] * (1 + uncertainty[nazwa] * z)
+        if proces is not None:
+            proces[:, j] = rng.uniform(-noise, noise, steps)
+        if pomiar is not None:
+            pomiar[:, j] = rng.normal(0.0, measurement_noise, steps)
+    return params, proces, pomiar
+
+
+def run_montecarlo(plant="oven", controller="pi", samples=1000, uncertainty=None, noise=0.0, measurement_noise=0.0,
+                   seed=0, steps=None, setpoint=None, disturbances=None, chunk=1000, bins=256,
+                   percentiles=(5, 25, 50, 75, 95), dt=None, schedule=None, diverge_factor=10.0, **params):
+    """
+    Symuluje samples obiektów z niepewnymi parametrami i redukuje wyniki w locie.
+
+    Args:
+        uncertainty (dict | None): Parametr obiektu -> względne odchylenie standardowe, np. {"k": 0.1}.
+        noise (float): Amplituda równomiernego szumu procesu.
+        measurement_noise (float): Odchylenie standardowe szumu pomiaru.
+        steps, setpoint, disturbances: Domyślnie z control.plant_defaults[plant]; setpoint także profil (steps,).
+        chunk (int): Liczba próbek liczonych naraz.
+        schedule (dict | None): Parametry obiektu zmienne w czasie {nazwa: (steps,)} (scenario.py);
+            nie mogą być jednocześnie niepewne (uncertainty).
+        diverge_factor (float): Próbka jest rozbieżna, gdy |y| > diverge_factor * max(|w|, |y0|, 1).
+        **params: Nastawy regulatora i stałe parametry obiektu (wartości nominalne dla uncertainty).
+
+    Returns:
+        dict: t (steps,), percentiles {q: (steps,)}, mean, std, min, max (steps,),
+            metrics {nazwa: (samples,)}, params {nazwa: (samples,)}, diverged (samples,) bool, seconds.
+    """
+    start_czas = time.perf_counter()
+    uncertainty = uncertainty or {}
+    domyslne = control.plant_defaults[plant]
+    steps = domyslne["steps"] if steps is None else steps
+    setpoint = domyslne["setpoint"] if setpoint is None else setpoint
+    disturbances = domyslne["disturbances"] if disturbances is None else disturbances
+    dt = domyslne["dt"] if dt is None else dt
+    nominal = dict(nominal_params(plant), **{n: v for n, v in params.items() if n in control.plant_params[plant]})
+    nieznane = set(uncertainty) - set(nominal)
+    if nieznane:
+        raise ValueError(f"Brak parametrów obiektu {plant}: {sorted(nieznane)}")
+    if schedule and set(schedule) & set(uncertainty):
+        raise ValueError(f"Parametry z harmonogramu scenariusza nie mogą być niepewne: "
+                         f"{sorted(set(schedule) & set(uncertainty))}")
+    stale = {n: v for n, v in params.items() if n not in uncertainty}
+
+    zadane = np.asarray(setpoint, dtype=float)
+    zadane_petla = zadane[:, None] if zadane.ndim == 1 else zadane  # profil (steps,) -> (steps, 1)
+    # Wskaźniki względem bieżącej wartości zadanej profilu, skok do końcowej (metrics.py)
+    zadane_kroki = np.broadcast_to(zadane, (steps,)).tolist()
+    zadane_konc = zadane_kroki[-1]
+    t_zakl = min(disturbances) * dt if disturbances else None
+
+    rozklad = StepDistribution(steps, bins)
+    wskazniki = {nazwa: np.empty(samples) for nazwa in metrics.names}
+    parametry = {nazwa: np.empty(samples) for nazwa in sorted(uncertainty)}
+    rozbiezne_wszystkie = np.zeros(samples, dtype=bool)
+    skala_zadanej = float(np.max(np.abs(zadane))) if zadane.size else 0.0
+    for pierwsza in range(0, samples, chunk):
+        C = min(chunk, samples - pierwsza)
+        losowe, proces, pomiar = draw_samples(pierwsza, C, steps, seed, nominal, uncertainty, noise,
+                                              measurement_noise)
+        loop = control_batch.make_batch_loop(C, plant, controller, dt, **stale, **losowe)
+        y0 = loop.plant.y.copy()
+        bm = metrics.BatchStepMetrics(C, zadane_konc, y0, dt, t_zakl)
+        moc = hasattr(loop.plant, "P")
+        granica = diverge_factor * max(skala_zadanej, float(np.max(np.abs(y0))), 1.0)
+        rozbiezne = np.zeros(C, dtype=bool)
+        krok_rozbieznosci = np.full(C, steps)
+
+        def obserwuj(n, y, obiekt):
+            bm.update(n * dt, y, obiekt.P if moc else 0.0, zadane_kroki[n])
+            # ~(|y| <= granica) - także nan
+            nowe = ~(np.abs(y) <= granica) & ~rozbiezne
+            if nowe.any():
+                rozbiezne[nowe] = True
+                krok_rozbieznosci[nowe] = n
+            if rozklad.lo is not None:
+                rozklad.update(n, y[~rozbiezne] if rozbiezne.any() else y)
+
+        # W pierwszej paczce zapisywane jest tylko y (steps, chunk), żeby ustalić zakres histogramów
+        wynik = loop.run(steps, zadane_petla, disturbances, proces, pomiar, obserwuj,
+                         record="y" if rozklad.lo is None else False, schedule=schedule)
+        if wynik is not None:
+            rozklad.update_block(wynik["y"].T, krok_rozbieznosci)
+            del wynik
+        rozbiezne_wszystkie[pierwsza:pierwsza + C] = rozbiezne
+        for nazwa, wartosci in bm.result().items():
+            wskazniki[nazwa][pierwsza:pierwsza + C] = wartosci
+        for nazwa, wartosci in losowe.items():
+            parametry[nazwa][pierwsza:pierwsza + C] = wartosci
+
+    return dict(t=np.arange(steps) * dt, percentiles={q: rozklad.percentile(q) for q in percentiles},
+                mean=rozklad.mean(), std=rozklad.std(), min=rozklad.min, max=rozklad.max,
+                metrics=wskazniki, params=parametry, diverged=rozbiezne_wszystkie,
+                seconds=time.perf_counter() - start_czas)
+
+
+def summarize(wartosci, percentiles=(5, 50, 95), skip=None):
+    # Podsumowanie rozkładu wskaźnika; nan (wskaźnik nieosiągnięty) liczony osobno, skip - próbki pominięte
+    if skip is not None:
+        wartosci = wartosci[~skip]
+    skonczone = wartosci[~np.isnan(wartosci)]
+    wynik = dict(nan_fraction=1 - skonczone.size / wartosci.size if wartosci.size else 0.0)
+    wynik.update((f"p{q}", float(np.percentile(skonczone, q)) if skonczone.size else np.nan) for q in percentiles)
+    wynik["mean"] = float(skonczone.mean()) if skonczone.size else np.nan
+    return wynik
+
+
+def _pairs(wpisy):
+    wynik = {}
+    for wpis in wpisy:
+        nazwa, _, wartosc = wpis.partition("=")
+        wynik[nazwa] = float(wartosc)
+    return wynik
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Odporność regulatora - Monte Carlo z niepewnością parametrów")
+    parser.add_argument("--plant", choices=sorted(control_batch.batch_plants), default="oven")
+    parser.add_argument("--controller", choices=sorted(control.controller_params), default="pi")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--uncertainty", action="append", default=[], metavar="PARAMETR=WZGLĘDNE_ODCHYLENIE",
+                        help="np. k=0.1 (10%%), można powtarzać")
+    parser.add_argument("--param", action="append", default=[], metavar="NAZWA=WARTOŚĆ",
+                        help="nastawa lub nominalny parametr obiektu, np. Kp=0.001")
+    parser.add_argument("--noise", type=float, default=0.0, help="amplituda równomiernego szumu procesu")
+    parser.add_argument("--measurement-noise", type=float, default=0.0, help="odchylenie szumu pomiaru")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=None)
+    parser.add_argument("--setpoint", type=float, default=None)
+    parser.add_argument("--chunk", type=int, default=1000, help="próbek liczonych naraz")
+    parser.add_argument("--scenario", default=None, metavar="PLIK", help="scenariusz JSON/YAML (scenario.py)")
+    parser.add_argument("--csv", default=None, metavar="PLIK", help="zapisz pasma percentyli do PLIK")
+    args = parser.parse_args(argv)
+
+    try:
+        opcje = {}
+        if args.scenario is not None:
+            import scenario
+            sc = scenario.load_scenario(args.scenario)
+            args.plant = sc.plant
+            opcje = dict(setpoint=sc.setpoint, steps=sc.steps, disturbances=sc.disturbances, dt=sc.dt,
+                         schedule=sc.schedule, **sc.params)
+        else:
+            opcje = dict(setpoint=args.setpoint, steps=args.steps)
+        wynik = run_montecarlo(args.plant, args.controller, args.samples, _pairs(args.uncertainty), args.noise,
+                               args.measurement_noise, args.seed, chunk=args.chunk, **dict(opcje, **_pairs(args.param)))
+    except (ValueError, OSError) as blad:
+        parser.error(str(blad))
+
+    print(f"{args.samples} próbek w {wynik['seconds']:.2f} s")
+    rozbiezne = int(wynik["diverged"].sum())
+    if rozbiezne:
+        print(f"Rozbieżne próbki: {rozbiezne} ({rozbiezne / args.samples:.1%}) - pominięte w pasmach i wskaźnikach")
+    print(f"{'wskaźnik':20s} {'p5':>12s} {'p50':>12s} {'p95':>12s} {'średnia':>12s} {'nieosiągnięty':>14s}")
+    for nazwa in metrics.names:
+        s = summarize(wynik["metrics"][nazwa], skip=wynik["diverged"])
+        print(f"{nazwa:20s} {s['p5']:12.5g} {s['p50']:12.5g} {s['p95']:12.5g} {s['mean']:12.5g} "
+              f"{s['nan_fraction']:13.1%}")
+    if args.csv is not None:
+        kolumny = dict(t=wynik["t"], mean=wynik["mean"], std=wynik["std"], min=wynik["min"], max=wynik["max"])
+        kolumny.update((f"p{q}", pasmo) for q, pasmo in wynik["percentiles"].items())
+        np.savetxt(args.csv, np.column_stack(list(kolumny.values())), delimiter=",", fmt="%.10g",
+                   header=",".join(kolumny), comments="")
+        print(f"Zapisano {args.csv}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import numpy as np
+from oven_model import update_temperature_PI, k, T_otoczenia, cp, P_max
+
+""" OPIS
+Symulacja wsadowa piekarnika z regulatorem PI.
+Zamiast jednego piekarnika na wywołanie, N niezależnych piekarników (każdy z własnym Kp, Ti
+i temperaturą zadaną) jest przesuwanych o jeden krok czasowy naraz jako tablice NumPy.
+Wzory są identyczne z update_temperature_PI (oven_model.py):
+- anti-windup przez ograniczenie sterowania u do zakresu [0, 1]
+- moc grzałki P = 0.95 * u * P_max
+"""
+
+
+def simulate_pi_batch(Kp, Ti, T_docelowa, sim_time=200, delta_t=1, k=k, T_otoczenia=T_otoczenia, cp=cp,
+                      P_max=P_max, t_zaklocenia=100, zaklocenie=-30, T0=None):
+    """
+    Symuluje N piekarników z regulatorem PI jednocześnie.
+
+    Args:
+        Kp (float | array): Wzmocnienie regulatora, skalar lub tablica (N,).
+        Ti (float | array): Czas zdwojenia, skalar lub tablica (N,).
+        T_docelowa (float | array): Temperatura zadana (°C), skalar lub tablica (N,).
+        sim_time (int): Czas symulacji (s).
+        delta_t (float): Krok czasowy (s).
+        t_zaklocenia (int | None): Krok, w którym temperatura zmienia się skokowo (None - brak zakłócenia).
+        zaklocenie (float): Skokowa zmiana temperatury w chwili t_zaklocenia (°C).
+        T0 (float | array | None): Temperatura początkowa (°C), domyślnie T_otoczenia.
+
+    Returns:
+        ndarray: Czas (steps,).
+        ndarray: Temperatura piekarnika (N, steps).
+        ndarray: Energia utracona (N, steps).
+        ndarray: Moc grzałki (N, steps).
+    """
+    Kp, Ti, T_docelowa = np.broadcast_arrays(
+        np.asarray(Kp, dtype=float), np.asarray(Ti, dtype=float), np.asarray(T_docelowa, dtype=float))
+    Kp, Ti, T_docelowa = Kp.ravel(), Ti.ravel(), T_docelowa.ravel()
+    n = Kp.size
+    steps = int(sim_time / delta_t)
+    dt_Ti = delta_t / Ti
+
+    # Stan N piekarników
+    T = np.array(np.broadcast_to(np.asarray(T_otoczenia if T0 is None else T0, dtype=float), (n,)))
+    skumulowany_uchyb = np.zeros(n)
+    uchyb = np.empty(n)
+    u = np.empty(n)
+
+    # Prealokowane wyniki - wiersz na krok czasowy, żeby zapis był ciągły w pamięci
+    temperatury = np.empty((steps, n))
+    Q_utracone = np.empty((steps, n))
+    moc = np.empty((steps, n))
+    tmp = np.empty(n)
+
+    for i in range(steps):
+        if i == t_zaklocenia:
+            T += zaklocenie
+        np.subtract(T_docelowa, T, out=uchyb)
+        np.multiply(uchyb, delta_t, out=tmp)
+        skumulowany_uchyb += tmp
+        np.multiply(dt_Ti, skumulowany_uchyb, out=u)
+        u += uchyb
+        u *= Kp
+        np.clip(u, 0, 1, out=u)
+
+        P = moc[i]
+        np.multiply(u, 0.95, out=P)
+        P *= P_max
+        Q = Q_utracone[i]
+        np.subtract(T, T_otoczenia, out=Q)
+        Q *= k
+        Q *= delta_t
+
+        np.multiply(P, delta_t, out=tmp)
+        tmp -= Q
+        tmp /= cp
+        T += tmp
+        temperatury[i] = T
+
+    # Transpozycja jest widokiem - wyniki w kształcie (N, steps) bez kopiowania
+    return np.arange(steps) * delta_t, temperatury.T, Q_utracone.T, moc.T
+
+
+def simulate_pi_scalar(Kp, Ti, T_docelowa, sim_time=200, delta_t=1, t_zaklocenia=100, zaklocenie=-30):
+    # Referencyjna pętla skalarna (jak w chart_update) do porównania wyników
+    T = T_otoczenia
+    skumulowany_uchyb = 0
+    temperatury, Q_utracone, moc = [], [], []
+    for i in range(int(sim_time / delta_t)):
+        if i == t_zaklocenia:
+            T += zaklocenie
+        T, skumulowany_uchyb, Q, P = update_temperature_PI(
+            T, T_docelowa, k, T_otoczenia, cp, delta_t, skumulowany_uchyb, Kp, Ti)
+        temperatury.append(T)
+        Q_utracone.append(Q)
+        moc.append(P)
+    return temperatury, Q_utracone, moc
+
+
+def sample_configs(n, seed=0):
+    # Losowe konfiguracje (Kp, Ti, T_zadane) - te same w sprawdzeniu poniżej i w bench.py (oven_batch, oven_scalar)
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.0001, 0.005, n), rng.uniform(1, 10, n), rng.choice(np.arange(100, 210, 10), n)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Siatka 10 000 konfiguracji (Kp, Ti, T_zadane)
+    N = 10_000
+    Kp, Ti, T_zadane = sample_configs(N)
+
+    start = time.perf_counter()
+    _, temperatury, _, _ = simulate_pi_batch(Kp, Ti, T_zadane)
+    czas_wsadowy = time.perf_counter() - start
+
+    # Czas pętli skalarnej mierzony bez porównania wyników (np.allclose nie wlicza się do szacunku)
+    proba = 200
+    start = time.perf_counter()
+    wyniki = [simulate_pi_scalar(Kp[i], Ti[i], T_zadane[i])[0] for i in range(proba)]
+    czas_skalarny = (time.perf_counter() - start) / proba * N
+    for i, wynik in enumerate(wyniki):
+        assert np.allclose(wynik, temperatury[i], rtol=1e-12, atol=1e-9)
+
+    print(f"Wsadowo: {czas_wsadowy:.3f} s, skalarnie (szacunek): {czas_skalarny:.3f} s, "
+          f"przyspieszenie: {czas_skalarny / czas_wsadowy:.0f}x")
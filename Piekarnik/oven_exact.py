@@ -0,0 +1,207 @@
+import math
+import numpy as np
+import oven_model
+
+""" OPIS
+Szybka ścieżka dla piekarnika jako jednej pojemności cieplnej (OvenLumped) z regulatorem PI.
+
+Między zmianami sterowania obiekt jest liniowy pierwszego rzędu:
+    T[n+1] = a * T[n] + (1 - a) * T_inf(u),   T_inf(u) = T_otoczenia + 0.95 * u * P_max / k
+- discretization="exact": a = exp(-k * dt / cp) - dokładne rozwiązanie dla stałej mocy w kroku,
+- discretization="euler": a = 1 - k * dt / cp - ten sam przebieg co krok Eulera w OvenLumped.
+
+Współczynniki są liczone raz na zestaw parametrów. Gdy wyjście PI jest nasycone (u = 0 lub 1),
+temperatura i suma uchybów mają postać zamkniętą:
+    T[n+j] = T_inf + (T[n] - T_inf) * a^j,
+    S[n+j] = S[n] + dt * (j * E - (T[n] - T_inf) * (1 - a^j) / (1 - a)),   E = T_zadana - T_inf,
+a wyjście regulatora v(j) = α + β·j + γ·a^j ma najwyżej jeden punkt zwrotny - koniec nasycenia jest
+znajdowany bisekcją na odcinkach monotonicznych i cały odcinek jest przeskakiwany jednym krokiem.
+Po dojściu do stanu ustalonego (|uchyb| i zmiana sterowania poniżej steady_tol) stan jest utrzymywany
+do następnego zakłócenia. Koszt zależy od liczby przełączeń nasycenia, a nie od długości symulacji.
+"""
+
+
+class OvenPIExact:
+    """
+    Piekarnik (OvenLumped) z regulatorem PI (control.PI, u w [0, 1]) liczony odcinkami.
+
+    Args:
+        Kp, Ti (float): Nastawy regulatora.
+        dt (float): Okres próbkowania regulatora (s).
+        discretization (str): "exact" lub "euler" (patrz OPIS).
+        min_jump (int): Najkrótszy odcinek przeskakiwany analitycznie (krótsze są liczone krok po kroku).
+        steady_tol (float): Próg stanu ustalonego (°C i jednostki sterowania); None - bez przeskoku.
+    """
+
+    def __init__(self, Kp, Ti, dt=1, k=oven_model.k, T_otoczenia=oven_model.T_otoczenia, cp=oven_model.cp,
+                 P_max=oven_model.P_max, T0=None, discretization="exact", min_jump=8, steady_tol=1e-9):
+        if discretization == "exact":
+            a = math.exp(-k * dt / cp)
+        elif discretization == "euler":
+            a = 1 - k * dt / cp
+        else:
+            raise ValueError(f"Nieznana dyskretyzacja: {discretization}")
+        self.Kp, self.Ti, self.dt = Kp, Ti, dt
+        self.k, self.T_otoczenia, self.cp, self.P_max = k, T_otoczenia, cp, P_max
+        self.a = a
+        self.exact = discretization == "exact"
+        # Przeskoki wymagają monotonicznego zaniku (0 < a < 1); przy a <= 0 krok Eulera oscyluje
+        self.jumps_enabled = 0 < a < 1
+        self.min_jump, self.steady_tol = min_jump, steady_tol
+        self.T = T_otoczenia if T0 is None else T0
+        self.suma = 0.0  # skumulowany uchyb
+        self.i = 0
+        self.jumps = 0  # liczba przeskoczonych odcinków
+
+    def T_inf(self, u):
+        return self.T_otoczenia + 0.95 * u * self.P_max / self.k
+
+    def _v(self, j, T, suma, T_inf, setpoint):
+        # Wyjście regulatora (przed ograniczeniem) w kroku j odcinka nasycenia, z postaci zamkniętej
+        a, dt = self.a, self.dt
+        D = T - T_inf
+        aj = a ** j
+        e = setpoint - T_inf - D * aj
+        suma_j1 = suma + dt * ((j + 1) * (setpoint - T_inf) - D * (1 - aj * a) / (1 - a))
+        return self.Kp * (e + (dt / self.Ti) * suma_j1)
+
+    def _saturated_steps(self, T, suma, u, setpoint, horizon):
+        # Liczba kolejnych kroków (od bieżącego, najwyżej horizon), w których wyjście PI pozostaje nasycone na u
+        T_inf = self.T_inf(u)
+
+        def nasycone(j):
+            v = self._v(j, T, suma, T_inf, setpoint)
+            return v >= 1 if u == 1 else v <= 0
+
+        # v(j) = α + β·j + γ·a^j: punkt zwrotny z β + γ·ln(a)·a^j = 0 dzieli zakres na odcinki monotoniczne
+        a, dt = self.a, self.dt
+        D = T - T_inf
+        beta = self.Kp * (dt / self.Ti) * dt * (setpoint - T_inf)
+        gamma = self.Kp * D * ((dt / self.Ti) * dt * a / (1 - a) - 1)
+        odcinki = [(0, horizon - 1)]
+        if gamma != 0 and beta != 0:
+            iloraz = -beta / (gamma * math.log(a))
+            if iloraz > 0:
+                j_zwrotny = math.log(iloraz) / math.log(a)
+                if 0 < j_zwrotny < horizon - 1:
+                    odcinki = [(0, int(j_zwrotny)), (int(j_zwrotny) + 1, horizon - 1)]
+        for lo, hi in odcinki:
+            if not nasycone(lo):
+                return lo
+            if nasycone(hi):
+                continue
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if nasycone(mid):
+                    lo = mid
+                else:
+                    hi = mid
+            return hi
+        return horizon
+
+    def run(self, n, setpoint, disturbances=None, record=True):
+        """
+        Wykonuje n kroków regulatora.
+
+        Args:
+            setpoint (float): Temperatura zadana (stała w całym przebiegu).
+            disturbances (dict | None): Skokowe zmiany temperatury przed krokiem: {krok: zmiana}.
+            record (bool): Zwracaj pełne przebiegi; False - tylko stan końcowy (koszt niezależny od n).
+
+        Returns:
+            dict: Jak control.ClosedLoop.run: t, y, u, P, Q_utracone (lub przy record=False: T, suma, jumps).
+        """
+        Kp, dt, a = self.Kp, self.dt, self.a
+        dt_Ti = dt / self.Ti
+        k, T_otoczenia, P_max = self.k, self.T_otoczenia, self.P_max
+        zaklocenia = disturbances or {}
+        start = self.i
+        kroki_zakl = sorted(krok - start for krok in zaklocenia if start <= krok < start + n)
+        if record:
+            y = np.empty(n)
+            u_zap = np.empty(n)
+            T_pocz = np.empty(n)  # temperatura na początku kroku (do strat)
+        T, suma = self.T, self.suma
+        # Stan ustalony: T = T_zadana, u* = k * (T_zadana - T_otoczenia) / (0.95 * P_max)
+        u_ust = k * (setpoint - T_otoczenia) / (0.95 * P_max)
+        i = 0
+        while i < n:
+            if start + i in zaklocenia:
+                T += zaklocenia[start + i]
+            uchyb = setpoint - T
+            suma_n = suma + uchyb * dt
+            v = Kp * (uchyb + dt_Ti * suma_n)
+            nastepne = next((kz for kz in kroki_zakl if kz > i), n)
+            horyzont = nastepne - i
+
+            if self.jumps_enabled and horyzont >= self.min_jump:
+                skok = 0
+                if v >= 1 or v <= 0:
+                    u_n = 1.0 if v >= 1 else 0.0
+                    J = self._saturated_steps(T, suma, u_n, setpoint, horyzont)
+                    # Ostatni krok nasycenia jest liczony zwykłą ścieżką (granica bez błędów zaokrągleń)
+                    skok = J if J == horyzont else J - 1
+                    if skok >= self.min_jump:
+                        T_inf = T_otoczenia + 0.95 * u_n * P_max / k
+                        D = T - T_inf
+                        if record:
+                            potegi = a ** np.arange(skok + 1)
+                            T_pocz[i:i + skok] = T_inf + D * potegi[:-1]
+                            y[i:i + skok] = T_inf + D * potegi[1:]
+                            u_zap[i:i + skok] = u_n
+                        suma += dt * (skok * (setpoint - T_inf) - D * (1 - a ** skok) / (1 - a))
+                        T = T_inf + D * a ** skok
+                    else:
+                        skok = 0
+                elif (self.steady_tol is not None and 0 < u_ust < 1 and abs(uchyb) <= self.steady_tol
+                      and abs(v - u_ust) <= self.steady_tol):
+                    # Stan ustalony - bez zmian do następnego zakłócenia
+                    skok = horyzont
+                    if record:
+                        T_pocz[i:i + skok] = T
+                        y[i:i + skok] = T
+                        u_zap[i:i + skok] = v
+                    suma = suma_n
+                if skok:
+                    i += skok
+                    self.jumps += 1
+                    continue
+
+            u_n = max(0, min(v, 1))
+            suma = suma_n
+            P = 0.95 * u_n * P_max
+            if record:
+                T_pocz[i] = T
+            if self.exact:
+                T = T_otoczenia + P / k + (T - T_otoczenia - P / k) * a
+            else:
+                T += (P * dt - k * (T - T_otoczenia) * dt) / self.cp
+            if record:
+                y[i] = T
+                u_zap[i] = u_n
+            i += 1
+
+        self.T, self.suma, self.i = T, suma, start + n
+        if not record:
+            return dict(T=T, suma=suma, jumps=self.jumps)
+        # Moc i straty jak w OvenLumped: straty liczone z temperatury na początku kroku
+        return dict(t=np.arange(start, start + n) * dt, y=y, u=u_zap, P=0.95 * u_zap * P_max,
+                    Q_utracone=k * (T_pocz - T_otoczenia) * dt)
+
+
+if __name__ == "__main__":
+    import time
+    from control import make_loop
+
+    # 3 doby pracy piekarnika z cięższym wsadem (cp = 10 kJ/°C) i dwoma zakłóceniami
+    n = 3 * 86400
+    zaklocenia = {40000: -30, 100000: -50}
+    start = time.perf_counter()
+    wzor = make_loop("oven", "pi", Kp=0.05, Ti=200, cp=10).run(n, 200, zaklocenia)
+    czas_krokowy = time.perf_counter() - start
+    piekarnik = OvenPIExact(0.05, 200, cp=10, discretization="euler")
+    start = time.perf_counter()
+    wynik = piekarnik.run(n, 200, zaklocenia)
+    czas_odcinkowy = time.perf_counter() - start
+    print(f"{n} kroków: krok po kroku {czas_krokowy:.2f} s, odcinkami {czas_odcinkowy:.3f} s "
+          f"({piekarnik.jumps} przeskoków), max |ΔT| = {np.max(np.abs(wynik['y'] - wzor['y'])):.1e} °C")
@@ -0,0 +1,39 @@
+""" OPIS
+Model piekarnika (bilans cieplny powietrza) wraz z regulatorem PI - bez zależności od Bokeh.
+Moduł jest współdzielony przez aplikację Bokeh (Grzalka_copy.py) oraz symulację wsadową (oven_batch.py).
+"""
+
+# Parametry fizyczne piekarnika
+k = 0.006  # Współczynnik strat cieplnych (kW/°C)
+T_otoczenia = 20  # Temperatura otoczenia (°C)
+V = 50  # Objętość piekarnika (litry)
+rho = 1.2  # Gęstość powietrza (kg/m³)
+m = V/1000 * rho  # Masa powietrza w piekarniku (kg)
+c = 1.005  # ciepło właściwe (kJ/(kg·°C))
+cp = c * m  # pojemność cieplna [kJ/°C]
+P_max = 2  # Górny zakres mocy grzałki (kW)
+
+
+def update_temperature_PI(T, T_docelowa, k, T_otoczenia, cp, delta_t, skumulowany_uchyb, Kp_local, Ti_local):
+    # Oblicza nową temperaturę piekarnika po jednym kroku czasowym za pomocą regulatora PI.
+    # Obliczanie błędu
+    uchyb = T_docelowa - T
+
+    # Aktualizacja skumulowanego błędu
+    skumulowany_uchyb += uchyb * delta_t
+
+    # Wyznaczenie mocy grzałki na podstawie regulatora PI
+    u = max(0, min(Kp_local * (uchyb + ((delta_t / Ti_local) * skumulowany_uchyb)), 1))
+
+    # Ograniczenie mocy grzałki do zakresu [0, 2 kW]
+    P = 0.95 * u * P_max
+
+    # Obliczanie dostarczonej mocy do grzałki - sygnał sterujący [kW * s = kJ] [Kilo Dżul]
+    Q_dostarczone = P * delta_t
+    # Energia utracona poprzez nie perfekcyjną izolację piekarnika [kW * s = kJ] [Kilo Dżul]
+    Q_utracone = k * (T - T_otoczenia) * delta_t
+
+    # Temperatura dostarczona przez grzałkę [kJ / kJ / °C = kJ * °C / kJ = °C] [°C]
+    delta_T = (Q_dostarczone - Q_utracone) / cp
+
+    return T + delta_T, skumulowany_uchyb, Q_utracone, P
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+""" OPIS
+Wsadowe uruchamianie symulacji z wiersza poleceń, bez Bokeh, simpful i matplotlib.
+
+Przykłady (z katalogu Piekarnik):
+    python -m piekarnik run --controller pi --plant oven                  # zapis do bazy, wypisuje id przebiegu
+    python -m piekarnik run --controller fuzzy --plant oven --output csv  # próbki na stdout
+    python -m piekarnik run --controller pid --plant tank --param kp=0.05 --metrics --output json
+    python -m piekarnik run --controller pi --scenario dzien_piekarni.json --param Kp=0.05 --param Ti=200
+    python -m piekarnik coldstart --max-ms 400 -- --controller fuzzy      # czas zimnego startu
+    python -m piekarnik compare|montecarlo|sweep|tune|bench ...           # te same opcje co compare.py, sweep.py, ...
+
+Import aplikacji Bokeh (Grzalka_copy.py) ładuje bokeh, simpful i buduje widżety, a skrypty z fuzzy_2.py
+także matplotlib - symulacja wsadowa tego nie potrzebuje. Ten moduł na poziomie modułu importuje tylko
+bibliotekę standardową; control (NumPy), db_store, metrics itd. są importowane dopiero w wybranym poleceniu.
+Regulator rozmyty działa przez fuzzy_kernel (reguły z fuzzy_rules.py), bez simpful.
+
+coldstart uruchamia "run" w nowych procesach interpretera i porównuje najlepszy czas z progiem --max-ms;
+kończy się błędem także wtedy, gdy proces załadował którąś z bibliotek GUI (gui_modules).
+"""
+
+gui_modules = ("bokeh", "simpful", "matplotlib", "tkinter")
+commands = ("run", "coldstart", "compare", "montecarlo", "sweep", "tune", "bench", "retention")
+
+
+def _pairs(wpisy, parser, opcja):
+    # Lista "NAZWA=WARTOŚĆ" -> dict z wartościami liczbowymi
+    wynik = {}
+    for wpis in wpisy:
+        nazwa, znak, wartosc = wpis.partition("=")
+        try:
+            wynik[nazwa] = float(wartosc)
+        except ValueError:
+            znak = ""
+        if not znak:
+            parser.error(f"{opcja}: oczekiwano NAZWA=LICZBA, otrzymano {wpis!r}")
+    return wynik
+
+
+def _step_metrics(wynik, zadane, y0, dt, disturbances, start=0):
+    # Wskaźniki jakości z gotowych tablic - te same wywołania update co metrics.evaluate;
+    # zadane (steps,) - względem bieżącej wartości zadanej profilu, skok do końcowej
+    import metrics
+    m = metrics.StepMetrics(float(zadane[-1]), y0, dt, min(disturbances) * dt if disturbances else None)
+    P = wynik["P"] if "P" in wynik else [0.0] * len(wynik["y"])
+    for i, (y, p, w) in enumerate(zip(wynik["y"].tolist(), list(P), zadane.tolist()), start):
+        m.update(i * dt, y, p, w)
+    return m.result()
+
+
+def _json_metrics(wskazniki):
+    # nan (wskaźnik nieosiągnięty) jako null - JSON bez NaN
+    return {n: None if v != v else v for n, v in wskazniki.items()}
+
+
+def run_parser():
+    parser = argparse.ArgumentParser(prog="python -m piekarnik run", description="Pojedyncza symulacja bez GUI")
+    parser.add_argument("--controller", choices=("pi", "pid", "fuzzy"), default="pi")
+    parser.add_argument("--plant", choices=("oven", "heater", "tank"), default="oven")
+    parser.add_argument("--steps", type=int, default=None, help="liczba kroków (domyślnie z control.plant_defaults)")
+    parser.add_argument("--setpoint", type=float, default=None)
+    parser.add_argument("--dt", type=float, default=None, help="krok czasowy regulatora")
+    parser.add_argument("--param", action="append", default=[], metavar="NAZWA=WARTOŚĆ",
+                        help="nastawa lub parametr obiektu, np. Kp=0.001, k=0.007 (można powtarzać)")
+    parser.add_argument("--disturbance", action="append", default=None, metavar="KROK=ZMIANA",
+                        help="skokowa zmiana wielkości regulowanej przed krokiem, np. 100=-30 (można powtarzać)")
+    parser.add_argument("--no-disturbances", action="store_true", help="bez domyślnych zakłóceń obiektu")
+    parser.add_argument("--scenario", default=None, metavar="PLIK",
+                        help="scenariusz JSON/YAML (scenario.py): obiekt, czas, profil wartości zadanej i zdarzenia")
+    parser.add_argument("--integrator", choices=("rk4", "rk45"), default=None,
+                        help="całkowanie obiektu między krokami regulatora (domyślnie krok Eulera)")
+    parser.add_argument("--output", choices=("db", "csv", "json", "none"), default="db",
+                        help="db - zapis do bazy (wypisuje id przebiegu), csv/json - na stdout, none - bez wyniku")
+    parser.add_argument("--db", default=None, help="plik bazy (domyślnie db_store.db_path)")
+    parser.add_argument("--npy", action="store_true", help="przy --output db zapisz też kopię .npy (trajectory_store)")
+    parser.add_argument("--metrics", action="store_true", help="policz wskaźniki jakości (metrics.py)")
+    parser.add_argument("--timing", action="store_true",
+                        help="wypisz na stderr JSON z czasami etapów i załadowanymi bibliotekami GUI")
+    return parser
+
+
+def run(argv=None):
+    poczatek = time.perf_counter()
+    parser = run_parser()
+    args = parser.parse_args(argv)
+    params = _pairs(args.param, parser, "--param")
+
+    import numpy as np
+    import control
+    czasy = dict(imports=time.perf_counter() - poczatek)
+
+    harmonogram = None
+    try:
+        if args.scenario is not None:
+            # Obiekt, krok, czas, wartość zadana i zdarzenia ze scenariusza; --param nadpisuje jego parametry
+            import scenario
+            sc = scenario.load_scenario(args.scenario)
+            args.plant = sc.plant
+            params = dict(sc.params, **params)
+            loop = sc.make_loop(args.controller, args.integrator, **params)
+            steps, setpoint, zaklocenia, harmonogram = sc.steps, sc.setpoint, sc.disturbances, sc.schedule
+        else:
+            loop = control.make_loop(args.plant, args.controller, args.dt, args.integrator, **params)
+            domyslne = control.plant_defaults[args.plant]
+            setpoint = domyslne["setpoint"] if args.setpoint is None else args.setpoint
+            steps = domyslne["steps"] if args.steps is None else args.steps
+            if args.no_disturbances:
+                zaklocenia = {}
+            elif args.disturbance is not None:
+                zaklocenia = {int(krok): zmiana
+                              for krok, zmiana in _pairs(args.disturbance, parser, "--disturbance").items()}
+            else:
+                zaklocenia = domyslne["disturbances"]
+    except (ValueError, OSError) as blad:
+        parser.error(str(blad))
+
+    start = time.perf_counter()
+    y0 = loop.plant.y
+    wynik = loop.run(steps, setpoint, zaklocenia, harmonogram)
+    czasy["simulation"] = time.perf_counter() - start
+    zadane = np.broadcast_to(np.asarray(setpoint, dtype=float), (steps,))
+    setpoint = float(zadane[0])  # zapis w runs - wartość początkowa profilu
+
+    start = time.perf_counter()
+    wskazniki = _step_metrics(wynik, zadane, y0, loop.plant.dt, zaklocenia) if args.metrics else None
+    if args.output == "db":
+        import db_store
+        sciezka = args.db or db_store.db_path
+        nastawy = control.gains(args.controller, params)
+        strata = wynik.get("Q_utracone")
+        run_id = db_store.save_run(
+            control.controller_labels[args.controller], args.plant, wynik["t"], wynik["y"], wynik["u"], strata,
+            setpoint=setpoint, kp=nastawy[0], ti=nastawy[1], td=nastawy[2],
+            params=dict({n: v for n, v in params.items() if n in control.plant_params[args.plant]},
+                        **({"scenario": sc.name} if args.scenario else {})) or None,
+            metrics=wskazniki, path=sciezka)
+        if args.npy:
+            from trajectory_store import write_trajectory, trajectory_dir
+            kolumny = dict(t=wynik["t"], y=wynik["y"], u=wynik["u"])
+            if strata is not None:
+                kolumny["loss"] = strata
+            write_trajectory(run_id, os.path.join(os.path.dirname(os.path.abspath(sciezka)), trajectory_dir),
+                             meta=dict(controller=control.controller_labels[args.controller]), **kolumny)
+        print(run_id)
+        if wskazniki is not None:
+            print(json.dumps(_json_metrics(wskazniki)), file=sys.stderr)
+    elif args.output == "csv":
+        nazwy = list(wynik)
+        np.savetxt(sys.stdout, np.column_stack([wynik[n] for n in nazwy]), delimiter=",", fmt="%.10g",
+                   header=",".join(nazwy), comments="")
+        if wskazniki is not None:
+            print(json.dumps(_json_metrics(wskazniki)), file=sys.stderr)
+    elif args.output == "json":
+        dane = dict(controller=args.controller, plant=args.plant, setpoint=setpoint, params=params,
+                    disturbances={str(k): v for k, v in zaklocenia.items()},
+                    columns={n: kolumna.tolist() for n, kolumna in wynik.items()})
+        if wskazniki is not None:
+            dane["metrics"] = _json_metrics(wskazniki)
+        json.dump(dane, sys.stdout)
+        sys.stdout.write("\n")
+    czasy["output"] = time.perf_counter() - start
+
+    if args.timing:
+        czasy = {n: round(s * 1000, 3) for n, s in czasy.items()}
+        print(json.dumps(dict(ms=czasy, gui_modules=sorted(m for m in gui_modules if m in sys.modules))),
+              file=sys.stderr)
+    return 0
+
+
+def coldstart(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m piekarnik coldstart",
+                                     description="Czas zimnego startu 'run' w nowym procesie interpretera")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=500.0, help="próg najlepszego czasu całego procesu (ms)")
+    parser.add_argument("run_args", nargs=argparse.REMAINDER, help="opcje dla run (po --)")
+    args = parser.parse_args(argv)
+    run_args = [a for a in args.run_args if a != "--"]
+    polecenie = [sys.executable, "-m", "piekarnik", "run", *run_args, "--output", "none", "--timing"]
+    katalog = os.path.dirname(os.path.abspath(__file__))
+
+    pomiary = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        proces = subprocess.run(polecenie, cwd=katalog, capture_output=True, text=True)
+        calosc = (time.perf_counter() - start) * 1000
+        if proces.returncode != 0:
+            print(proces.stderr, file=sys.stderr)
+            return proces.returncode
+        raport = json.loads(proces.stderr.strip().splitlines()[-1])
+        pomiary.append((calosc, raport))
+
+    najlepszy, raport = min(pomiary, key=lambda p: p[0])
+    print(f"Zimny start: najlepszy {najlepszy:.0f} ms, mediana {sorted(p[0] for p in pomiary)[len(pomiary) // 2]:.0f} ms "
+          f"(importy {raport['ms']['imports']:.0f} ms, symulacja {raport['ms']['simulation']:.0f} ms), "
+          f"próg {args.max_ms:.0f} ms")
+    if raport["gui_modules"]:
+        print(f"BŁĄD: załadowane biblioteki GUI: {', '.join(raport['gui_modules'])}")
+        return 1
+    if najlepszy > args.max_ms:
+        print("BŁĄD: przekroczony próg czasu zimnego startu")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in commands:
+        print(f"Użycie: python -m piekarnik {{{','.join(commands)}}} [opcje]  (opcje polecenia: ... --help)",
+              file=sys.stderr)
+        return 2
+    polecenie, reszta = argv[0], argv[1:]
+    import instrumentation
+    instrumentation.start_from_env()
+    if polecenie == "run":
+        return run(reszta)
+    if polecenie == "coldstart":
+        return coldstart(reszta)
+    # Pozostałe polecenia to istniejące skrypty - import dopiero tutaj
+    modul = __import__(polecenie)
+    return modul.main(reszta) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
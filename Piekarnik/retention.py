@@ -0,0 +1,369 @@
+import argparse
+import os
+import time
+import db_store
+import instrumentation
+
+""" OPIS
+Utrzymanie baz z danymi ciągłymi: agregacja (rollup), okna przechowywania, odzyskiwanie miejsca
+i odczyt w rozdzielczości dobranej do zakresu.
+
+Źródła:
+- temperature_history (temperature_data.db) - próbki z instalacji zapisywane bez przerwy, czas w kolumnie
+  timestamp (UTC, CURRENT_TIMESTAMP); dostaje indeks na timestamp,
+- samples (PID_simulation.db, db_store) - próbki przebiegów symulacji (następca tabeli simulation_data),
+  czas symulacji t w obrębie przebiegu, wiek danych liczony od runs.created_at.
+
+Dla każdego źródła tabele <tabela>_1m i <tabela>_1h: na przedział (i przebieg) liczba próbek n
+oraz <kolumna>_min, <kolumna>_max, <kolumna>_mean. Agregacja idzie partiami (wiersze / przebiegi o kluczu
+większym niż zapisany w rollup_state), każda partia w osobnej krótkiej transakcji, a przedział rozcięty
+między partie jest scalany (ON CONFLICT DO UPDATE) - wynik jak przy agregacji wszystkiego naraz.
+
+Okna przechowywania (retention_days, dni, None - bez limitu): dane surowe są usuwane dopiero
+po zagregowaniu, starsze przedziały minutowe i godzinowe według własnych okien; usuwanie też partiami.
+Zwolnione strony wraca do systemu PRAGMA incremental_vacuum (baza założona przez db_store ma
+auto_vacuum=INCREMENTAL; starsza baza jest jednorazowo przebudowywana VACUUM przy pierwszym maintain).
+
+load_history wybiera najdokładniejszą rozdzielczość, która mieści zakres w max_points punktach i jeszcze
+ma dane z początku zakresu; próbki niezagregowane (nowsze niż ostatnia partia) dolicza w locie.
+
+Przykład (np. z crona albo w tle instalacji):
+    python retention.py --every 300
+    python -m piekarnik retention --source temperature_history --raw-days 3
+"""
+
+history_db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temperature_data.db")
+
+# Poziomy agregacji: nazwa -> długość przedziału (s)
+resolutions = {"1m": 60, "1h": 3600}
+
+# Okna przechowywania w dniach dla danych surowych i agregatów (None - bez limitu)
+retention_days = {
+    "temperature_history": {"raw": 7, "1m": 90, "1h": None},
+    "samples": {"raw": 30, "1m": 365, "1h": None},
+}
+
+# Opis źródeł: klucz partii (progress), klucz grupy (key), wyrażenie czasu w sekundach (time),
+# zapytania wyboru następnej partii i danych starszych niż :cutoff; batch - domyślny rozmiar partii
+sources = {
+    "temperature_history": dict(
+        path=history_db_path, table="temperature_history", columns=("setpoint", "measured_temp", "control_signal"),
+        key=(), progress="id", batch=50000, interval=1,
+        time="CAST(strftime('%s', timestamp) AS INTEGER)", order="timestamp",
+        span="CAST(strftime('%s', MIN(timestamp)) AS INTEGER), CAST(strftime('%s', MAX(timestamp)) AS INTEGER)",
+        where_time="timestamp >= datetime(:lo, 'unixepoch') AND timestamp < datetime(:hi, 'unixepoch')",
+        index="CREATE INDEX IF NOT EXISTS temperature_history_timestamp ON temperature_history (timestamp);",
+        next_batch="SELECT MAX(id) FROM (SELECT id FROM temperature_history WHERE id > :w ORDER BY id LIMIT :batch)",
+        old_raw=("id", "SELECT id FROM temperature_history "
+                       "WHERE id <= :w AND timestamp < datetime(:cutoff, 'unixepoch') LIMIT :batch"),
+        old_rollup=("bucket", "SELECT bucket FROM {table} WHERE bucket < :cutoff LIMIT :batch"),
+    ),
+    "samples": dict(
+        path=db_store.db_path, table="samples", columns=("y", "u", "loss"),
+        key=(("run_id", "INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE"),), progress="run_id", batch=20,
+        interval=None, time="t", order="t", span="MIN(t), MAX(t)", where_time="t >= :lo AND t < :hi", index="",
+        next_batch="SELECT MAX(id) FROM (SELECT id FROM runs WHERE id > :w ORDER BY id LIMIT :batch)",
+        old_raw=("run_id", "SELECT id FROM runs WHERE id <= :w AND created_at < datetime(:cutoff, 'unixepoch') "
+                           "AND EXISTS (SELECT 1 FROM samples WHERE run_id = runs.id) LIMIT :batch"),
+        old_rollup=("run_id", "SELECT id FROM runs WHERE created_at < datetime(:cutoff, 'unixepoch') "
+                              "AND EXISTS (SELECT 1 FROM {table} WHERE run_id = runs.id) LIMIT :batch"),
+    ),
+}
+
+# Statystyki kolumny w przedziale: nazwa -> (typ, agregat SQL); n - liczba wartości różnych od NULL (waga średniej)
+_stats = dict(min=("REAL", "MIN"), max=("REAL", "MAX"), mean=("REAL", "AVG"), n=("INTEGER", "COUNT"))
+_ready = set()  # (proces, baza, źródło) z utworzonymi tabelami agregatów
+
+
+def _source_schema(zrodlo):
+    s = sources[zrodlo]
+    klucz = [f"{nazwa} {typ}" for nazwa, typ in s["key"]]
+    kolumny = [f"{c}_{a} {typ}" for c in s["columns"] for a, (typ, _) in _stats.items()]
+    pk = ", ".join([nazwa for nazwa, _ in s["key"]] + ["bucket"])
+    tabele = "".join(f"""
+CREATE TABLE IF NOT EXISTS {s["table"]}_{r} (
+    {", ".join(klucz + ["bucket INTEGER NOT NULL", "n INTEGER NOT NULL"] + kolumny)},
+    PRIMARY KEY ({pk})
+) WITHOUT ROWID;""" for r in resolutions)
+    return tabele + """
+CREATE TABLE IF NOT EXISTS rollup_state (
+    source TEXT PRIMARY KEY,
+    last INTEGER NOT NULL
+);
+""" + s["index"]
+
+
+def _connect(zrodlo, path=None):
+    s = sources[zrodlo]
+    path = path or s["path"]
+    # Baza db_store dostaje swój schemat (runs, samples), inna tylko tabele agregatów
+    conn = db_store.get_connection(path) if zrodlo == "samples" else db_store.get_connection(path, "")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (s["table"],)).fetchone() is None:
+        raise ValueError(f"Brak tabeli {s['table']} w {path}")
+    klucz = (os.getpid(), os.path.abspath(path), zrodlo)
+    if klucz not in _ready:
+        with db_store.transaction(conn, immediate=False):
+            conn.executescript(_source_schema(zrodlo))
+        _ready.add(klucz)
+    return conn
+
+
+def _watermark(conn, zrodlo):
+    wiersz = conn.execute("SELECT last FROM rollup_state WHERE source = ?", (zrodlo,)).fetchone()
+    return wiersz[0] if wiersz else 0
+
+
+def _upsert(zrodlo, r):
+    # Agregaty partii (klucz partii w (:w, :w_end]) dopisane do <tabela>_<r> albo scalone z istniejącym przedziałem
+    s, sek = sources[zrodlo], resolutions[r]
+    klucz = [nazwa for nazwa, _ in s["key"]]
+    kolumny = [f"{c}_{a}" for c in s["columns"] for a in _stats]
+    agregaty = [f"{f}({c})" for c in s["columns"] for _, f in _stats.values()]
+    przedzial = f"CAST(({s['time']}) / {sek} AS INTEGER) * {sek} AS b"
+    scalenie = []
+    for c in s["columns"]:
+        scalenie += [f"{c}_min = COALESCE(MIN({c}_min, excluded.{c}_min), {c}_min, excluded.{c}_min)",
+                     f"{c}_max = COALESCE(MAX({c}_max, excluded.{c}_max), {c}_max, excluded.{c}_max)",
+                     f"{c}_mean = COALESCE(({c}_mean * {c}_n + excluded.{c}_mean * excluded.{c}_n) "
+                     f"/ ({c}_n + excluded.{c}_n), {c}_mean, excluded.{c}_mean)",
+                     f"{c}_n = {c}_n + excluded.{c}_n"]
+    return (f"INSERT INTO {s['table']}_{r} ({', '.join(klucz + ['bucket', 'n'] + kolumny)}) "
+            f"SELECT {', '.join(klucz + [przedzial, 'COUNT(*)'] + agregaty)} "
+            f"FROM {s['table']} WHERE {s['progress']} > :w AND {s['progress']} <= :w_end "
+            f"GROUP BY {', '.join(klucz + ['b'])} "
+            f"ON CONFLICT ({', '.join(klucz + ['bucket'])}) DO UPDATE SET n = n + excluded.n, {', '.join(scalenie)}")
+
+
+@instrumentation.timed("persistence.rollup")
+def rollup(zrodlo, batch=None, max_batches=None, path=None):
+    """
+    Agreguje niezagregowane dane źródła partiami do tabel <tabela>_1m i <tabela>_1h.
+
+    Args:
+        zrodlo (str): Nazwa z sources.
+        batch (int | None): Rozmiar partii - wiersze (temperature_history) albo przebiegi (samples).
+        max_batches (int | None): Najwięcej partii w tym wywołaniu (None - do końca).
+
+    Returns:
+        int: Liczba przetworzonych partii.
+    """
+    s = sources[zrodlo]
+    conn = _connect(zrodlo, path)
+    zapytania = [_upsert(zrodlo, r) for r in resolutions]
+    partie = 0
+    while max_batches is None or partie < max_batches:
+        with db_store.transaction(conn):
+            w = _watermark(conn, zrodlo)
+            w_end = conn.execute(s["next_batch"], dict(w=w, batch=batch or s["batch"])).fetchone()[0]
+            if w_end is None:
+                break
+            for zapytanie in zapytania:
+                conn.execute(zapytanie, dict(w=w, w_end=w_end))
+            conn.execute("INSERT INTO rollup_state (source, last) VALUES (?, ?) "
+                         "ON CONFLICT (source) DO UPDATE SET last = excluded.last", (zrodlo, w_end))
+        partie += 1
+    return partie
+
+
+@instrumentation.timed("persistence.retention")
+def enforce_retention(zrodlo, days=None, batch=None, max_batches=None, now=None, path=None):
+    """
+    Usuwa dane starsze niż okna przechowywania, partiami; dane surowe tylko już zagregowane.
+
+    Args:
+        days (dict | None): Okna {"raw": dni, "1m": dni, "1h": dni} (domyślnie retention_days[zrodlo]).
+        now (float | None): Chwila odniesienia (s od epoki, domyślnie time.time()).
+
+    Returns:
+        dict: Poziom -> liczba usuniętych wierszy.
+    """
+    s = sources[zrodlo]
+    conn = _connect(zrodlo, path)
+    days = dict(retention_days[zrodlo], **(days or {}))
+    now = time.time() if now is None else now
+    usuniete = {}
+    for poziom, dni in days.items():
+        if dni is None:
+            continue
+        tabela = s["table"] if poziom == "raw" else f"{s['table']}_{poziom}"
+        klucz, wybor = s["old_raw"] if poziom == "raw" else s["old_rollup"]
+        zapytanie = f"DELETE FROM {tabela} WHERE {klucz} IN ({wybor.format(table=tabela)})"
+        usuniete[poziom] = partie = 0
+        while max_batches is None or partie < max_batches:
+            with db_store.transaction(conn):
+                wynik = conn.execute(zapytanie, dict(w=_watermark(conn, zrodlo), cutoff=int(now - dni * 86400),
+                                                     batch=batch or s["batch"]))
+            if wynik.rowcount <= 0:
+                break
+            usuniete[poziom] += wynik.rowcount
+            partie += 1
+    return usuniete
+
+
+@instrumentation.timed("persistence.vacuum")
+def vacuum(zrodlo, pages=2000, path=None):
+    """
+    Zwraca do systemu do pages wolnych stron bazy i przycina plik WAL.
+
+    Returns:
+        int: Liczba wolnych stron przed odzyskaniem.
+    """
+    conn = _connect(zrodlo, path)
+    with db_store.transaction(conn, immediate=False):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Starsza baza bez auto_vacuum: jednorazowa pełna przebudowa, dalej tylko incremental_vacuum
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        wolne = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript wykonuje pragmę do końca (execute zwolniłby tylko jedną stronę)
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return wolne
+
+
+def maintain(zrodla=None, batch=None, max_batches=None, pages=2000, days=None, now=None, paths=None):
+    """
+    Jeden przebieg utrzymania: agregacja, okna przechowywania i odzyskanie miejsca dla każdego źródła.
+
+    Args:
+        zrodla (iterable | None): Nazwy z sources (domyślnie wszystkie).
+        days (dict | None): Źródło -> okna nadpisujące retention_days.
+        paths (dict | None): Źródło -> ścieżka bazy.
+
+    Returns:
+        dict: Źródło -> dict(batches, deleted, free_pages).
+    """
+    wynik = {}
+    for zrodlo in zrodla or sources:
+        path = (paths or {}).get(zrodlo)
+        wynik[zrodlo] = dict(
+            batches=rollup(zrodlo, batch, max_batches, path),
+            deleted=enforce_retention(zrodlo, (days or {}).get(zrodlo), batch, max_batches, now, path),
+            free_pages=vacuum(zrodlo, pages, path) if pages else None)
+    return wynik
+
+
+def _bound(f, *wartosci):
+    # min / max z pominięciem None (None, gdy brak wartości)
+    wartosci = [x for x in wartosci if x is not None]
+    return f(wartosci) if wartosci else None
+
+
+def load_history(zrodlo="temperature_history", t_from=None, t_to=None, max_points=2000, run_id=None,
+                 resolution=None, path=None):
+    """
+    Odczyt źródła w rozdzielczości dobranej do zakresu czasu.
+
+    Args:
+        zrodlo (str): "temperature_history" (czas - s od epoki) albo "samples" (czas symulacji, wymaga run_id).
+        t_from, t_to (float | None): Zakres [t_from, t_to) (domyślnie wszystkie dostępne dane).
+        max_points (int): Najwięcej punktów wyniku - wybiera najdokładniejszy poziom, który się mieści.
+        resolution (str | None): Wymuszony poziom: "raw", "1m" lub "1h".
+
+    Returns:
+        tuple: (poziom, dict) - kolumny "t" oraz dla każdej kolumny źródła wartość (średnia w przedziale),
+            "<kolumna>_min" i "<kolumna>_max"; dla danych surowych min i max równe wartości.
+    """
+    s = sources[zrodlo]
+    conn = _connect(zrodlo, path)
+    klucz = [nazwa for nazwa, _ in s["key"]]
+    if klucz and run_id is None:
+        raise ValueError(f"Źródło {zrodlo} wymaga run_id")
+    warunek = "".join(f"{nazwa} = :{nazwa} AND " for nazwa in klucz)
+    argumenty = dict(run_id=run_id, w=_watermark(conn, zrodlo))
+
+    # Początek i koniec danych na każdym poziomie (indeksy: timestamp / klucz główny)
+    zakresy = {"raw": conn.execute(f"SELECT {s['span']} FROM {s['table']} WHERE {warunek}1", argumenty).fetchone()}
+    for r, sek in resolutions.items():
+        od, do = conn.execute(f"SELECT MIN(bucket), MAX(bucket) + {sek} FROM {s['table']}_{r} WHERE {warunek}1",
+                              argumenty).fetchone()
+        # Niezagregowane próbki są doliczane w locie, więc poziom sięga też tam, gdzie dane surowe
+        zakresy[r] = (_bound(min, od, zakresy["raw"][0]), _bound(max, do, zakresy["raw"][1]))
+    poczatki = [z[0] for z in zakresy.values() if z[0] is not None]
+    if not poczatki:
+        return resolution or "raw", dict(t=[], **{f"{c}{a}": [] for c in s["columns"] for a in ("", "_min", "_max")})
+    t_from = min(poczatki) if t_from is None else t_from
+    t_to = max(z[1] for z in zakresy.values() if z[1] is not None) + 1 if t_to is None else t_to
+
+    if resolution is None:
+        interwal = s["interval"]
+        if interwal is None:
+            pierwsze = conn.execute(f"SELECT {s['time']} FROM {s['table']} WHERE {warunek}1 ORDER BY {s['order']} "
+                                    "LIMIT 2", argumenty).fetchall()
+            interwal = pierwsze[1][0] - pierwsze[0][0] if len(pierwsze) == 2 else 1
+        kroki = dict(raw=interwal or 1, **resolutions)
+        resolution = list(kroki)[-1]
+        for poziom, sek in kroki.items():
+            od = zakresy[poziom][0]
+            if (t_to - t_from) / sek <= max_points and od is not None and od <= t_from + sek:
+                resolution = poziom
+                break
+
+    argumenty.update(lo=t_from, hi=t_to)
+    if resolution == "raw":
+        wiersze = conn.execute(f"SELECT {s['time']}, {', '.join(s['columns'])} FROM {s['table']} "
+                               f"WHERE {warunek}{s['where_time']} ORDER BY {s['order']}", argumenty).fetchall()
+        kolumny = list(zip(*wiersze)) or [()] * (1 + len(s["columns"]))
+        wynik = dict(t=list(kolumny[0]))
+        for c, wartosci in zip(s["columns"], kolumny[1:]):
+            wynik[c] = wynik[f"{c}_min"] = wynik[f"{c}_max"] = list(wartosci)
+        return resolution, wynik
+
+    # Agregaty z tabeli poziomu + próbki jeszcze niezagregowane, scalone po przedziale
+    sek = resolutions[resolution]
+    kolumny = [f"{c}_{a}" for c in s["columns"] for a in _stats]
+    agregaty = [f"{f}({c})" for c in s["columns"] for _, f in _stats.values()]
+    scalenie = []
+    for c in s["columns"]:
+        scalenie += [f"MIN({c}_min)", f"MAX({c}_max)", f"SUM({c}_mean * {c}_n) / SUM({c}_n)"]
+    zapytanie = (f"SELECT bucket, {', '.join(scalenie)} FROM ("
+                 f"SELECT bucket, n, {', '.join(kolumny)} FROM {s['table']}_{resolution} "
+                 f"WHERE {warunek}bucket >= :b_lo AND bucket < :hi "
+                 f"UNION ALL "
+                 f"SELECT CAST(({s['time']}) / {sek} AS INTEGER) * {sek} AS b, COUNT(*), {', '.join(agregaty)} "
+                 f"FROM {s['table']} WHERE {warunek}{s['progress']} > :w AND {s['where_time']} GROUP BY b"
+                 f") GROUP BY bucket ORDER BY bucket")
+    wiersze = conn.execute(zapytanie, dict(argumenty, b_lo=(int(t_from) // sek) * sek)).fetchall()
+    kolumny = list(zip(*wiersze)) or [()] * (1 + 3 * len(s["columns"]))
+    wynik = dict(t=list(kolumny[0]))
+    for i, c in enumerate(s["columns"]):
+        wynik[f"{c}_min"], wynik[f"{c}_max"], wynik[c] = (list(x) for x in kolumny[1 + 3 * i:4 + 3 * i])
+    return resolution, wynik
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregacja, okna przechowywania i odzyskiwanie miejsca w bazach")
+    parser.add_argument("--source", choices=sorted(sources) + ["all"], default="all")
+    parser.add_argument("--batch", type=int, default=None, help="rozmiar partii (wiersze / przebiegi)")
+    parser.add_argument("--max-batches", type=int, default=None, help="najwięcej partii na przebieg utrzymania")
+    parser.add_argument("--pages", type=int, default=2000, help="stron zwalnianych na przebieg (0 - bez vacuum)")
+    for poziom, opcja in (("raw", "--raw-days"), ("1m", "--minute-days"), ("1h", "--hour-days")):
+        parser.add_argument(opcja, type=float, default=None, dest=f"days_{poziom}",
+                            help=f"okno przechowywania poziomu {poziom} w dniach (domyślnie retention_days)")
+    parser.add_argument("--history-db", default=history_db_path)
+    parser.add_argument("--db", default=db_store.db_path)
+    parser.add_argument("--every", type=float, default=None, metavar="SEK", help="powtarzaj co SEK sekund")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    zrodla = list(sources) if args.source == "all" else [args.source]
+    okna = {poziom: getattr(args, f"days_{poziom}") for poziom in ("raw", "1m", "1h")}
+    okna = {poziom: dni for poziom, dni in okna.items() if dni is not None}
+    sciezki = dict(temperature_history=args.history_db, samples=args.db)
+    with instrumentation.from_args(args):
+        while True:
+            try:
+                wynik = maintain(zrodla, args.batch, args.max_batches, args.pages,
+                                 {zrodlo: okna for zrodlo in zrodla}, paths=sciezki)
+            except ValueError as blad:
+                parser.error(str(blad))
+            for zrodlo, stan in wynik.items():
+                print(f"{zrodlo}: partie {stan['batches']}, usunięte {stan['deleted']}, "
+                      f"wolne strony {stan['free_pages']}")
+            if args.every is None:
+                break
+            time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
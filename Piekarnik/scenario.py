@@ -0,0 +1,206 @@
+import inspect
+import json
+import math
+import os
+import warnings
+import numpy as np
+import control
+
+""" OPIS
+Scenariusze symulacji w plikach JSON lub YAML kompilowane raz do tablic na każdy krok.
+
+Zamiast zakłócenia wpisanego w pętlę (if total_time == 100: T -= 30) i stałej wartości zadanej z suwaka,
+scenariusz opisuje cały przebieg pracy, np. dzień piekarni:
+
+    {
+      "plant": "oven", "dt": 1, "duration": 28800,
+      "params": {"k": 0.006},
+      "setpoint": [{"at": 0, "value": 180}, {"at": 3600, "ramp_to": 220, "over": 600}],
+      "ambient": [{"at": 0, "value": 20}, {"at": 14400, "ramp_to": 28, "over": 7200}],
+      "events": [
+        {"type": "door_open", "at": 1800, "duration": 30, "factor": 2, "every": 1200, "count": 20},
+        {"type": "step", "at": 1830, "delta": -15, "every": 1200, "count": 20},
+        {"type": "inflow", "at": 300, "duration": 120, "rate": -0.002}
+      ]
+    }
+
+Czas w sekundach. Profile (setpoint, ambient) to lista odcinków: "value" - skok do wartości,
+"ramp_to" + "over" - liniowe przejście; między odcinkami wartość jest utrzymywana.
+Zdarzenia (opcjonalnie powtarzane: "every" co ile sekund, "count" ile razy):
+- step - skokowa zmiana wielkości regulowanej przed krokiem (wsad do piekarnika, dolanie wody),
+- door_open - otwarte drzwi: współczynnik strat k razy "factor" (albo k = "k") przez "duration" sekund,
+- inflow - dodatkowy dopływ zbiornika "rate" (m³/s, ujemny - pobór) przez "duration" sekund.
+
+compile_scenario daje tablice (steps,): setpoint oraz harmonogram parametrów obiektu (T_otoczenia, k, q_z),
+a zdarzenia skokowe jako słownik {krok: zmiana}. Piekarnik i grzałka liczone są jawną metodą Eulera:
+przy k * dt / pojemność cieplna = 1 temperatura spada do T_otoczenia w jednym kroku, powyżej oscyluje,
+powyżej 2 się rozbiega (np. door_open z "factor": 10 daje 0.995). compile_scenario ostrzega od euler_limit
+= 0.5 - zapas na niepewność cp w montecarlo.py (integrator w make_loop albo mniejsze dt usuwa problem). Pętle (ClosedLoop.run, control_batch.BatchLoop.run,
+compare.compare_loops) odczytują kolejne elementy tablic bez warunków w pętli wewnętrznej.
+"""
+
+scenario_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+# Parametr obiektu zmieniany przez profil "ambient" i zdarzenia
+ambient_param = dict(oven="T_otoczenia", heater="T_otoczenia")
+door_param = dict(oven="k", heater="k")
+# Pojemność cieplna w kroku Eulera: T += (... - k * (T - T_otoczenia) * dt) / pojemność
+heat_capacity = dict(oven=lambda p: p["cp"], heater=lambda p: p["m"] * p["c"])
+euler_limit = 0.5
+inflow_param = dict(tank="q_z")
+
+
+class Scenario:
+    """
+    Skompilowany scenariusz.
+
+    Attributes:
+        plant (str): Obiekt ("oven", "heater", "tank").
+        dt (float): Krok czasowy regulatora.
+        steps (int): Liczba kroków.
+        params (dict): Stałe parametry obiektu ze scenariusza.
+        setpoint (ndarray): Wartość zadana (steps,).
+        disturbances (dict): Skokowe zmiany y: {krok: zmiana}.
+        schedule (dict): Parametry obiektu zmienne w czasie: {nazwa: (steps,)}.
+    """
+
+    def __init__(self, name, plant, dt, steps, params, setpoint, disturbances, schedule):
+        self.name, self.plant, self.dt, self.steps, self.params = name, plant, dt, steps, params
+        self.setpoint, self.disturbances, self.schedule = setpoint, disturbances, schedule
+
+    @property
+    def t(self):
+        return np.arange(self.steps) * self.dt
+
+    def make_loop(self, controller="pi", integrator=None, **params):
+        # Układ regulacji z parametrami obiektu ze scenariusza (params nadpisują scenariusz)
+        return control.make_loop(self.plant, controller, self.dt, integrator, **dict(self.params, **params))
+
+    def run(self, loop):
+        """Przebieg scenariusza w układzie control.ClosedLoop (wynik jak ClosedLoop.run)."""
+        return loop.run(self.steps, self.setpoint, self.disturbances, self.schedule)
+
+
+def _profile(segmenty, t, start_value, nazwa):
+    # Wartość profilu w chwilach t: odcinki posortowane po "at", wartość utrzymywana między odcinkami
+    wynik = np.full(t.size, float(start_value))
+    for segment in sorted(segmenty, key=lambda s: s["at"]):
+        at = segment["at"]
+        if "value" in segment:
+            wynik[t >= at] = segment["value"]
+        elif "ramp_to" in segment:
+            over = segment.get("over", 0)
+            od = wynik[np.searchsorted(t, at)] if at <= t[-1] else wynik[-1]
+            if over > 0:
+                w = np.clip((t - at) / over, 0.0, 1.0)
+                wynik = np.where(t >= at, od + (segment["ramp_to"] - od) * w, wynik)
+            else:
+                wynik[t >= at] = segment["ramp_to"]
+        else:
+            raise ValueError(f"{nazwa}: odcinek bez 'value' ani 'ramp_to': {segment}")
+    return wynik
+
+
+def _occurrences(zdarzenie):
+    # Chwile wystąpienia zdarzenia (z powtórzeniami)
+    every, count = zdarzenie.get("every"), zdarzenie.get("count", 1 if "every" not in zdarzenie else None)
+    if every is None:
+        return [zdarzenie["at"]]
+    if count is None:
+        raise ValueError(f"Zdarzenie z 'every' wymaga 'count': {zdarzenie}")
+    return [zdarzenie["at"] + i * every for i in range(count)]
+
+
+def compile_scenario(opis, params=None):
+    """
+    Kompiluje opis scenariusza (dict z pliku) do tablic na każdy krok.
+
+    Args:
+        opis (dict): Scenariusz (patrz OPIS).
+        params (dict | None): Parametry obiektu nadpisujące "params" ze scenariusza.
+
+    Returns:
+        Scenario
+    """
+    plant = opis.get("plant", "oven")
+    if plant not in control.plant_params:
+        raise ValueError(f"Nieznany obiekt: {plant}")
+    domyslne = control.plant_defaults[plant]
+    dt = opis.get("dt", domyslne["dt"])
+    if "steps" in opis:
+        steps = int(opis["steps"])
+    elif "duration" in opis:
+        steps = int(math.ceil(opis["duration"] / dt - 1e-9))
+    else:
+        steps = domyslne["steps"]
+    parametry = dict(opis.get("params", {}), **(params or {}))
+    nieznane = set(parametry) - set(control.plant_params[plant])
+    if nieznane:
+        raise ValueError(f"Nieznane parametry obiektu {plant}: {sorted(nieznane)}")
+    # Wartości nominalne (scenariusz lub domyślne z konstruktora) - punkt odniesienia dla profili i zdarzeń
+    nominalne = {nazwa: p.default for nazwa, p in inspect.signature(control.plant_classes[plant]).parameters.items()}
+    nominalne.update(parametry)
+
+    # Czas na początku kroku - zdarzenie "at" działa od pierwszego kroku z t >= at
+    t = np.arange(steps) * dt
+    setpoint = opis.get("setpoint", domyslne["setpoint"])
+    if isinstance(setpoint, (int, float)):
+        setpoint = [{"at": 0, "value": setpoint}]
+    zadane = _profile(setpoint, t, domyslne["setpoint"], "setpoint")
+
+    schedule = {}
+    if "ambient" in opis:
+        if plant not in ambient_param:
+            raise ValueError(f"Profil 'ambient' nie dotyczy obiektu {plant}")
+        schedule[ambient_param[plant]] = _profile(opis["ambient"], t, nominalne[ambient_param[plant]], "ambient")
+
+    zaklocenia = {}
+    for zdarzenie in opis.get("events", []):
+        typ = zdarzenie.get("type")
+        chwile = _occurrences(zdarzenie)
+        if typ == "step":
+            for at in chwile:
+                krok = int(math.ceil(at / dt - 1e-9))
+                if krok < steps:
+                    zaklocenia[krok] = zaklocenia.get(krok, 0.0) + zdarzenie["delta"]
+            continue
+        if typ == "door_open":
+            if plant not in door_param:
+                raise ValueError(f"Zdarzenie 'door_open' nie dotyczy obiektu {plant}")
+            nazwa, bazowa = door_param[plant], nominalne[door_param[plant]]
+            wartosc = zdarzenie["k"] if "k" in zdarzenie else bazowa * zdarzenie.get("factor", 1.0)
+        elif typ == "inflow":
+            if plant not in inflow_param:
+                raise ValueError(f"Zdarzenie 'inflow' nie dotyczy obiektu {plant}")
+            nazwa, bazowa, wartosc = inflow_param[plant], 0.0, zdarzenie["rate"]
+        else:
+            raise ValueError(f"Nieznany typ zdarzenia: {typ}")
+        tablica = schedule.setdefault(nazwa, np.full(steps, float(bazowa)))
+        for at in chwile:
+            tablica[(t >= at) & (t < at + zdarzenie["duration"])] = wartosc
+
+    if plant in heat_capacity:
+        k = schedule.get(door_param[plant], nominalne[door_param[plant]])
+        krok_euler = float(np.max(k)) * dt / heat_capacity[plant](nominalne)
+        if krok_euler >= euler_limit:
+            warnings.warn(f"Scenariusz {opis.get('name')}: k * dt / pojemność cieplna = {krok_euler:.2f} "
+                          f">= {euler_limit} - krok Eulera obiektu {plant} jest na granicy stabilności "
+                          f"(zmniejsz k / factor lub dt)", stacklevel=2)
+
+    return Scenario(opis.get("name"), plant, dt, steps, parametry, zadane, zaklocenia, schedule)
+
+
+def load_scenario(path, params=None):
+    """Wczytuje i kompiluje scenariusz z pliku .json, .yaml lub .yml (względna ścieżka - także z scenarios/)."""
+    if not os.path.exists(path) and os.path.exists(os.path.join(scenario_dir, path)):
+        path = os.path.join(scenario_dir, path)
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Scenariusze YAML wymagają pakietu PyYAML (pip install pyyaml)") from None
+            opis = yaml.safe_load(f)
+        else:
+            opis = json.load(f)
+    opis.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return compile_scenario(opis, params)
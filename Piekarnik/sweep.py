@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import control
+import db_store
+import instrumentation
+import metrics
+
+""" OPIS
+Przeszukiwanie nastaw regulatora i parametrów obiektu na wszystkich rdzeniach.
+
+Przykłady:
+    python sweep.py --plant oven --controller pi --param Kp=0.0001:0.005:20 --param Ti=1:10:10 --param setpoint=150,200
+    python sweep.py --plant tank --controller pid --random 5000 --param kp=0.001:0.02 --param t_i=5:100 --param B=0.03:0.04
+
+Specyfikacja parametru:
+    a:b:n  - n wartości równomiernie od a do b (siatka)
+    a:b    - zakres dla losowania (--random)
+    a,b,c  - lista wartości
+    a      - jedna wartość
+
+Symulacje liczą procesy z puli, a proces główny zapisuje każdy gotowy przebieg do bazy
+(jeden proces piszący - bez rywalizacji o blokadę SQLite). Każdy punkt ma klucz (skrót parametrów)
+zapisywany w tej samej transakcji co przebieg, więc ponowne uruchomienie z tą samą nazwą --name
+pomija punkty już policzone.
+
+Z --metrics-only procesy liczą tylko wskaźniki jakości (metrics.py) w trakcie symulacji
+i zapisywany jest jeden wiersz na przebieg (runs + run_metrics) bez próbek.
+"""
+
+
+def parse_spec(spec, random_mode):
+    # Zwraca listę wartości (siatka) albo krotkę (a, b) - zakres do losowania
+    if "," in spec:
+        return [float(x) for x in spec.split(",")]
+    czesci = spec.split(":")
+    if len(czesci) == 3:
+        return np.linspace(float(czesci[0]), float(czesci[1]), int(czesci[2])).tolist()
+    if len(czesci) == 2:
+        if not random_mode:
+            raise ValueError(f"Zakres {spec} wymaga --random albo liczby punktów (a:b:n)")
+        return (float(czesci[0]), float(czesci[1]))
+    return [float(spec)]
+
+
+def make_points(specs, random_n=None, seed=0):
+    # specs: słownik nazwa -> lista wartości lub zakres (a, b)
+    nazwy = sorted(specs)
+    if random_n is None:
+        for wartosci in itertools.product(*(specs[n] for n in nazwy)):
+            yield dict(zip(nazwy, wartosci))
+        return
+    rng = np.random.default_rng(seed)
+    for _ in range(random_n):
+        punkt = {}
+        for n in nazwy:
+            spec = specs[n]
+            punkt[n] = float(rng.uniform(*spec)) if isinstance(spec, tuple) else float(rng.choice(spec))
+        yield punkt
+
+
+def point_key(plant, controller, steps, punkt, metrics_only=False):
+    # Punkt policzony tylko ze wskaźnikami nie jest gotowy dla pełnego przeszukiwania (brak przebiegu) -
+    # tryb jest częścią klucza (bez zmiany kluczy pełnych przeszukiwań zapisanych wcześniej)
+    opis = dict(plant=plant, controller=controller, steps=steps, **punkt)
+    if metrics_only:
+        opis["metrics_only"] = True
+    opis = json.dumps(opis, sort_keys=True)
+    return hashlib.sha1(opis.encode("utf-8")).hexdigest()
+
+
+def run_point(plant, controller, steps, punkt, metrics_only=False):
+    # Wywoływane w procesie z puli - jedna symulacja; zwraca przebieg albo tylko wskaźniki
+    params = dict(punkt)
+    setpoint = params.pop("setpoint", control.plant_defaults[plant]["setpoint"])
+    dt = params.pop("dt", None)
+    loop = control.make_loop(plant, controller, dt=dt, **params)
+    zaklocenia = control.plant_defaults[plant]["disturbances"]
+    if metrics_only:
+        return punkt, setpoint, None, metrics.evaluate(loop, steps, setpoint, zaklocenia)
+    wynik = loop.run(steps, setpoint, zaklocenia)
+    return punkt, setpoint, wynik, None
+
+
+def _loss_column(wynik):
+    # Kolumna strat zapisywana w samples.loss (zależy od obiektu); zbiornik nie ma strat - NULL
+    for nazwa in ("Q_utracone", "T_utracone"):
+        if nazwa in wynik:
+            return wynik[nazwa]
+    return None
+
+
+def run_sweep(plant, controller, specs, name, random_n=None, seed=0, steps=None, workers=None,
+              path=db_store.db_path, chunk=64, on_result=None, metrics_only=False):
+    """
+    Uruchamia przeszukiwanie i zapisuje przebiegi do bazy w miarę ich kończenia.
+
+    Returns:
+        int: Liczba nowo policzonych punktów.
+    """
+    if steps is None:
+        steps = control.plant_defaults[plant]["steps"]
+    gotowe = db_store.sweep_done_keys(name, path)
+    zadania = {}
+    for punkt in make_points(specs, random_n, seed):
+        klucz = point_key(plant, controller, steps, punkt, metrics_only)
+        if klucz not in gotowe:
+            zadania[klucz] = punkt
+    zadania = list(zadania.items())
+    if not zadania:
+        return 0
+
+    workers = workers or os.cpu_count()
+    zrobione = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Zadania wysyłane partiami, żeby nie trzymać w pamięci wyników całego przeszukiwania
+        for poczatek in range(0, len(zadania), chunk * workers):
+            partia = zadania[poczatek:poczatek + chunk * workers]
+            futures = {pool.submit(run_point, plant, controller, steps, punkt, metrics_only): klucz
+                       for klucz, punkt in partia}
+            for future in as_completed(futures):
+                punkt, setpoint, wynik, wskazniki = future.result()
+                gain = control.gains(controller, punkt)
+                if wynik is None:
+                    kolumny = ((), (), (), None)
+                else:
+                    kolumny = (wynik["t"], wynik["y"], wynik["u"], _loss_column(wynik))
+                db_store.save_run(control.controller_labels[controller], plant, *kolumny, setpoint=setpoint,
+                                  kp=gain[0], ti=gain[1], td=gain[2], params=punkt, sweep=name,
+                                  key=futures[future], metrics=wskazniki, path=path)
+                if on_result is not None:
+                    on_result(punkt, wynik if wynik is not None else wskazniki)
+                zrobione += 1
+                if zrobione % 100 == 0 or zrobione == len(zadania):
+                    tempo = zrobione / (time.perf_counter() - start)
+                    print(f"{name}: {zrobione}/{len(zadania)} ({tempo:.0f} przebiegów/s)", file=sys.stderr)
+    return zrobione
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Przeszukiwanie nastaw regulatora na wszystkich rdzeniach")
+    parser.add_argument("--plant", choices=sorted(control.plant_params), default="oven")
+    parser.add_argument("--controller", choices=sorted(control.controller_params), default="pi")
+    parser.add_argument("--param", action="append", default=[], metavar="NAZWA=SPEC",
+                        help="parametr i jego wartości, np. Kp=0.0001:0.005:20 (można powtarzać)")
+    parser.add_argument("--random", type=int, default=None, metavar="N",
+                        help="losuj N punktów zamiast pełnej siatki")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=None, help="liczba kroków symulacji")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--name", default=None, help="nazwa przeszukiwania - ta sama nazwa wznawia postęp")
+    parser.add_argument("--metrics-only", action="store_true",
+                        help="zapisuj tylko wskaźniki jakości (bez próbek przebiegu)")
+    parser.add_argument("--db", default=db_store.db_path)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    specs = {}
+    for wpis in args.param:
+        nazwa, _, spec = wpis.partition("=")
+        specs[nazwa] = parse_spec(spec, args.random is not None)
+    opis = " ".join(sorted(args.param) + [str(args.random), str(args.seed), str(args.steps), str(args.metrics_only)])
+    name = args.name or f"{args.plant}-{args.controller}-{hashlib.sha1(opis.encode()).hexdigest()[:8]}"
+
+    with instrumentation.from_args(args):
+        zrobione = run_sweep(args.plant, args.controller, specs, name, args.random, args.seed, args.steps,
+                             args.workers, args.db, metrics_only=args.metrics_only)
+    print(f"{name}: zapisano {zrobione} nowych przebiegów")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import numpy as np
+from math import sqrt
+
+""" OPIS
+Symulacja napełniania zbiornika z regulatorem PID (BokehMain.py) lub PI (int_ster_PI.py, t_d = 0).
+Wzory są takie same jak w pętlach tamtych skryptów, ale:
+- całka uchybu jest sumą bieżącą (zamiast sum(e) po całej historii w każdym kroku) - koszt O(N) zamiast O(N²)
+- z historii uchybu pamiętany jest tylko poprzedni uchyb
+- wyniki trafiają do prealokowanych tablic NumPy
+
+Uwaga: człon proporcjonalny korzysta z e[i], czyli uchybu z poprzedniego kroku - tak jak w oryginalnej pętli.
+
+WZORY
+u = kp * (e[i] + t_p / t_i * suma(e) + (t_d / t_p) * (e[-1] - e[-2]))
+q_d = (u - u_min) / (u_max - u_min) * (q_max - q_min) + q_min
+H = H + t_p * (q_d - B * sqrt(H)) / A
+"""
+
+# PARAMETRY ZBIORNIKA (BokehMain.py)
+A = 2  # przekrój poprzeczny zbiornika
+h_min = 0  # minimalna wysokość wody w zbiorniku
+h_max = 10  # maksymalna wysokość wody w zbiorniku
+B = 0.035  # współczynnik wypływu m/s
+q_min = 0  # minimalna przepustowość dopływu w litrach / s
+q_max = 50  # maksymalna przepustowość dopływu w litrach / s
+u_min = 0
+u_max = 10
+
+# PARAMETRY REGULATORA
+t_i = 20  # stała całkowania
+t_d = 5  # czas wyprzedzenia
+kp = 0.008  # wzmocnienie regulatora
+
+# PARAMETRY SYMULACJI
+t_p = 0.2  # okres próbkowania
+
+
+class TankPID:
+    """
+    Zbiornik z regulatorem PID krok po kroku, ze stanem całki i poprzedniego uchybu.
+
+    Args:
+        kp, t_i, t_d (float): Nastawy regulatora (t_d = 0 daje regulator PI z int_ster_PI.py).
+        t_p (float): Okres próbkowania (s).
+        A, B, h_min, h_max, q_min, q_max, u_min, u_max (float): Parametry zbiornika i sterowania.
+    """
+
+    def __init__(self, kp=kp, t_i=t_i, t_d=t_d, t_p=t_p, A=A, B=B, h_min=h_min, h_max=h_max,
+                 q_min=q_min, q_max=q_max, u_min=u_min, u_max=u_max):
+        self.kp, self.t_i, self.t_d, self.t_p = kp, t_i, t_d, t_p
+        self.A, self.B, self.h_min, self.h_max = A, B, h_min, h_max
+        self.q_min, self.q_max, self.u_min, self.u_max = q_min, q_max, u_min, u_max
+        self.reset()
+
+    def reset(self):
+        self.H = 0  # wysokość wody w zbiorniku
+        self.suma_e = 0.0  # bieżąca suma uchybów (całka)
+        self.e_prev = 0.0  # poprzedni uchyb
+        self.i = 0
+
+    def step(self, h_zadane):
+        # Jeden krok regulatora i zbiornika, zwraca (H, u, q_d)
+        e = h_zadane - self.H
+        self.suma_e += e
+        u_temp = self.kp * (self.e_prev + self.t_p / self.t_i * self.suma_e + (self.t_d / self.t_p) * (e - self.e_prev))
+        self.e_prev = e
+        u = min(self.u_max, max(self.u_min, u_temp))
+        q_d = (((u - self.u_min) / (self.u_max - self.u_min)) * (self.q_max - self.q_min) + self.q_min)
+        self.H = min(self.h_max, max(self.h_min, self.t_p * (q_d - self.B * sqrt(self.H)) / self.A + self.H))
+        self.i += 1
+        return self.H, u, q_d
+
+    def run(self, N, h_zadane):
+        """
+        Wykonuje N kroków. Wyniki mają N + 1 próbek (pierwsza to stan początkowy), jak listy T, H, u w BokehMain.py.
+
+        Args:
+            N (int): Liczba kroków.
+            h_zadane (float | array): Poziom zadany, stały lub tablica (N,) na każdy krok.
+
+        Returns:
+            ndarray: Czas (min).
+            ndarray: Wysokość wody.
+            ndarray: Wartość sterująca.
+            ndarray: Natężenie dopływu.
+        """
+        T = np.empty(N + 1)
+        H = np.empty(N + 1)
+        u = np.empty(N + 1)
+        Q = np.empty(N + 1)
+        T[0], H[0], u[0], Q[0] = 0, self.H, 0, 0.0
+        zadane = np.broadcast_to(np.asarray(h_zadane, dtype=float), (N,)).tolist()
+
+        # Lokalne zmienne zamiast atrybutów w gorącej pętli
+        kp_, ti_, td_, tp_ = self.kp, self.t_p / self.t_i, self.t_d / self.t_p, self.t_p
+        A_, B_, hmin_, hmax_ = self.A, self.B, self.h_min, self.h_max
+        umin_, umax_, qmin_ = self.u_min, self.u_max, self.q_min
+        skala_q = self.q_max - self.q_min
+        zakres_u = self.u_max - self.u_min
+        h, suma_e, e_prev = self.H, self.suma_e, self.e_prev
+        start = self.i
+
+        for n in range(N):
+            e = zadane[n] - h
+            suma_e += e
+            u_n = min(umax_, max(umin_, kp_ * (e_prev + ti_ * suma_e + td_ * (e - e_prev))))
+            e_prev = e
+            q_d = (((u_n - umin_) / zakres_u) * skala_q + qmin_)
+            h = min(hmax_, max(hmin_, tp_ * (q_d - B_ * sqrt(h)) / A_ + h))
+            T[n + 1] = (start + n) * tp_ / 60
+            H[n + 1] = h
+            u[n + 1] = u_n
+            Q[n + 1] = q_d
+
+        self.H, self.suma_e, self.e_prev = h, suma_e, e_prev
+        self.i = start + N
+        return T, H, u, Q
+
+
+def simulate_tank(h_zadane=3, czas_symulacji=15, **params):
+    # Cała symulacja jak w BokehMain.py: czas_symulacji w minutach, N = t_Sim / t_p
+    tank = TankPID(**params)
+    N = int(czas_symulacji * 60 / tank.t_p)
+    return tank.run(N, h_zadane)
+
+
+def simulate_tank_batch(kp, t_i, t_d, h_zadane=3, N=int(15 * 60 / t_p), t_p=t_p, A=A, B=B, h_min=h_min,
+                        h_max=h_max, q_min=q_min, q_max=q_max, u_min=u_min, u_max=u_max, H0=0):
+    """
+    Symuluje wiele zbiorników z regulatorem PID jednocześnie (jak oven_batch.simulate_pi_batch).
+    Próbki odpowiadają control.ClosedLoop.run (bez stanu początkowego): wiersz n to stan po kroku n.
+
+    Args:
+        kp, t_i, t_d (float | array): Nastawy regulatora, skalary lub tablice (M,).
+        h_zadane (float | array): Poziom zadany, skalar lub tablica (M,).
+        N (int): Liczba kroków.
+        H0 (float | array): Początkowa wysokość wody (m), skalar lub tablica (M,).
+
+    Returns:
+        ndarray: Czas (N,) w sekundach.
+        ndarray: Wysokość wody (M, N).
+        ndarray: Wartość sterująca (M, N).
+        ndarray: Natężenie dopływu (M, N).
+    """
+    kp, t_i, t_d, h_zadane = (a.ravel() for a in np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (kp, t_i, t_d, h_zadane))))
+    m = kp.size
+    ti_ = t_p / t_i
+    td_ = t_d / t_p
+    zakres_u = u_max - u_min
+    skala_q = q_max - q_min
+
+    h = np.array(np.broadcast_to(np.asarray(H0, dtype=float), (m,)))
+    suma_e = np.zeros(m)
+    e_prev = np.zeros(m)
+    e = np.empty(m)
+    tmp = np.empty(m)
+
+    # Wiersz na krok - ciągły zapis, transpozycja na końcu jest widokiem
+    H = np.empty((N, m))
+    U = np.empty((N, m))
+    Q = np.empty((N, m))
+
+    for n in range(N):
+        np.subtract(h_zadane, h, out=e)
+        suma_e += e
+        u = U[n]
+        # u = kp * (e_prev + t_p / t_i * suma_e + t_d / t_p * (e - e_prev))
+        np.subtract(e, e_prev, out=tmp)
+        tmp *= td_
+        np.multiply(ti_, suma_e, out=u)
+        u += e_prev
+        u += tmp
+        u *= kp
+        np.clip(u, u_min, u_max, out=u)
+        e_prev, e = e, e_prev
+
+        q = Q[n]
+        np.subtract(u, u_min, out=q)
+        q /= zakres_u
+        q *= skala_q
+        q += q_min
+        # h = t_p * (q - B * sqrt(h)) / A + h - kolejność działań jak w TankPID.run
+        np.sqrt(h, out=tmp)
+        tmp *= B
+        np.subtract(q, tmp, out=tmp)
+        tmp *= t_p
+        tmp /= A
+        h += tmp
+        np.clip(h, h_min, h_max, out=h)
+        H[n] = h
+
+    return np.arange(N) * t_p, H.T, U.T, Q.T
+
+
+if __name__ == "__main__":
+    import time
+
+    def simulate_tank_sum(h_zadane, N):
+        # Oryginalna pętla z BokehMain.py (sum(e) w każdym kroku) - do porównania
+        T, H, e, u = [0], [0], [0.0], [0]
+        for i in range(0, N):
+            T.append(i * t_p / 60)
+            e.append(h_zadane - H[i])
+            u_temp = kp * (e[i] + t_p / t_i * sum(e) + (t_d / t_p) * (e[-1] - e[-2]))
+            u.append(min(u_max, max(u_min, u_temp)))
+            q_d = (((u[-1] - u_min) / (u_max - u_min)) * (q_max - q_min) + q_min)
+            H.append(min(h_max, max(h_min, t_p * (q_d - B * sqrt(H[-1])) / A + H[-1])))
+        return T, H, u
+
+    N = int(15 * 60 / t_p)
+    start = time.perf_counter()
+    T_ref, H_ref, u_ref = simulate_tank_sum(3, N)
+    czas_sum = time.perf_counter() - start
+    start = time.perf_counter()
+    T_new, H_new, u_new, _ = simulate_tank(3)
+    czas_nowy = time.perf_counter() - start
+    assert np.array_equal(H_ref, H_new) and np.array_equal(u_ref, u_new) and np.allclose(T_ref, T_new)
+    print(f"N = {N}: sum(e) {czas_sum:.3f} s, suma bieżąca {czas_nowy:.4f} s")
+
+    start = time.perf_counter()
+    simulate_tank(3, czas_symulacji=6 * 60, t_p=0.05)
+    print(f"6 h przy t_p = 0.05 ({int(6 * 3600 / 0.05)} kroków): {time.perf_counter() - start:.2f} s")
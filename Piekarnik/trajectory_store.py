@@ -0,0 +1,69 @@
+import json
+import os
+import numpy as np
+import instrumentation
+
+""" OPIS
+Kolumnowy zapis przebiegów w plikach .npy (obok bazy SQLite).
+Każdy przebieg to katalog trajectories/run_<id>/ z osobnym plikiem na kolumnę
+(t, y, u, loss - ciągłe tablice float64) i plikiem meta.json.
+Odczyt przez np.load(mmap_mode="r") - tablice są mapowane z dysku, bez konwersji wiersz po wierszu
+i bez kopiowania całego pliku do pamięci. Bokeh przyjmuje tablice NumPy w ColumnDataSource
+i przesyła je binarnie.
+"""
+
+trajectory_dir = "trajectories"
+
+
+def run_dir(run_id, root=trajectory_dir):
+    return os.path.join(root, f"run_{run_id}")
+
+
+@instrumentation.timed("persistence.write_trajectory")
+def write_trajectory(run_id, root=trajectory_dir, meta=None, **columns):
+    """
+    Zapisuje kolumny przebiegu jako pliki .npy.
+
+    Args:
+        run_id (int): Identyfikator przebiegu (ten sam co w tabeli runs).
+        meta (dict | None): Dodatkowe informacje zapisywane w meta.json.
+        **columns: Kolumny, np. t=..., y=..., u=..., loss=... (listy lub tablice tej samej długości).
+    """
+    katalog = run_dir(run_id, root)
+    os.makedirs(katalog, exist_ok=True)
+    dlugosc = None
+    for nazwa, wartosci in columns.items():
+        tablica = np.ascontiguousarray(wartosci, dtype=np.float64)
+        if dlugosc is not None and tablica.shape[0] != dlugosc:
+            raise ValueError(f"Kolumna {nazwa} ma {tablica.shape[0]} próbek, oczekiwano {dlugosc}")
+        dlugosc = tablica.shape[0]
+        # Zapis do pliku tymczasowego i podmiana - czytelnik nigdy nie widzi niepełnego pliku
+        tmp = os.path.join(katalog, f".{nazwa}.npy.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, tablica)
+        os.replace(tmp, os.path.join(katalog, f"{nazwa}.npy"))
+    # meta.json na końcu i też przez podmianę - has_trajectory() oznacza kompletny przebieg
+    tmp = os.path.join(katalog, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(meta or {}, columns=list(columns), length=dlugosc), f)
+    os.replace(tmp, os.path.join(katalog, "meta.json"))
+
+
+@instrumentation.timed("persistence.read_trajectory")
+def read_trajectory(run_id, columns=None, root=trajectory_dir):
+    # Słownik kolumna -> tablica zmapowana z dysku (tylko do odczytu)
+    katalog = run_dir(run_id, root)
+    if columns is None:
+        with open(os.path.join(katalog, "meta.json"), encoding="utf-8") as f:
+            columns = json.load(f)["columns"]
+    return {nazwa: np.load(os.path.join(katalog, f"{nazwa}.npy"), mmap_mode="r") for nazwa in columns}
+
+
+def has_trajectory(run_id, root=trajectory_dir):
+    return os.path.exists(os.path.join(run_dir(run_id, root), "meta.json"))
+
+
+def source_data(run_id, x="t", y="y", root=trajectory_dir):
+    # Dane gotowe dla ColumnDataSource: dict(x=..., y=...)
+    kolumny = read_trajectory(run_id, (x, y), root)
+    return dict(x=kolumny[x], y=kolumny[y])
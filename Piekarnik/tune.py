@@ -0,0 +1,290 @@
+import argparse
+import sys
+import time
+import numpy as np
+import control
+import db_store
+import instrumentation
+import metrics
+import oven_batch
+import tank_model
+
+""" OPIS
+Automatyczny dobór nastaw regulatora zamiast ręcznego przesuwania suwaków.
+
+Przykłady:
+    python tune.py --plant oven --controller pi --energy-weight 50 --max-overshoot 5
+    python tune.py --plant tank --controller pid --setpoint 4 --param B=0.04
+
+Koszt przebiegu (mniejszy = lepszy):
+    ITAE + energy_weight * energia + overshoot_penalty * max(0, przeregulowanie - max_overshoot)
+Wskaźniki liczone są jak w metrics.py (energia = Σ P·dt, dla zbiornika 0).
+
+Poszukiwanie odbywa się w przestrzeni znormalizowanej [0, 1]^d (skala logarytmiczna dla wzmocnień):
+1. siatka z kolejnymi zagęszczeniami - cała siatka jednego poziomu liczona wsadowo
+   (oven_batch.simulate_pi_batch, tank_model.simulate_tank_batch), potem zagęszczenie wokół kilku
+   najlepszych punktów z dwukrotnie mniejszym oczkiem,
+2. doszlifowanie najlepszego punktu metodą Neldera-Meada (pojedyncze symulacje przez control.ClosedLoop).
+Koszt każdego zestawu nastaw jest zapamiętywany, więc powtórzone punkty nie są symulowane ponownie.
+"""
+
+# Przestrzeń poszukiwań: nazwa nastawy -> (min, max, skala)
+search_space = {
+    ("oven", "pi"): {"Kp": (1e-4, 0.1, "log"), "Ti": (1, 100, "log")},
+    ("tank", "pid"): {"kp": (1e-3, 1, "log"), "t_i": (1, 200, "log"), "t_d": (0, 20, "lin")},
+}
+
+
+def _oven_pi_batch(punkty, setpoint, steps, dt, plant_params):
+    # Wskaźniki dla wielu par (Kp, Ti) naraz; zakłócenie jak w control.plant_defaults
+    zaklocenia = control.plant_defaults["oven"]["disturbances"]
+    krok_zakl, zmiana = next(iter(zaklocenia.items())) if zaklocenia else (None, 0)
+    params = {n: plant_params[n] for n in ("k", "T_otoczenia", "cp", "P_max", "T0") if n in plant_params}
+    _, T, _, P = oven_batch.simulate_pi_batch(punkty[:, 0], punkty[:, 1], setpoint, steps * dt, dt,
+                                              t_zaklocenia=krok_zakl, zaklocenie=zmiana, **params)
+    # Stan początkowy jak w control.Oven: T0, a bez niego temperatura otoczenia
+    T0 = plant_params.get("T0")
+    if T0 is None:
+        T0 = plant_params.get("T_otoczenia", oven_batch.T_otoczenia)
+    m = metrics.BatchStepMetrics(len(punkty), setpoint, T0, dt,
+                                 krok_zakl * dt if krok_zakl is not None else None)
+    for i in range(steps):
+        m.update(i * dt, T[:, i], P[:, i])
+    return m.result()
+
+
+def _tank_pid_batch(punkty, setpoint, steps, dt, plant_params):
+    _, H, _, _ = tank_model.simulate_tank_batch(punkty[:, 0], punkty[:, 1], punkty[:, 2], setpoint, steps, dt,
+                                                **plant_params)
+    m = metrics.BatchStepMetrics(len(punkty), setpoint, plant_params.get("H0", 0.0), dt)
+    for i in range(steps):
+        m.update(i * dt, H[:, i])
+    return m.result()
+
+
+batch_simulators = {("oven", "pi"): _oven_pi_batch, ("tank", "pid"): _tank_pid_batch}
+
+
+class Objective:
+    """
+    Koszt nastaw regulatora z pamięcią już policzonych punktów.
+
+    Args:
+        plant, controller (str): Układ jak w control.make_loop.
+        setpoint (float | None): Wartość zadana (domyślnie z control.plant_defaults).
+        energy_weight (float): Waga energii w koszcie.
+        max_overshoot (float | None): Dopuszczalne przeregulowanie [%] (None - bez ograniczenia).
+        overshoot_penalty (float): Kara za każdy procent ponad max_overshoot.
+        plant_params (dict | None): Parametry obiektu, np. dict(k=0.007).
+        batch_min (int): Od tylu nowych punktów symulacja jest wsadowa, mniej - pojedyncze ClosedLoop.
+    """
+
+    def __init__(self, plant, controller, setpoint=None, energy_weight=0.0, max_overshoot=None,
+                 overshoot_penalty=1e6, plant_params=None, steps=None, batch_min=8):
+        domyslne = control.plant_defaults[plant]
+        self.plant, self.controller = plant, controller
+        self.names = list(search_space[(plant, controller)])
+        self.setpoint = domyslne["setpoint"] if setpoint is None else setpoint
+        self.steps = domyslne["steps"] if steps is None else steps
+        self.dt = domyslne["dt"]
+        self.energy_weight, self.max_overshoot, self.overshoot_penalty = energy_weight, max_overshoot, overshoot_penalty
+        self.plant_params = dict(plant_params or {})
+        self.batch_min = batch_min
+        self.cache = {}  # krotka nastaw -> (koszt, wskaźniki)
+        self.simulations = 0
+
+    def cost(self, wskazniki):
+        koszt = wskazniki["itae"] + self.energy_weight * wskazniki["energy"]
+        if self.max_overshoot is not None:
+            nadmiar = np.nan_to_num(wskazniki["overshoot"]) - self.max_overshoot
+            koszt = koszt + self.overshoot_penalty * np.maximum(0.0, nadmiar)
+        return koszt
+
+    def _evaluate_one(self, punkt):
+        loop = control.make_loop(self.plant, self.controller, **dict(zip(self.names, punkt)), **self.plant_params)
+        return metrics.evaluate(loop, self.steps, self.setpoint, control.plant_defaults[self.plant]["disturbances"])
+
+    def __call__(self, punkty):
+        """Koszty dla tablicy punktów (M, d) w jednostkach nastaw."""
+        # Zaokrąglenie do 12 cyfr znaczących - ten sam punkt z różnych ścieżek trafia w pamięć
+        klucze = [tuple(float(f"{x:.12g}") for x in p) for p in np.atleast_2d(punkty)]
+        nowe = list(dict.fromkeys(k for k in klucze if k not in self.cache))
+        if nowe:
+            self.simulations += len(nowe)
+            symulacja = batch_simulators.get((self.plant, self.controller))
+            if symulacja is not None and len(nowe) >= self.batch_min:
+                wyniki = symulacja(np.array(nowe), self.setpoint, self.steps, self.dt, self.plant_params)
+                koszty = self.cost(wyniki)
+                for j, k in enumerate(nowe):
+                    self.cache[k] = (float(koszty[j]), {n: float(v[j]) for n, v in wyniki.items()})
+            else:
+                for k in nowe:
+                    wynik = self._evaluate_one(k)
+                    self.cache[k] = (float(self.cost(wynik)), wynik)
+        return np.array([self.cache[k][0] for k in klucze])
+
+
+class Space:
+    """Odwzorowanie znormalizowanego sześcianu [0, 1]^d na nastawy (liniowo lub logarytmicznie)."""
+
+    def __init__(self, zakresy):
+        self.names = list(zakresy)
+        dolne, gorne, skale = zip(*zakresy.values())
+        self.log = np.array([s == "log" for s in skale])
+        self.lo = np.where(self.log, np.log(np.maximum(dolne, 1e-300)), dolne)
+        self.hi = np.where(self.log, np.log(gorne), gorne)
+
+    def to_params(self, x):
+        v = self.lo + np.clip(x, 0, 1) * (self.hi - self.lo)
+        return np.where(self.log, np.exp(v), v)
+
+
+def grid_refine(f, d, grid=None, levels=4, keep=3, local=5):
+    """
+    Siatka z kolejnymi zagęszczeniami w [0, 1]^d.
+
+    Args:
+        f: Funkcja kosztu przyjmująca tablicę punktów (M, d).
+        grid (int | None): Punktów na wymiar na pierwszym poziomie (domyślnie ~500 punktów łącznie).
+        levels (int): Liczba zagęszczeń.
+        keep (int): Ilu najlepszych punktów otoczenie jest zagęszczane.
+        local (int): Punktów na wymiar w otoczeniu.
+
+    Returns:
+        ndarray: Najlepszy punkt (d,).
+        float: Jego koszt.
+    """
+    if grid is None:
+        grid = max(3, int(round(500 ** (1 / d))))
+    osie = [np.linspace(0, 1, grid)] * d
+    punkty = np.stack(np.meshgrid(*osie, indexing="ij"), -1).reshape(-1, d)
+    oczko = 1 / (grid - 1)
+    koszty = f(punkty)
+    for _ in range(levels):
+        najlepsze = punkty[np.argsort(koszty)[:keep]]
+        # Otoczenie ±oczko wokół każdego z najlepszych - wszystkie otoczenia w jednym wywołaniu f
+        przesuniecia = np.stack(np.meshgrid(*[np.linspace(-oczko, oczko, local)] * d, indexing="ij"),
+                                -1).reshape(-1, d)
+        nowe = np.clip((najlepsze[:, None, :] + przesuniecia[None]).reshape(-1, d), 0, 1)
+        punkty = np.concatenate([najlepsze, nowe])
+        koszty = f(punkty)
+        oczko *= 2 / (local - 1)
+    i = int(np.argmin(koszty))
+    return punkty[i], float(koszty[i])
+
+
+def nelder_mead(f, x0, step=0.05, tol=1e-6, max_iter=200):
+    # Metoda Neldera-Meada w [0, 1]^d (punkty przycinane do sześcianu); f przyjmuje tablicę (M, d)
+    d = len(x0)
+    simplex = np.clip(np.vstack([x0, x0 + step * np.eye(d)]), 0, 1)
+    # Wierzchołek na krawędzi sześcianu byłby równy x0 - krok w przeciwną stronę
+    for i in range(d):
+        if simplex[i + 1, i] == x0[i]:
+            simplex[i + 1, i] = max(0.0, x0[i] - step)
+    koszty = f(simplex)
+    for _ in range(max_iter):
+        kolejnosc = np.argsort(koszty)
+        simplex, koszty = simplex[kolejnosc], koszty[kolejnosc]
+        if koszty[-1] - koszty[0] <= tol * max(abs(koszty[0]), 1e-12) and np.ptp(simplex, 0).max() < 1e-4:
+            break
+        srodek = simplex[:-1].mean(0)
+        odbity = np.clip(2 * srodek - simplex[-1], 0, 1)
+        k_odb = f(odbity)[0]
+        if k_odb < koszty[0]:
+            rozszerzony = np.clip(3 * srodek - 2 * simplex[-1], 0, 1)
+            k_roz = f(rozszerzony)[0]
+            simplex[-1], koszty[-1] = (rozszerzony, k_roz) if k_roz < k_odb else (odbity, k_odb)
+        elif k_odb < koszty[-2]:
+            simplex[-1], koszty[-1] = odbity, k_odb
+        else:
+            skurczony = (srodek + (odbity if k_odb < koszty[-1] else simplex[-1])) / 2
+            k_sk = f(skurczony)[0]
+            if k_sk < min(k_odb, koszty[-1]):
+                simplex[-1], koszty[-1] = skurczony, k_sk
+            else:
+                simplex[1:] = (simplex[0] + simplex[1:]) / 2
+                koszty[1:] = f(simplex[1:])
+    i = int(np.argmin(koszty))
+    return simplex[i], float(koszty[i])
+
+
+def tune(plant="oven", controller="pi", setpoint=None, energy_weight=0.0, max_overshoot=None, method="grid+nm",
+         bounds=None, plant_params=None, steps=None, overshoot_penalty=1e6):
+    """
+    Dobiera nastawy regulatora minimalizujące koszt (patrz OPIS).
+
+    Args:
+        method (str): "grid" (siatka z zagęszczeniami), "nm" (Nelder-Mead od środka zakresu)
+            lub "grid+nm" (siatka, potem Nelder-Mead).
+        bounds (dict | None): Zmienione zakresy, np. {"Kp": (1e-4, 5e-3, "log")}.
+
+    Returns:
+        dict: params (nastawy), cost, metrics (wskaźniki najlepszego przebiegu), simulations, seconds.
+    """
+    start = time.perf_counter()
+    zakresy = dict(search_space[(plant, controller)], **(bounds or {}))
+    przestrzen = Space(zakresy)
+    cel = Objective(plant, controller, setpoint, energy_weight, max_overshoot, overshoot_penalty,
+                    plant_params, steps)
+
+    def f(x):
+        return cel(przestrzen.to_params(np.atleast_2d(x)))
+
+    x = np.full(len(zakresy), 0.5)
+    if method in ("grid", "grid+nm"):
+        x, _ = grid_refine(f, len(zakresy))
+    if method in ("nm", "grid+nm"):
+        x, _ = nelder_mead(f, x, step=0.1 if method == "nm" else 0.02)
+    najlepsze = tuple(float(f"{v:.12g}") for v in przestrzen.to_params(x))
+    cel(np.array([najlepsze]))
+    koszt, wskazniki = cel.cache[najlepsze]
+    return dict(params=dict(zip(przestrzen.names, najlepsze)), cost=koszt, metrics=wskazniki,
+                simulations=cel.simulations, seconds=time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Automatyczny dobór nastaw regulatora")
+    parser.add_argument("--plant", choices=sorted({p for p, _ in search_space}), default="oven")
+    parser.add_argument("--controller", choices=sorted({c for _, c in search_space}), default="pi")
+    parser.add_argument("--setpoint", type=float, default=None)
+    parser.add_argument("--energy-weight", type=float, default=0.0, help="waga energii w koszcie")
+    parser.add_argument("--max-overshoot", type=float, default=None, help="dopuszczalne przeregulowanie [%%]")
+    parser.add_argument("--method", choices=("grid", "nm", "grid+nm"), default="grid+nm")
+    parser.add_argument("--param", action="append", default=[], metavar="NAZWA=WARTOŚĆ",
+                        help="parametr obiektu, np. k=0.007 (można powtarzać)")
+    parser.add_argument("--steps", type=int, default=None, help="liczba kroków symulacji")
+    parser.add_argument("--save", action="store_true", help="zapisz przebieg z najlepszymi nastawami do bazy")
+    parser.add_argument("--db", default=db_store.db_path)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if (args.plant, args.controller) not in search_space:
+        parser.error(f"Brak przestrzeni nastaw dla {args.controller}/{args.plant}")
+
+    plant_params = {}
+    for wpis in args.param:
+        nazwa, _, wartosc = wpis.partition("=")
+        plant_params[nazwa] = float(wartosc)
+    with instrumentation.from_args(args):
+        wynik = tune(args.plant, args.controller, args.setpoint, args.energy_weight, args.max_overshoot,
+                     args.method, plant_params=plant_params, steps=args.steps)
+
+    nastawy = ", ".join(f"{n} = {v:.6g}" for n, v in wynik["params"].items())
+    print(f"{nastawy} (koszt {wynik['cost']:.6g}, {wynik['simulations']} symulacji, {wynik['seconds']:.2f} s)")
+    for nazwa in metrics.names:
+        print(f"  {nazwa}: {wynik['metrics'][nazwa]:.6g}", file=sys.stderr)
+
+    if args.save:
+        domyslne = control.plant_defaults[args.plant]
+        setpoint = domyslne["setpoint"] if args.setpoint is None else args.setpoint
+        loop = control.make_loop(args.plant, args.controller, **wynik["params"], **plant_params)
+        przebieg = loop.run(args.steps or domyslne["steps"], setpoint, domyslne["disturbances"])
+        gain = control.gains(args.controller, wynik["params"])
+        run_id = db_store.save_run(control.controller_labels[args.controller], args.plant, przebieg["t"], przebieg["y"], przebieg["u"],
+                                   setpoint=setpoint, kp=gain[0], ti=gain[1], td=gain[2],
+                                   params=dict(wynik["params"], **plant_params), metrics=wynik["metrics"],
+                                   path=args.db)
+        print(f"Zapisano przebieg {run_id}")
+
+
+if __name__ == "__main__":
+    main()